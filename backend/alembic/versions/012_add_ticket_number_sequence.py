@@ -0,0 +1,45 @@
+"""Add sequence for ticket numbers
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """
+    Создает последовательность ticket_number_seq для атомарной выдачи номеров
+    тикетов CMD-0000001 и продолжает нумерацию с максимального существующего номера
+    """
+    connection = op.get_bind()
+    
+    print("Создание последовательности ticket_number_seq...")
+    op.execute(sa.text("CREATE SEQUENCE IF NOT EXISTS ticket_number_seq START WITH 1 MINVALUE 1"))
+    
+    # Продолжаем нумерацию после последнего выданного номера
+    result = connection.execute(sa.text(
+        "SELECT MAX(CAST(split_part(ticket_number, '-', 2) AS INTEGER)) "
+        "FROM cards WHERE ticket_number ~ '^CMD-[0-9]+$'"
+    ))
+    max_number = result.scalar() or 0
+    connection.execute(sa.text(f"SELECT setval('ticket_number_seq', {max_number + 1}, false)"))
+    
+    print(f"Следующий номер тикета: CMD-{max_number + 1:07d}")
+
+
+def downgrade():
+    """
+    Удаляет последовательность ticket_number_seq
+    """
+    print("Удаление последовательности ticket_number_seq...")
+    op.execute(sa.text("DROP SEQUENCE IF EXISTS ticket_number_seq"))
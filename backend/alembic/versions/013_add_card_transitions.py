@@ -0,0 +1,98 @@
+"""Add card_transitions table
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '013'
+down_revision = '012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """
+    Создает нормализованную таблицу переходов карточек между колонками
+    и заполняет ее из существующей истории (card_history)
+    """
+    print("Создание таблицы card_transitions...")
+    op.create_table('card_transitions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('card_id', sa.Integer(), nullable=False),
+        sa.Column('from_column_id', sa.Integer(), nullable=True),
+        sa.Column('to_column_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['card_id'], ['cards.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_card_transitions_card_id_created_at', 'card_transitions', ['card_id', 'created_at'])
+    
+    connection = op.get_bind()
+    
+    # 1. Создание карточек: column_id из JSON в деталях записи "created"
+    print("Перенос записей о создании карточек...")
+    connection.execute(sa.text("""
+        INSERT INTO card_transitions (card_id, from_column_id, to_column_id, created_at)
+        SELECT h.card_id, NULL,
+               CAST(substring(h.details from '"column_id": ([0-9]+)') AS INTEGER),
+               h.created_at
+        FROM card_history h
+        WHERE h.action = 'created'
+          AND h.details ~ '"column_id": [0-9]+'
+    """))
+    
+    # 2. Перемещения: "Перемещена из колонки X в колонку Y"
+    # Перемещения внутри одной колонки не меняют стадию и не переносятся
+    print("Перенос записей о перемещениях карточек...")
+    connection.execute(sa.text("""
+        INSERT INTO card_transitions (card_id, from_column_id, to_column_id, created_at)
+        SELECT m.card_id, m.from_column_id, m.to_column_id, m.created_at
+        FROM (
+            SELECT h.card_id,
+                   CAST(substring(h.details from 'из колонки ([0-9]+)') AS INTEGER) AS from_column_id,
+                   CAST(substring(h.details from 'в колонку ([0-9]+)') AS INTEGER) AS to_column_id,
+                   h.created_at
+            FROM card_history h
+            WHERE h.action = 'move'
+              AND h.details ~ 'из колонки [0-9]+ в колонку [0-9]+'
+        ) m
+        WHERE m.from_column_id <> m.to_column_id
+    """))
+    
+    # 3. Карточки без записи о создании: начальная колонка - исходная колонка
+    # первого перемещения либо текущая колонка, время - cards.created_at
+    print("Добавление начальных переходов для карточек без записи о создании...")
+    connection.execute(sa.text("""
+        INSERT INTO card_transitions (card_id, from_column_id, to_column_id, created_at)
+        SELECT c.id, NULL,
+               COALESCE(
+                   (SELECT t.from_column_id FROM card_transitions t
+                    WHERE t.card_id = c.id
+                    ORDER BY t.created_at, t.id
+                    LIMIT 1),
+                   c.column_id
+               ),
+               COALESCE(c.created_at, now())
+        FROM cards c
+        WHERE NOT EXISTS (
+            SELECT 1 FROM card_transitions t
+            WHERE t.card_id = c.id AND t.from_column_id IS NULL
+        )
+    """))
+    
+    total = connection.execute(sa.text("SELECT COUNT(*) FROM card_transitions")).scalar()
+    print(f"Таблица card_transitions заполнена: {total} записей")
+
+
+def downgrade():
+    """
+    Удаляет таблицу card_transitions
+    """
+    op.drop_index('ix_card_transitions_card_id_created_at', table_name='card_transitions')
+    op.drop_table('card_transitions')
@@ -0,0 +1,53 @@
+"""Add daily statistics stage time rollup tables
+
+Revision ID: 014
+Revises: 013
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '014'
+down_revision = '013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """
+    Создает таблицу предварительно агрегированного времени на стадиях по дням.
+    Таблица заполняется фоновой задачей (app/rollups.py), пока она пуста,
+    время считается напрямую по переходам карточек.
+    """
+    op.create_table('statistics_daily_stage_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('column_id', sa.Integer(), nullable=False),
+        sa.Column('assignee_id', sa.Integer(), nullable=True),
+        sa.Column('real_estate_type', sa.String(length=50), nullable=True),
+        sa.Column('rc_mk', sa.String(length=20), nullable=True),
+        sa.Column('rc_zm', sa.String(length=20), nullable=True),
+        sa.Column('hours_sum', sa.Float(), nullable=False),
+        sa.Column('segments_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_statistics_daily_stage_rollups_day'), 'statistics_daily_stage_rollups', ['day'])
+    
+    op.create_table('statistics_rollup_state',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('covered_until', sa.Date(), nullable=False),
+        sa.Column('refreshed_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    """
+    Удаляет таблицы агрегатов статистики
+    """
+    op.drop_table('statistics_rollup_state')
+    op.drop_index(op.f('ix_statistics_daily_stage_rollups_day'), table_name='statistics_daily_stage_rollups')
+    op.drop_table('statistics_daily_stage_rollups')
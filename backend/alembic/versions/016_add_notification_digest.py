@@ -0,0 +1,31 @@
+"""Add per-user notification digest mode
+
+Revision ID: 016
+Revises: 015
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '016'
+down_revision = '015'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """
+    Добавляет пользователям режим уведомлений сводкой: события о назначении
+    согласующим копятся в очереди и отправляются одним сообщением
+    """
+    op.add_column('users', sa.Column('notification_digest', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade():
+    """
+    Удаляет режим уведомлений сводкой
+    """
+    op.drop_column('users', 'notification_digest')
@@ -0,0 +1,32 @@
+"""Add indexes for keyset pagination of comments and card history
+
+Revision ID: 017
+Revises: 016
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '017'
+down_revision = '016'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """
+    Составные индексы для постраничной выдачи комментариев и истории карточки
+    по курсору (created_at, id)
+    """
+    op.create_index('ix_comments_ticket_id_created_at', 'comments', ['ticket_id', 'created_at'])
+    op.create_index('ix_card_history_card_id_created_at', 'card_history', ['card_id', 'created_at'])
+
+
+def downgrade():
+    """
+    Удаляет индексы пагинации
+    """
+    op.drop_index('ix_card_history_card_id_created_at', table_name='card_history')
+    op.drop_index('ix_comments_ticket_id_created_at', table_name='comments')
@@ -0,0 +1,68 @@
+"""Add indexes on foreign keys and filter columns
+
+Revision ID: 018
+Revises: 017
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '018'
+down_revision = '017'
+branch_labels = None
+depends_on = None
+
+
+# (таблица, колонка) - индекс получает имя ix_<таблица>_<колонка>, как у index=True в models.py
+# card_history.card_id и comments.ticket_id покрыты составными индексами из миграции 017
+INDEXES = [
+    ('cards', 'column_id'),     # снимок доски, проверка WIP-лимита
+    ('cards', 'assignee_id'),   # фильтр статистики по исполнителю
+    ('cards', 'approver_id'),
+    ('cards', 'created_by'),
+    ('cards', 'created_at'),    # период статистики
+    ('card_tags', 'tag_id'),    # теги карточек и разбивка статистики по тегам
+]
+
+
+def upgrade():
+    """
+    Создает индексы через CREATE INDEX CONCURRENTLY, чтобы не блокировать запись
+    в таблицы. CONCURRENTLY нельзя выполнять внутри транзакции, поэтому
+    индексы создаются в autocommit-блоке. Если прошлая попытка прервалась,
+    PostgreSQL оставляет невалидный индекс - он удаляется и строится заново.
+    """
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        for table, column in INDEXES:
+            name = f'ix_{table}_{column}'
+            invalid = bind.execute(sa.text("""
+                SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid
+                WHERE c.relname = :name AND NOT i.indisvalid
+            """), {"name": name}).scalar()
+            if invalid:
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
+            op.create_index(
+                name,
+                table,
+                [column],
+                postgresql_concurrently=True,
+                if_not_exists=True
+            )
+
+
+def downgrade():
+    """
+    Удаляет индексы
+    """
+    with op.get_context().autocommit_block():
+        for table, column in reversed(INDEXES):
+            op.drop_index(
+                f'ix_{table}_{column}',
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True
+            )
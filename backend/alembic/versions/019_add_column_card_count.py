@@ -0,0 +1,41 @@
+"""Add denormalized card counter to columns
+
+Revision ID: 019
+Revises: 018
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '019'
+down_revision = '018'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """
+    Добавляет колонкам счетчик карточек для проверки WIP-лимита одним чтением
+    и заполняет его по существующим карточкам
+    """
+    op.add_column('columns',
+        sa.Column('card_count',
+                  sa.Integer(),
+                  nullable=False,
+                  server_default='0',
+                  comment='Количество карточек в колонке (app/columns.py)')
+    )
+    op.execute("""
+        UPDATE columns c
+        SET card_count = (SELECT COUNT(*) FROM cards WHERE cards.column_id = c.id)
+    """)
+
+
+def downgrade():
+    """
+    Удаляет счетчик карточек
+    """
+    op.drop_column('columns', 'card_count')
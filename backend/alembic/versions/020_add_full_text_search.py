@@ -0,0 +1,94 @@
+"""Add full-text search vectors to cards and comments
+
+Revision ID: 020
+Revises: 019
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '020'
+down_revision = '019'
+branch_labels = None
+depends_on = None
+
+
+# Русская конфигурация стеммит кириллицу, английская - латиницу с английскими стоп-словами.
+# Название весит больше описания (A > B), номер тикета индексируется как есть
+CARDS_SEARCH_VECTOR = """
+    setweight(to_tsvector('simple'::regconfig, coalesce(ticket_number, '')), 'A') ||
+    setweight(to_tsvector('russian'::regconfig, coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english'::regconfig, coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('russian'::regconfig, coalesce(description, '')), 'B') ||
+    setweight(to_tsvector('english'::regconfig, coalesce(description, '')), 'B')
+"""
+
+COMMENTS_SEARCH_VECTOR = """
+    to_tsvector('russian'::regconfig, coalesce(content, '')) ||
+    to_tsvector('english'::regconfig, coalesce(content, ''))
+"""
+
+# (индекс, таблица)
+INDEXES = [
+    ('ix_cards_search_vector', 'cards'),
+    ('ix_comments_search_vector', 'comments'),
+]
+
+
+def upgrade():
+    """
+    Добавляет вычисляемые (GENERATED ... STORED) колонки search_vector: PostgreSQL
+    пересчитывает их при любой записи карточки или комментария, включая массовые
+    UPDATE и импорт. Добавление колонки переписывает таблицу, поэтому миграцию
+    лучше выполнять в окно обслуживания. GIN-индексы строятся CONCURRENTLY.
+    """
+    op.add_column('cards',
+        sa.Column('search_vector',
+                  postgresql.TSVECTOR(),
+                  sa.Computed(CARDS_SEARCH_VECTOR, persisted=True),
+                  comment='Полнотекстовый вектор номера, названия и описания (app/search.py)')
+    )
+    op.add_column('comments',
+        sa.Column('search_vector',
+                  postgresql.TSVECTOR(),
+                  sa.Computed(COMMENTS_SEARCH_VECTOR, persisted=True),
+                  comment='Полнотекстовый вектор текста комментария (app/search.py)')
+    )
+
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        for name, table in INDEXES:
+            invalid = bind.execute(sa.text("""
+                SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid
+                WHERE c.relname = :name AND NOT i.indisvalid
+            """), {"name": name}).scalar()
+            if invalid:
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
+            op.create_index(
+                name,
+                table,
+                ['search_vector'],
+                postgresql_using='gin',
+                postgresql_concurrently=True,
+                if_not_exists=True
+            )
+
+
+def downgrade():
+    """
+    Удаляет индексы и колонки полнотекстового поиска
+    """
+    with op.get_context().autocommit_block():
+        for name, table in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True
+            )
+    op.drop_column('comments', 'search_vector')
+    op.drop_column('cards', 'search_vector')
@@ -0,0 +1,47 @@
+"""
+Асинхронный доступ к базе данных (SQLAlchemy asyncio + asyncpg)
+
+Используется горячими эндпоинтами, чтобы запросы к БД не блокировали event loop.
+Синхронный движок из database.py остается для остальных эндпоинтов, миграций и фоновых задач.
+Готовый синхронный код (например, build_board_snapshot) выполняется на асинхронном
+соединении через AsyncSession.run_sync без блокировки event loop.
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from .config import settings
+from .database import instrument_engine
+
+
+def get_async_database_url() -> str:
+    """URL базы данных с асинхронным драйвером asyncpg"""
+    url = settings.get_database_url()
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+
+async_engine = create_async_engine(
+    get_async_database_url(),
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle,
+    pool_pre_ping=settings.db_pool_pre_ping,
+)
+instrument_engine(async_engine.sync_engine)
+
+# expire_on_commit=False: после commit объекты остаются доступны без повторной (ленивой) загрузки,
+# которая в асинхронном режиме невозможна
+AsyncSessionLocal = sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
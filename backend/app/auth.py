@@ -4,9 +4,12 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from . import models, schemas
 from .database import get_db
+from .async_database import get_async_db
 from .config import settings
 import logging
 
@@ -22,9 +25,8 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Проверка пароля"""
-    logger.info(f"Проверка пароля: plain={plain_password}, hash={hashed_password}")
     result = pwd_context.verify(plain_password, hashed_password)
-    logger.info(f"Результат проверки: {result}")
+    logger.debug("Результат проверки пароля: %s", result)
     return result
 
 def get_password_hash(password: str) -> str:
@@ -66,6 +68,30 @@ async def get_current_user(
         raise credentials_exception
     return user
 
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+) -> models.User:
+    """Получение текущего пользователя по токену через асинхронную сессию"""
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Не удалось проверить учетные данные",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        username: str = payload.get("sub")
+        if username is None:
+            raise credentials_exception
+    except JWTError:
+        raise credentials_exception
+    
+    result = await db.execute(select(models.User).filter(models.User.username == username))
+    user = result.scalars().first()
+    if user is None:
+        raise credentials_exception
+    return user
+
 def authenticate_user(db: Session, username: str, password: str) -> Optional[models.User]:
     """Аутентификация пользователя"""
     user = db.query(models.User).filter(models.User.username == username).first()
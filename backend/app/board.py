@@ -0,0 +1,235 @@
+"""
+Загрузка снимка канбан-доски (колонки, карточки, пользователи, теги)
+за фиксированное количество запросов к базе данных
+
+Фильтры доски (BoardFilters) применяются в SQL: в ответ попадают только
+подходящие карточки, а общее количество карточек колонки берется из счетчика
+columns.card_count.
+"""
+
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event, or_, select
+from sqlalchemy.orm import Session, selectinload, joinedload
+from . import models
+# Бюджет запросов снимка доски объявлен вместе с бюджетами маршрутов
+from .query_inspector import BOARD_SNAPSHOT_MAX_QUERIES
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCounter:
+    """Счетчик SQL-запросов, выполненных через соединение сессии"""
+
+    def __init__(self):
+        self.count = 0
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+@contextmanager
+def count_queries(db: Session):
+    """
+    Считает SQL-запросы, выполненные в рамках блока через соединение сессии
+
+    Пример:
+        with count_queries(db) as counter:
+            ...
+        counter.count
+    """
+    counter = QueryCounter()
+    connection = db.connection()
+    event.listen(connection, "before_cursor_execute", counter._before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(connection, "before_cursor_execute", counter._before_cursor_execute)
+
+
+def serialize_user(user: models.User) -> dict:
+    """Сериализует пользователя в формат ответа API"""
+    return {
+        "id": user.id,
+        "username": user.username,
+        "telegram": user.telegram,
+        "role": user.role,
+        "is_active": user.is_active,
+        "created_at": user.created_at,
+        "email": user.email
+    }
+
+
+def serialize_tag(tag: models.Tag) -> dict:
+    """Сериализует тег в формат ответа API"""
+    return {"id": tag.id, "name": tag.name, "created_at": tag.created_at}
+
+
+def serialize_board_card(card: models.Card) -> dict:
+    """Сериализует карточку в формат, который возвращает GET /api/columns"""
+    card_data = {
+        "id": card.id,
+        "title": card.title,
+        "description": card.description,
+        "position": card.position,
+        "story_points": card.story_points,
+        "column_id": card.column_id,
+        "assignee_id": card.assignee_id,
+        "approver_id": card.approver_id,
+        "real_estate_type": card.real_estate_type,
+        "rc_mk": card.rc_mk,
+        "rc_zm": card.rc_zm,
+        "created_at": card.created_at,
+        "updated_at": card.updated_at,
+        "tags": [serialize_tag(tag) for tag in card.tags]
+    }
+
+    if card.assignee:
+        card_data["assignee"] = serialize_user(card.assignee)
+
+    if card.approver:
+        card_data["approver"] = serialize_user(card.approver)
+
+    return card_data
+
+
+class BoardFilters:
+    """Фильтры карточек доски; enum-поля передаются именами констант (OFFICE, CENTR)"""
+
+    def __init__(
+        self,
+        assignee_id: Optional[int] = None,
+        tag_id: Optional[int] = None,
+        real_estate_type: Optional[str] = None,
+        rc_mk: Optional[str] = None,
+        rc_zm: Optional[str] = None,
+        search: Optional[str] = None
+    ):
+        """
+        Raises:
+            ValueError: если константа enum неизвестна
+        """
+        self.assignee_id = assignee_id
+        self.tag_id = tag_id
+        self.real_estate_type = self._enum_value(models.RealEstateType, "real_estate_type", real_estate_type)
+        self.rc_mk = self._enum_value(models.RCType, "rc_mk", rc_mk)
+        self.rc_zm = self._enum_value(models.RCType, "rc_zm", rc_zm)
+        self.search = search.strip() if search and search.strip() else None
+
+    @staticmethod
+    def _enum_value(enum_class, field: str, name: Optional[str]) -> Optional[str]:
+        if not name:
+            return None
+        try:
+            return enum_class[name].value
+        except KeyError:
+            raise ValueError(f"Неизвестное значение поля {field}: {name}")
+
+    def is_empty(self) -> bool:
+        return not any((self.assignee_id, self.tag_id, self.real_estate_type, self.rc_mk, self.rc_zm, self.search))
+
+    def key(self) -> tuple:
+        """Нормализованные значения фильтров (для объединения одинаковых запросов)"""
+        return (self.assignee_id, self.tag_id, self.real_estate_type, self.rc_mk, self.rc_zm, self.search)
+
+    def apply(self, query):
+        """Добавить условия фильтров к запросу по карточкам"""
+        if self.assignee_id:
+            query = query.filter(models.Card.assignee_id == self.assignee_id)
+        if self.tag_id:
+            query = query.filter(models.Card.id.in_(
+                select(models.CardTag.card_id).where(models.CardTag.tag_id == self.tag_id)
+            ))
+        if self.real_estate_type:
+            query = query.filter(models.Card.real_estate_type == self.real_estate_type)
+        if self.rc_mk:
+            query = query.filter(models.Card.rc_mk == self.rc_mk)
+        if self.rc_zm:
+            query = query.filter(models.Card.rc_zm == self.rc_zm)
+        if self.search:
+            pattern = "%" + escape_like(self.search) + "%"
+            query = query.filter(or_(
+                models.Card.title.ilike(pattern, escape="\\"),
+                models.Card.description.ilike(pattern, escape="\\"),
+            ))
+        return query
+
+
+def escape_like(value: str) -> str:
+    """Экранировать спецсимволы LIKE, чтобы строка поиска искалась буквально"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def load_filtered_board(db: Session, filters: BoardFilters) -> Tuple[List[models.KanbanColumn], Dict[int, List[models.Card]]]:
+    """
+    Загружает колонки и только подходящие под фильтры карточки
+    (колонки, карточки с исполнителями и согласующими, теги - три запроса).
+    """
+    columns = db.query(models.KanbanColumn).order_by(models.KanbanColumn.position).all()
+    cards = (
+        filters.apply(db.query(models.Card))
+        .options(
+            joinedload(models.Card.assignee),
+            joinedload(models.Card.approver),
+            selectinload(models.Card.tags),
+        )
+        .order_by(models.Card.column_id, models.Card.position, models.Card.id)
+        .all()
+    )
+    cards_by_column: Dict[int, List[models.Card]] = {column.id: [] for column in columns}
+    for card in cards:
+        cards_by_column.setdefault(card.column_id, []).append(card)
+    return columns, cards_by_column
+
+
+def load_board_columns(db: Session) -> List[models.KanbanColumn]:
+    """
+    Загружает колонки доски вместе с карточками, исполнителями, согласующими и тегами.
+    Связи из models.py подгружаются жадно, поэтому количество запросов
+    не зависит от количества карточек.
+    """
+    return (
+        db.query(models.KanbanColumn)
+        .options(
+            selectinload(models.KanbanColumn.cards).options(
+                joinedload(models.Card.assignee),
+                joinedload(models.Card.approver),
+                selectinload(models.Card.tags),
+            )
+        )
+        .order_by(models.KanbanColumn.position)
+        .all()
+    )
+
+
+def serialize_board_column(column: models.KanbanColumn, cards: List[models.Card], cards_count: int) -> dict:
+    """Сериализует колонку доски; cards_count - все карточки колонки, matched_count - вернувшиеся в ответе"""
+    return {
+        "id": column.id,
+        "title": column.title,
+        "position": column.position,
+        "color": column.color,
+        "wip_limit": column.wip_limit,
+        "cards_count": cards_count,
+        "matched_count": len(cards),
+        "cards": [serialize_board_card(card) for card in cards]
+    }
+
+
+def build_board_snapshot(db: Session, filters: Optional[BoardFilters] = None) -> List[dict]:
+    """
+    Строит снимок доски в формате ответа GET /api/columns.
+    Выполняет не более BOARD_SNAPSHOT_MAX_QUERIES запросов.
+    """
+    if filters is not None and not filters.is_empty():
+        columns, cards_by_column = load_filtered_board(db, filters)
+        return [
+            serialize_board_column(column, cards_by_column[column.id], column.card_count)
+            for column in columns
+        ]
+
+    return [
+        serialize_board_column(column, column.cards, len(column.cards))
+        for column in load_board_columns(db)
+    ]
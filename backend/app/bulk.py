@@ -0,0 +1,225 @@
+"""
+Массовые операции с карточками: перемещение, изменение полей и удаление
+
+Вся пачка выполняется в одной транзакции: карточки блокируются одним запросом,
+изменения применяются одним UPDATE/DELETE на пачку, WIP-лимит проверяется один
+раз на колонку, а записи истории вставляются одним executemany. Ошибки
+отдельных карточек (нет такой карточки, исчерпан WIP-лимит) не прерывают
+остальные и возвращаются в ответе.
+"""
+
+import json
+from collections import Counter
+from typing import Dict, List, Optional
+from sqlalchemy.orm import Session
+from . import models
+from .columns import lock_columns, has_wip_capacity, adjust_card_count
+from .notifications import enqueue_approver_change
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Поля карточки, которые в запросах передаются именами констант enum, а в базе хранятся значениями
+ENUM_FIELDS = {
+    "real_estate_type": models.RealEstateType,
+    "rc_mk": models.RCType,
+    "rc_zm": models.RCType,
+}
+
+
+class BulkResult:
+    """Результат массовой операции по каждой карточке"""
+
+    def __init__(self):
+        self.succeeded: List[int] = []
+        self.errors: List[dict] = []
+
+    def fail(self, card_id: int, detail: str):
+        self.errors.append({"card_id": card_id, "detail": detail})
+
+    def to_dict(self) -> dict:
+        return {
+            "succeeded": self.succeeded,
+            "succeeded_count": len(self.succeeded),
+            "errors": self.errors,
+            "errors_count": len(self.errors)
+        }
+
+
+def convert_card_values(changes: dict) -> dict:
+    """
+    Привести поля запроса к значениям колонок карточки: константы enum
+    (OFFICE, CENTR) заменяются значениями ("офис", "Центр"). Пустые значения
+    enum-полей пропускаются, как и при изменении одной карточки.
+
+    Raises:
+        ValueError: если константа enum неизвестна
+    """
+    values = {}
+    for key, value in changes.items():
+        if key in ENUM_FIELDS:
+            if not value:
+                continue
+            try:
+                value = ENUM_FIELDS[key][value].value
+            except KeyError:
+                raise ValueError(f"Неизвестное значение поля {key}: {value}")
+        values[key] = value
+    return values
+
+
+def _lock_cards(db: Session, card_ids: List[int], result: BulkResult) -> Dict[int, tuple]:
+    """
+    Заблокировать карточки пачки одним запросом.
+    Строки блокируются в порядке id и до колонок - в том же порядке, что и в
+    одиночных операциях (columns.lock_card, затем колонки), поэтому пересекающиеся
+    пачки и одиночные операции ждут друг друга, а не взаимоблокируются.
+    Возвращает {id: (id, column_id, approver_id)}; отсутствующие карточки попадают в ошибки.
+    """
+    requested = list(dict.fromkeys(card_ids))
+    rows = (
+        db.query(models.Card.id, models.Card.column_id, models.Card.approver_id)
+        .filter(models.Card.id.in_(requested))
+        .order_by(models.Card.id)
+        .with_for_update()
+        .all()
+    )
+    cards = {row.id: row for row in rows}
+    for card_id in requested:
+        if card_id not in cards:
+            result.fail(card_id, "Карточка не найдена")
+    return cards
+
+
+def _insert_history(db: Session, entries: List[dict]):
+    """Вставить записи истории одним executemany"""
+    if entries:
+        db.execute(models.CardHistory.__table__.insert(), entries)
+
+
+def bulk_move_cards(db: Session, card_ids: List[int], to_column: models.KanbanColumn) -> BulkResult:
+    """
+    Переместить карточки в колонку. WIP-лимит проверяется один раз на всю пачку:
+    если все перемещаемые карточки в колонку не помещаются, не перемещается ни одна.
+    """
+    result = BulkResult()
+    cards = _lock_cards(db, card_ids, result)
+    moving = [card for card in cards.values() if card.column_id != to_column.id]
+    staying = [card.id for card in cards.values() if card.column_id == to_column.id]
+
+    if moving:
+        locked = lock_columns(db, {card.column_id for card in moving} | {to_column.id})
+        if not has_wip_capacity(locked[to_column.id], len(moving)):
+            for card in moving:
+                result.fail(card.id, f"Исчерпан WIP лимит задач в колонке '{to_column.title}'")
+            moving = []
+
+    if moving:
+        moving_ids = [card.id for card in moving]
+        db.query(models.Card)\
+            .filter(models.Card.id.in_(moving_ids))\
+            .update({models.Card.column_id: to_column.id}, synchronize_session=False)
+
+        for from_column_id, count in Counter(card.column_id for card in moving).items():
+            adjust_card_count(db, from_column_id, -count)
+        adjust_card_count(db, to_column.id, len(moving))
+
+        _insert_history(db, [
+            {
+                "card_id": card.id,
+                "action": "move",
+                "details": f"Перемещена из колонки {card.column_id} в колонку {to_column.id}"
+            }
+            for card in moving
+        ])
+        db.execute(models.CardTransition.__table__.insert(), [
+            {"card_id": card.id, "from_column_id": card.column_id, "to_column_id": to_column.id}
+            for card in moving
+        ])
+        result.succeeded.extend(moving_ids)
+
+    result.succeeded.extend(staying)
+    return result
+
+
+def bulk_update_cards(
+    db: Session,
+    card_ids: List[int],
+    values: dict,
+    tags: Optional[List[models.Tag]],
+    history_details: dict
+) -> BulkResult:
+    """
+    Применить одинаковые изменения ко всем карточкам пачки.
+
+    Args:
+        values: значения колонок карточки (уже приведенные к формату базы данных)
+        tags: новый набор тегов (None - теги не меняются)
+        history_details: изменения в формате запроса для записи в историю
+    """
+    result = BulkResult()
+    cards = _lock_cards(db, card_ids, result)
+    ids = list(cards)
+    if not ids:
+        return result
+
+    if values:
+        db.query(models.Card)\
+            .filter(models.Card.id.in_(ids))\
+            .update(values, synchronize_session=False)
+
+    if tags is not None:
+        db.query(models.CardTag)\
+            .filter(models.CardTag.card_id.in_(ids))\
+            .delete(synchronize_session=False)
+        if tags:
+            db.execute(models.CardTag.__table__.insert(), [
+                {"card_id": card_id, "tag_id": tag.id}
+                for card_id in ids
+                for tag in tags
+            ])
+
+    if "approver_id" in values:
+        _enqueue_approver_changes(db, cards, values["approver_id"])
+
+    details = json.dumps(history_details)
+    _insert_history(db, [{"card_id": card_id, "action": "updated", "details": details} for card_id in ids])
+    result.succeeded.extend(ids)
+    return result
+
+
+def _enqueue_approver_changes(db: Session, cards: Dict[int, tuple], new_approver_id: Optional[int]):
+    """Поставить в очередь уведомления для карточек, у которых сменился согласующий"""
+    changed_ids = [card.id for card in cards.values() if card.approver_id != new_approver_id]
+    if not changed_ids:
+        return
+    user_ids = {cards[card_id].approver_id for card_id in changed_ids} | {new_approver_id}
+    users = {
+        user.id: user
+        for user in db.query(models.User).filter(models.User.id.in_(user_ids - {None})).all()
+    }
+    for card in db.query(models.Card).filter(models.Card.id.in_(changed_ids)).all():
+        enqueue_approver_change(db, users.get(cards[card.id].approver_id), users.get(new_approver_id), card)
+
+
+def bulk_delete_cards(db: Session, card_ids: List[int]) -> BulkResult:
+    """
+    Удалить карточки одним DELETE. Теги, история, комментарии и переходы
+    удаляются каскадом на уровне базы данных.
+    """
+    result = BulkResult()
+    cards = _lock_cards(db, card_ids, result)
+    ids = list(cards)
+    if not ids:
+        return result
+
+    column_counts = Counter(card.column_id for card in cards.values())
+    lock_columns(db, column_counts)
+    db.query(models.Card)\
+        .filter(models.Card.id.in_(ids))\
+        .delete(synchronize_session=False)
+    for column_id, count in column_counts.items():
+        adjust_card_count(db, column_id, -count)
+
+    result.succeeded.extend(ids)
+    return result
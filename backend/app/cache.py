@@ -0,0 +1,87 @@
+"""
+Версионированный in-process кеш снимка канбан-доски
+"""
+
+import threading
+from typing import NamedTuple, Optional
+from .config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CachedBoard(NamedTuple):
+    """Готовый к отправке снимок доски"""
+    body: bytes
+    etag: str
+
+
+class BoardCache:
+    """
+    Хранит JSON-ответ GET /api/columns и его ETag под монотонно растущей версией доски.
+
+    Любое изменение доски вызывает bump_version(), после чего сохраненный снимок
+    считается устаревшим. Снимок, построенный во время конкурентной записи,
+    не сохраняется: store() принимает версию, прочитанную до построения.
+    Кеш живет в памяти процесса, поэтому каждый воркер uvicorn держит свою копию.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._version = 0
+        self._payload: Optional[CachedBoard] = None
+        self._payload_version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def version(self) -> int:
+        """Текущая версия доски"""
+        return self._version
+
+    def get(self) -> Optional[CachedBoard]:
+        """Вернуть снимок доски, если он актуален для текущей версии"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            if self._payload is not None and self._payload_version == self._version:
+                self.hits += 1
+                return self._payload
+            self.misses += 1
+            return None
+
+    def store(self, version: int, payload: CachedBoard) -> None:
+        """Сохранить снимок, построенный для версии version"""
+        if not self.enabled:
+            return
+        with self._lock:
+            # Пока строился снимок, доска могла измениться - такой снимок не сохраняем
+            if version != self._version:
+                return
+            self._payload = payload
+            self._payload_version = version
+
+    def bump_version(self) -> int:
+        """Отметить изменение доски и сбросить сохраненный снимок"""
+        with self._lock:
+            self._version += 1
+            self._payload = None
+            self._payload_version = None
+            return self._version
+
+    def stats(self) -> dict:
+        """Статистика кеша для отладки"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "version": self._version,
+                "cached": self._payload is not None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0
+            }
+
+
+board_cache = BoardCache(enabled=settings.board_cache_enabled)
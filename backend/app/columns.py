@@ -0,0 +1,120 @@
+"""
+Счетчик карточек в колонках (columns.card_count) и проверка WIP-лимитов
+
+Счетчик меняется в той же транзакции, что и создание, перемещение и удаление
+карточки. Перед проверкой лимита строка колонки блокируется (SELECT ... FOR UPDATE),
+поэтому два параллельных перемещения не могут одновременно пройти проверку
+на последнее свободное место. Колонки блокируются в порядке id, чтобы встречные
+перемещения между двумя колонками не приводили к взаимной блокировке.
+
+Единый порядок блокировок во всех операциях: сначала строки карточек (lock_card,
+массовые операции - в порядке id), затем колонки. Колонку карточки можно читать
+только после блокировки карточки: иначе два одновременных перемещения одной
+карточки увидят одну и ту же исходную колонку и собьют счетчики.
+
+Пересчет счетчиков с нуля: python -m app.columns
+"""
+
+from typing import Dict, Iterable, Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from . import models
+from .database import SessionLocal
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def lock_card(db: Session, card_id: int) -> Optional[models.Card]:
+    """Заблокировать строку карточки до конца транзакции и вернуть ее со свежими полями"""
+    return (
+        db.query(models.Card)
+        .filter(models.Card.id == card_id)
+        .with_for_update()
+        .populate_existing()
+        .first()
+    )
+
+
+def lock_columns(db: Session, column_ids: Iterable[int]) -> Dict[int, models.KanbanColumn]:
+    """Заблокировать строки колонок до конца транзакции и вернуть их со свежими счетчиками"""
+    ids = sorted({column_id for column_id in column_ids if column_id is not None})
+    if not ids:
+        return {}
+    columns = (
+        db.query(models.KanbanColumn)
+        .filter(models.KanbanColumn.id.in_(ids))
+        .order_by(models.KanbanColumn.id)
+        .with_for_update()
+        .populate_existing()
+        .all()
+    )
+    return {column.id: column for column in columns}
+
+
+def has_wip_capacity(column: models.KanbanColumn, incoming: int = 1) -> bool:
+    """Поместятся ли в колонку еще incoming карточек с учетом WIP-лимита"""
+    if column.wip_limit is None:
+        return True
+    return column.card_count + incoming <= column.wip_limit
+
+
+def check_wip_limit(db: Session, column_id: int) -> bool:
+    """
+    Проверить, можно ли добавить карточку в колонку (не превышен ли WIP лимит).
+    Строка колонки остается заблокированной до конца транзакции.
+    """
+    try:
+        column = lock_columns(db, [column_id]).get(column_id)
+        if not column:
+            return True  # Если колонка не найдена, разрешаем (будет ошибка позже)
+        return has_wip_capacity(column)
+    except Exception as e:
+        logger.error("Ошибка при проверке WIP лимита для колонки %s: %s", column_id, e)
+        return True  # В случае ошибки разрешаем (не блокируем пользователя)
+
+
+def adjust_card_count(db: Session, column_id: int, delta: int):
+    """Изменить счетчик карточек колонки в текущей транзакции"""
+    if not delta:
+        return
+    db.query(models.KanbanColumn)\
+        .filter(models.KanbanColumn.id == column_id)\
+        .update(
+            {models.KanbanColumn.card_count: models.KanbanColumn.card_count + delta},
+            synchronize_session="fetch"
+        )
+
+
+def recount_card_counts(db: Session) -> int:
+    """
+    Пересчитать счетчики всех колонок по таблице карточек.
+
+    Returns:
+        int: количество колонок, у которых счетчик был неверным
+    """
+    fixed = db.execute(text("""
+        UPDATE columns c
+        SET card_count = actual.count
+        FROM (
+            SELECT col.id, COUNT(cards.id) AS count
+            FROM columns col
+            LEFT JOIN cards ON cards.column_id = col.id
+            GROUP BY col.id
+        ) actual
+        WHERE actual.id = c.id AND c.card_count <> actual.count
+    """)).rowcount
+    db.commit()
+    if fixed:
+        logger.warning("Счетчики карточек исправлены в %s колонках", fixed)
+    else:
+        logger.info("Счетчики карточек во всех колонках верны")
+    return fixed
+
+
+if __name__ == "__main__":
+    session = SessionLocal()
+    try:
+        recount_card_counts(session)
+    finally:
+        session.close()
@@ -25,6 +25,44 @@ class Settings(BaseSettings):
         description="URL подключения к PostgreSQL базе данных"
     )
     
+    # Пул соединений с базой данных
+    db_pool_size: int = Field(
+        default=5,
+        env="DB_POOL_SIZE",
+        ge=1,
+        le=100,
+        description="Количество постоянных соединений в пуле на один воркер"
+    )
+    
+    db_max_overflow: int = Field(
+        default=10,
+        env="DB_MAX_OVERFLOW",
+        ge=0,
+        le=100,
+        description="Сколько соединений можно открыть сверх размера пула при пиковой нагрузке"
+    )
+    
+    db_pool_timeout: int = Field(
+        default=30,
+        env="DB_POOL_TIMEOUT",
+        ge=1,
+        le=300,
+        description="Сколько секунд ждать свободного соединения из пула"
+    )
+    
+    db_pool_recycle: int = Field(
+        default=1800,
+        env="DB_POOL_RECYCLE",
+        ge=-1,
+        description="Через сколько секунд пересоздавать соединение (-1 - не пересоздавать)"
+    )
+    
+    db_pool_pre_ping: bool = Field(
+        default=True,
+        env="DB_POOL_PRE_PING",
+        description="Проверять соединение перед выдачей из пула"
+    )
+    
     # Администратор
     admin_username: str = Field(
         default="admin",
@@ -56,6 +94,52 @@ class Settings(BaseSettings):
         description="Токен Telegram бота (опционально)"
     )
     
+    telegram_api_base_url: str = Field(
+        default="https://api.telegram.org",
+        env="TELEGRAM_API_BASE_URL",
+        description="Базовый URL Telegram Bot API (для локальной заглушки в тестах)"
+    )
+    
+    telegram_rate_limit_per_second: float = Field(
+        default=25,
+        gt=0,
+        le=30,
+        env="TELEGRAM_RATE_LIMIT_PER_SECOND",
+        description="Максимум сообщений в секунду от бота (лимит Telegram - 30)"
+    )
+    
+    notification_poll_interval_seconds: int = Field(
+        default=5,
+        env="NOTIFICATION_POLL_INTERVAL_SECONDS",
+        ge=0,
+        le=3600,
+        description="Интервал разбора очереди уведомлений в секундах (0 - фоновая отправка отключена)"
+    )
+    
+    notification_max_attempts: int = Field(
+        default=8,
+        env="NOTIFICATION_MAX_ATTEMPTS",
+        ge=1,
+        le=50,
+        description="Сколько раз пытаться отправить уведомление, прежде чем пометить его ошибочным"
+    )
+    
+    notification_digest_window_minutes: int = Field(
+        default=15,
+        env="NOTIFICATION_DIGEST_WINDOW_MINUTES",
+        ge=1,
+        le=1440,
+        description="Сколько минут копить уведомления для пользователей в режиме сводки"
+    )
+    
+    notification_retention_days: int = Field(
+        default=7,
+        env="NOTIFICATION_RETENTION_DAYS",
+        ge=0,
+        le=3650,
+        description="Сколько дней хранить отправленные и объединенные записи очереди уведомлений (0 - не удалять)"
+    )
+    
     # Настройки приложения
     app_name: str = Field(
         default="Kanban Tracker",
@@ -69,6 +153,108 @@ class Settings(BaseSettings):
         description="Режим отладки"
     )
     
+    # Логирование
+    log_level: str = Field(
+        default="INFO",
+        env="LOG_LEVEL",
+        description="Уровень логирования приложения"
+    )
+    
+    log_format: str = Field(
+        default="text",
+        env="LOG_FORMAT",
+        description="Формат логов: text или json (одна JSON-строка на сообщение)"
+    )
+    
+    log_module_levels: str = Field(
+        default="",
+        env="LOG_MODULE_LEVELS",
+        description="Уровни отдельных модулей через запятую: app.main=DEBUG,sqlalchemy.engine=INFO"
+    )
+    
+    log_debug_sample_burst: int = Field(
+        default=20,
+        env="LOG_DEBUG_SAMPLE_BURST",
+        ge=0,
+        description="Сколько DEBUG-сообщений с одного места вызова пропускается за окно (0 - без ограничения)"
+    )
+    
+    log_debug_sample_window_seconds: float = Field(
+        default=60,
+        env="LOG_DEBUG_SAMPLE_WINDOW_SECONDS",
+        gt=0,
+        description="Окно ограничения DEBUG-сообщений в секундах"
+    )
+    
+    # Производительность
+    board_cache_enabled: bool = Field(
+        default=True,
+        env="BOARD_CACHE_ENABLED",
+        description="Кешировать снимок доски в памяти процесса (отключите для отладки)"
+    )
+    
+    board_events_backend: str = Field(
+        default="memory",
+        env="BOARD_EVENTS_BACKEND",
+        description="Доставка событий доски: memory (один воркер) или postgres (LISTEN/NOTIFY)"
+    )
+    
+    statistics_rollup_interval_minutes: int = Field(
+        default=60,
+        env="STATISTICS_ROLLUP_INTERVAL_MINUTES",
+        ge=0,
+        le=1440,
+        description="Интервал пересчета дневных агрегатов статистики в минутах (0 - отключено)"
+    )
+    
+    export_fetch_size: int = Field(
+        default=1000,
+        env="EXPORT_FETCH_SIZE",
+        ge=100,
+        le=50000,
+        description="Сколько строк выгрузки читается из серверного курсора за раз"
+    )
+    
+    metrics_server_timing: bool = Field(
+        default=False,
+        env="METRICS_SERVER_TIMING",
+        description="Добавлять в ответы заголовок Server-Timing (время приложения и БД, количество SQL-запросов)"
+    )
+    
+    query_inspector_enabled: bool = Field(
+        default=False,
+        env="QUERY_INSPECTOR_ENABLED",
+        description="Детектор N+1 и медленных SQL-запросов (всегда включен при DEBUG=true)"
+    )
+    
+    n_plus_one_threshold: int = Field(
+        default=5,
+        env="N_PLUS_ONE_THRESHOLD",
+        ge=2,
+        description="Сколько одинаковых SQL-запросов за HTTP-запрос считается N+1"
+    )
+    
+    slow_query_ms: int = Field(
+        default=200,
+        env="SLOW_QUERY_MS",
+        ge=1,
+        description="Порог медленного SQL-запроса в миллисекундах"
+    )
+    
+    singleflight_enabled: bool = Field(
+        default=True,
+        env="SINGLEFLIGHT_ENABLED",
+        description="Строить снимок доски и статистику один раз для одновременных одинаковых запросов"
+    )
+    
+    singleflight_timeout_seconds: float = Field(
+        default=10.0,
+        env="SINGLEFLIGHT_TIMEOUT_SECONDS",
+        gt=0,
+        le=120,
+        description="Сколько секунд запрос ждет чужое вычисление, прежде чем строить ответ сам"
+    )
+    
     # Безопасность
     secret_key: str = Field(
         default="your-secret-key-change-in-production",
@@ -186,6 +372,31 @@ class Settings(BaseSettings):
         
         return v
     
+    @field_validator('board_events_backend')
+    @classmethod
+    def validate_board_events_backend(cls, v):
+        """Валидация бэкенда событий доски"""
+        if v not in ('memory', 'postgres'):
+            raise ValueError('BOARD_EVENTS_BACKEND должен быть memory или postgres')
+        return v
+    
+    @field_validator('log_level')
+    @classmethod
+    def validate_log_level(cls, v):
+        """Валидация уровня логирования"""
+        v = v.upper()
+        if v not in ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'):
+            raise ValueError('LOG_LEVEL должен быть одним из: DEBUG, INFO, WARNING, ERROR, CRITICAL')
+        return v
+    
+    @field_validator('log_format')
+    @classmethod
+    def validate_log_format(cls, v):
+        """Валидация формата логов"""
+        if v not in ('text', 'json'):
+            raise ValueError('LOG_FORMAT должен быть text или json')
+        return v
+    
     @field_validator('secret_key')
     @classmethod
     def validate_secret_key(cls, v):
@@ -1,27 +1,119 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+import logging
+import threading
 import time
-from loguru import logger
 from .config import settings
+from . import metrics
+
+logger = logging.getLogger(__name__)
 
 # Получаем URL базы данных через валидированную конфигурацию
 SQLALCHEMY_DATABASE_URL = settings.get_database_url()
 
+
+class PoolStats:
+    """Счетчики пула соединений: выдачи, возвраты, ожидание свободного соединения"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.timeouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.wait_time_total += seconds
+            self.wait_time_max = max(self.wait_time_max, seconds)
+
+    def increment(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self, pool) -> dict:
+        """Текущее состояние пула и накопленные счетчики"""
+        with self._lock:
+            return {
+                "pool_size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": pool.overflow(),
+                "max_overflow": settings.db_max_overflow,
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "timeouts": self.timeouts,
+                "wait_time_total_seconds": round(self.wait_time_total, 6),
+                "wait_time_avg_seconds": round(self.wait_time_total / self.checkouts, 6) if self.checkouts else 0,
+                "wait_time_max_seconds": round(self.wait_time_max, 6),
+            }
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool, который замеряет время ожидания свободного соединения"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            pool_stats.increment("timeouts")
+            raise
+        finally:
+            pool_stats.record_wait(time.perf_counter() - started)
+
+
+def instrument_engine(db_engine):
+    """Подключить учет SQL-запросов и времени в БД по HTTP-запросам (app/metrics.py)"""
+    event.listen(db_engine, "before_cursor_execute", metrics.before_cursor_execute)
+    event.listen(db_engine, "after_cursor_execute", metrics.after_cursor_execute)
+    event.listen(db_engine, "handle_error", metrics.handle_error)
+
+
+def create_db_engine():
+    """Создать движок с настройками пула из конфигурации"""
+    db_engine = create_engine(
+        SQLALCHEMY_DATABASE_URL,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+    )
+    event.listen(db_engine, "connect", lambda *args: pool_stats.increment("connects"))
+    event.listen(db_engine, "checkout", lambda *args: pool_stats.increment("checkouts"))
+    event.listen(db_engine, "checkin", lambda *args: pool_stats.increment("checkins"))
+    instrument_engine(db_engine)
+    return db_engine
+
+
 # Функция для проверки подключения к базе данных
 def wait_for_db(max_retries=5, retry_interval=5):
+    db_engine = create_db_engine()
     for i in range(max_retries):
         try:
-            engine = create_engine(SQLALCHEMY_DATABASE_URL)
-            engine.connect()
+            with db_engine.connect():
+                pass
             logger.info("Успешное подключение к базе данных")
-            return engine
+            return db_engine
         except Exception as e:
+            # Сбрасываем соединения неудачной попытки, движок переиспользуем
+            db_engine.dispose()
             if i < max_retries - 1:
-                logger.warning(f"Попытка подключения к базе данных {i + 1} из {max_retries} не удалась: {str(e)}")
+                logger.warning("Попытка подключения к базе данных %s из %s не удалась: %s", i + 1, max_retries, e)
                 time.sleep(retry_interval)
             else:
-                logger.error(f"Не удалось подключиться к базе данных после {max_retries} попыток")
+                logger.error("Не удалось подключиться к базе данных после %s попыток", max_retries)
                 raise
 
 # Создаем движок с повторными попытками подключения
@@ -35,4 +127,8 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+def get_pool_stats() -> dict:
+    """Статистика пула соединений основного движка"""
+    return pool_stats.snapshot(engine.pool)
@@ -0,0 +1,59 @@
+"""
+Поддержка ETag / If-None-Match для эндпоинтов чтения
+"""
+
+import hashlib
+from typing import Any, Optional
+from fastapi import Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+# Браузер хранит ответ, но перед использованием обязан перепроверить его у сервера
+ETAG_CACHE_CONTROL = "no-cache"
+
+
+def render_json(payload: Any) -> bytes:
+    """Сериализовать данные в JSON так же, как это делает JSONResponse"""
+    return JSONResponse(content=jsonable_encoder(payload)).body
+
+
+def etag_for_body(body: bytes) -> str:
+    """Сильный ETag по содержимому тела ответа"""
+    return f'"{hashlib.sha1(body).hexdigest()}"'
+
+
+def etag_for_version(*parts: Any) -> str:
+    """Сильный ETag по версии данных (например, количеству и максимальному id записей)"""
+    version = ":".join(str(part) for part in parts)
+    return f'"{hashlib.sha1(version.encode("utf-8")).hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Проверить, совпадает ли ETag с одним из значений заголовка If-None-Match"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Для If-None-Match используется слабое сравнение: префикс W/ игнорируется
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def not_modified_response(etag: str, headers: Optional[dict] = None) -> Response:
+    """Ответ 304 Not Modified без тела"""
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": ETAG_CACHE_CONTROL, **(headers or {})}
+    )
+
+
+def json_response_with_etag(request: Request, body: bytes, etag: str, headers: Optional[dict] = None) -> Response:
+    """Вернуть 304, если клиент уже имеет эту версию, иначе готовое JSON-тело с ETag"""
+    if etag_matches(request, etag):
+        return not_modified_response(etag, headers)
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": ETAG_CACHE_CONTROL, **(headers or {})}
+    )
@@ -0,0 +1,237 @@
+"""
+Лента изменений доски: компактные события для клиентов вместо полной перезагрузки
+
+Эндпоинты, изменяющие доску, публикуют события через publish_board_event().
+Подписчики (SSE-соединения) получают их из очереди в своем event loop.
+Бэкенд доставки выбирается настройкой BOARD_EVENTS_BACKEND:
+- memory   - pub/sub в памяти процесса (достаточно для одного воркера)
+- postgres - PostgreSQL LISTEN/NOTIFY, события видят все воркеры uvicorn
+"""
+
+import asyncio
+import json
+import select
+import threading
+from typing import Any, Callable, List, Optional, Set
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import text
+from .config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Типы событий доски
+CARD_CREATED = "card_created"
+CARD_MOVED = "card_moved"
+CARD_UPDATED = "card_updated"
+CARD_DELETED = "card_deleted"
+WIP_LIMIT_CHANGED = "wip_limit_changed"
+# Подписчик пропустил события (переполнена очередь) - нужно перечитать доску целиком
+RESYNC = "resync"
+
+# Максимум неотправленных событий на одного подписчика
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# Канал PostgreSQL для LISTEN/NOTIFY
+POSTGRES_CHANNEL = "board_events"
+# Ограничение PostgreSQL на размер payload в NOTIFY (8000 байт) с запасом
+POSTGRES_MAX_PAYLOAD = 7900
+# Пауза перед повторной подпиской после обрыва соединения (секунды)
+POSTGRES_RECONNECT_SECONDS = 5
+
+
+class Subscriber:
+    """Очередь событий одного клиента, привязанная к его event loop"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def _put(self, event: dict):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Клиент не успевает читать: сбрасываем очередь и просим перечитать доску
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": RESYNC, "data": {}})
+
+    def deliver(self, event: dict):
+        """Потокобезопасно положить событие в очередь подписчика"""
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    async def get(self, timeout: float) -> Optional[dict]:
+        """Дождаться следующего события; None, если за timeout событий не было"""
+        try:
+            event = await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+        if event["type"] == RESYNC:
+            self.overflowed = False
+        return event
+
+
+class InMemoryEventBackend:
+    """Pub/sub в памяти процесса"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Set[Subscriber] = set()
+        self._listeners: List[Callable[[dict], None]] = []
+
+    def add_listener(self, callback: Callable[[dict], None]):
+        """Вызывать callback для каждого полученного события (например, для сброса кеша)"""
+        self._listeners.append(callback)
+
+    def start(self):
+        """Начать получение событий (вызывается при старте приложения)"""
+
+    def stop(self):
+        """Остановить получение событий"""
+
+    def subscribe(self) -> Subscriber:
+        subscriber = Subscriber(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def dispatch(self, event: dict):
+        """Разослать событие подписчикам этого процесса"""
+        for callback in self._listeners:
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error("Ошибка обработчика события доски %s: %s", event.get('type'), e)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.deliver(event)
+            except RuntimeError:
+                # Event loop подписчика уже закрыт
+                self.unsubscribe(subscriber)
+
+    def publish(self, event: dict):
+        self.dispatch(event)
+
+    def subscribers_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+
+class PostgresEventBackend(InMemoryEventBackend):
+    """
+    Доставка событий между воркерами через PostgreSQL LISTEN/NOTIFY.
+    Каждый воркер слушает канал в фоновом потоке с момента старта приложения
+    (а не первого SSE-клиента): по событиям сбрасывается его кеш доски.
+    После обрыва соединения подписка восстанавливается, а подписчикам и
+    обработчикам рассылается RESYNC - события за время обрыва потеряны.
+    """
+
+    def __init__(self, engine):
+        super().__init__()
+        self._engine = engine
+        self._listener: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def start(self):
+        if self._listener is not None and self._listener.is_alive():
+            return
+        self._stop_event.clear()
+        self._listener = threading.Thread(target=self._run, name="board-events-listener", daemon=True)
+        self._listener.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _run(self):
+        connected_before = False
+        while not self._stop_event.is_set():
+            try:
+                self._listen(resync=connected_before)
+            except Exception as e:
+                logger.error("Прослушивание канала %s прервано: %s", POSTGRES_CHANNEL, e)
+            connected_before = True
+            self._stop_event.wait(POSTGRES_RECONNECT_SECONDS)
+
+    def _listen(self, resync: bool):
+        connection = self._engine.raw_connection()
+        try:
+            dbapi_connection = connection.connection
+            dbapi_connection.set_isolation_level(0)  # autocommit для LISTEN
+            cursor = dbapi_connection.cursor()
+            cursor.execute(f"LISTEN {POSTGRES_CHANNEL}")
+            logger.info("Подписка на канал PostgreSQL %s установлена", POSTGRES_CHANNEL)
+            if resync:
+                self.dispatch({"type": RESYNC, "data": {}})
+            while not self._stop_event.is_set():
+                if select.select([dbapi_connection], [], [], 5) == ([], [], []):
+                    continue
+                dbapi_connection.poll()
+                while dbapi_connection.notifies:
+                    notify = dbapi_connection.notifies.pop(0)
+                    try:
+                        self.dispatch(json.loads(notify.payload))
+                    except ValueError:
+                        logger.warning("Некорректное событие доски в канале %s", POSTGRES_CHANNEL)
+        finally:
+            connection.close()
+
+    def subscribe(self) -> Subscriber:
+        # Обычно поток уже запущен при старте приложения; здесь - на случай его остановки
+        self.start()
+        return super().subscribe()
+
+    def publish(self, event: dict):
+        payload = json.dumps(event)
+        if len(payload.encode("utf-8")) > POSTGRES_MAX_PAYLOAD:
+            # Карточка с большим описанием не помещается в NOTIFY:
+            # отправляем только идентификаторы, клиент дочитает карточку сам
+            data = event.get("data") or {}
+            payload = json.dumps({
+                "type": event["type"],
+                "data": {"id": data.get("id"), "column_id": data.get("column_id")},
+                "truncated": True
+            })
+        # Событие вернется в этот же процесс через LISTEN, поэтому локально не рассылаем
+        with self._engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": POSTGRES_CHANNEL, "payload": payload}
+            )
+
+
+def create_event_backend():
+    """Создать бэкенд доставки событий по настройкам"""
+    if settings.board_events_backend == "postgres":
+        from .database import engine
+        return PostgresEventBackend(engine)
+    return InMemoryEventBackend()
+
+
+event_backend = create_event_backend()
+
+
+def publish_board_event(event_type: str, data: Any):
+    """
+    Опубликовать событие изменения доски.
+    Ошибки доставки не должны ломать запрос, который уже закоммитил изменения.
+    """
+    event = {"type": event_type, "data": jsonable_encoder(data)}
+    try:
+        event_backend.publish(event)
+    except Exception as e:
+        logger.error("Не удалось опубликовать событие доски %s: %s", event_type, e)
+
+
+def format_sse(event: dict) -> str:
+    """Сформировать сообщение Server-Sent Events"""
+    return f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
@@ -0,0 +1,263 @@
+"""
+Потоковая выгрузка карточек, истории и комментариев (CSV, JSONL, Parquet)
+
+Строки читаются из серверного курсора (stream_results) порциями по
+settings.export_fetch_size и сразу отдаются клиенту, поэтому память процесса
+не зависит от объема выгрузки. Выгружаются карточки, отобранные теми же
+фильтрами, что и статистика (assignee_id, start_date, end_date), а для истории
+и комментариев - записи этих карточек.
+
+Parquet доступен, только если установлен pyarrow.
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+from sqlalchemy import func, literal_column, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.orm import aliased
+from . import models
+from .config import settings
+from .database import engine
+from .statistics import filter_cards
+import logging
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet - необязательный формат
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("csv", "jsonl", "parquet")
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Типы полей выгрузки: по ним строятся схема Parquet и сериализация дат
+INT, STR, DATETIME = "int", "str", "datetime"
+
+Field = Tuple[str, str]
+
+
+def _card_filter_ids(assignee_id: Optional[int], start_date: Optional[str], end_date: Optional[str]):
+    """Подзапрос id карточек, попавших под фильтры статистики"""
+    return filter_cards(select(models.Card.id), assignee_id, start_date, end_date)
+
+
+def cards_export(assignee_id: Optional[int], start_date: Optional[str], end_date: Optional[str]) -> Tuple[List[Field], object]:
+    """Карточки с колонкой, исполнителем, согласующим, автором и тегами"""
+    assignee = aliased(models.User)
+    approver = aliased(models.User)
+    creator = aliased(models.User)
+    tags = (
+        select(func.string_agg(models.Tag.name, aggregate_order_by(literal_column("','"), models.Tag.name)))
+        .select_from(models.CardTag)
+        .join(models.Tag, models.Tag.id == models.CardTag.tag_id)
+        .where(models.CardTag.card_id == models.Card.id)
+        .scalar_subquery()
+    )
+    statement = (
+        select(
+            models.Card.id,
+            models.Card.ticket_number,
+            models.Card.title,
+            models.Card.description,
+            models.Card.story_points,
+            models.KanbanColumn.title.label("column"),
+            assignee.username.label("assignee"),
+            approver.username.label("approver"),
+            creator.username.label("created_by"),
+            models.Card.real_estate_type,
+            models.Card.rc_mk,
+            models.Card.rc_zm,
+            tags.label("tags"),
+            models.Card.created_at,
+            models.Card.updated_at,
+        )
+        .join(models.KanbanColumn, models.KanbanColumn.id == models.Card.column_id)
+        .outerjoin(assignee, assignee.id == models.Card.assignee_id)
+        .outerjoin(approver, approver.id == models.Card.approver_id)
+        .outerjoin(creator, creator.id == models.Card.created_by)
+        .order_by(models.Card.id)
+    )
+    statement = filter_cards(statement, assignee_id, start_date, end_date)
+    fields = [
+        ("id", INT), ("ticket_number", STR), ("title", STR), ("description", STR),
+        ("story_points", INT), ("column", STR), ("assignee", STR), ("approver", STR),
+        ("created_by", STR), ("real_estate_type", STR), ("rc_mk", STR), ("rc_zm", STR),
+        ("tags", STR), ("created_at", DATETIME), ("updated_at", DATETIME),
+    ]
+    return fields, statement
+
+
+def history_export(assignee_id: Optional[int], start_date: Optional[str], end_date: Optional[str]) -> Tuple[List[Field], object]:
+    """История изменений карточек"""
+    statement = (
+        select(
+            models.CardHistory.id,
+            models.Card.ticket_number,
+            models.CardHistory.action,
+            models.CardHistory.details,
+            models.CardHistory.created_at,
+        )
+        .join(models.Card, models.Card.id == models.CardHistory.card_id)
+        .where(models.CardHistory.card_id.in_(_card_filter_ids(assignee_id, start_date, end_date)))
+        .order_by(models.CardHistory.card_id, models.CardHistory.created_at, models.CardHistory.id)
+    )
+    fields = [("id", INT), ("ticket_number", STR), ("action", STR), ("details", STR), ("created_at", DATETIME)]
+    return fields, statement
+
+
+def comments_export(assignee_id: Optional[int], start_date: Optional[str], end_date: Optional[str]) -> Tuple[List[Field], object]:
+    """Комментарии к карточкам"""
+    statement = (
+        select(
+            models.Comment.id,
+            models.Card.ticket_number,
+            models.User.username.label("author"),
+            models.Comment.content,
+            models.Comment.created_at,
+        )
+        .join(models.Card, models.Card.id == models.Comment.ticket_id)
+        .join(models.User, models.User.id == models.Comment.user_id)
+        .where(models.Comment.ticket_id.in_(_card_filter_ids(assignee_id, start_date, end_date)))
+        .order_by(models.Comment.ticket_id, models.Comment.created_at, models.Comment.id)
+    )
+    fields = [("id", INT), ("ticket_number", STR), ("author", STR), ("content", STR), ("created_at", DATETIME)]
+    return fields, statement
+
+
+EXPORTS = {
+    "cards": cards_export,
+    "history": history_export,
+    "comments": comments_export,
+}
+
+
+def _format_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _csv_chunks(fields: List[Field], batches: Iterator[list]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM, чтобы Excel открывал выгрузку в UTF-8
+    writer.writerow([name for name, _ in fields])
+    yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_format_value(value) for value in row] for row in batch)
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _jsonl_chunks(fields: List[Field], batches: Iterator[list]) -> Iterator[bytes]:
+    names = [name for name, _ in fields]
+    for batch in batches:
+        yield "".join(
+            json.dumps(dict(zip(names, map(_format_value, row))), ensure_ascii=False) + "\n"
+            for row in batch
+        ).encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Файл, который копит записанные байты до следующего забора"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _parquet_chunks(fields: List[Field], batches: Iterator[list]) -> Iterator[bytes]:
+    types = {INT: pyarrow.int64(), STR: pyarrow.string(), DATETIME: pyarrow.timestamp("us")}
+    schema = pyarrow.schema([(name, types[kind]) for name, kind in fields])
+    sink = _ChunkSink()
+    # Каждая порция строк - отдельная row group, записанные байты сразу уходят клиенту
+    with pyarrow.parquet.ParquetWriter(sink, schema) as writer:
+        for batch in batches:
+            columns = list(zip(*batch))
+            writer.write_table(pyarrow.Table.from_arrays(
+                [pyarrow.array(column, type=schema.field(i).type) for i, column in enumerate(columns)],
+                schema=schema
+            ))
+            yield sink.drain()
+    yield sink.drain()
+
+
+WRITERS = {
+    "csv": _csv_chunks,
+    "jsonl": _jsonl_chunks,
+    "parquet": _parquet_chunks,
+}
+
+
+def check_export_format(file_format: str):
+    """
+    Raises:
+        ValueError: если формат неизвестен или для него не установлены зависимости
+    """
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(f"Формат выгрузки должен быть одним из: {', '.join(EXPORT_FORMATS)}")
+    if file_format == "parquet" and pyarrow is None:
+        raise ValueError("Выгрузка в Parquet недоступна: не установлен pyarrow")
+
+
+def stream_export(
+    entity: str,
+    file_format: str,
+    assignee_id: Optional[int] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    fetch_size: Optional[int] = None
+) -> Iterator[bytes]:
+    """
+    Сгенерировать выгрузку порциями байтов.
+
+    Соединение берется из пула на время выгрузки; запрос читается через
+    серверный курсор, поэтому в памяти одновременно находится не больше
+    fetch_size строк.
+    """
+    fields, statement = EXPORTS[entity](assignee_id, start_date, end_date)
+    fetch_size = fetch_size or settings.export_fetch_size
+    exported = 0
+
+    def counted(batches: Iterator[list]) -> Iterator[list]:
+        nonlocal exported
+        for batch in batches:
+            exported += len(batch)
+            yield batch
+
+    with engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, max_row_buffer=fetch_size).execute(statement)
+        try:
+            for chunk in WRITERS[file_format](fields, counted(result.partitions(fetch_size))):
+                if chunk:
+                    yield chunk
+        finally:
+            result.close()
+    logger.info("Выгрузка %s (%s) завершена: %s строк", entity, file_format, exported)
@@ -0,0 +1,306 @@
+"""
+Потоковый импорт тикетов из CSV и JSONL
+
+Файл читается построчно, строки проверяются схемой schemas.CardCreate
+и вставляются порциями: номера тикетов резервируются одним запросом на порцию,
+карточки, теги карточек, история и переходы вставляются многострочными INSERT.
+Пользователи, колонки и теги сопоставляются через словари в памяти, поэтому
+на строку не выполняется ни одного отдельного запроса. Каждая порция - отдельная
+транзакция: память и длина транзакции не зависят от размера файла.
+
+Импорт - административная миграция данных: WIP-лимиты не проверяются
+(счетчики карточек в колонках поддерживаются), уведомления согласующим не отправляются.
+
+Колонки файла - поля CardCreate. Вместо assignee_id/approver_id можно указать
+assignee/approver (имя пользователя), вместо column_id - column (название колонки).
+Теги в CSV перечисляются через запятую в одной ячейке, в JSONL - списком.
+
+Запуск из командной строки (из каталога backend):
+    python -m app.importer tickets.csv --created-by admin
+    python -m app.importer tickets.jsonl --format jsonl --chunk-size 2000
+"""
+
+import argparse
+import csv
+import json
+import sys
+from collections import Counter
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+from pydantic import ValidationError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from . import models, schemas
+from .bulk import convert_card_values
+from .columns import adjust_card_count
+from .tickets import reserve_ticket_numbers
+from .database import SessionLocal
+import logging
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FORMATS = ("csv", "jsonl")
+IMPORT_DEFAULT_CHUNK_SIZE = 1000
+# Многострочный INSERT ограничен 65535 параметрами на запрос
+IMPORT_MAX_CHUNK_SIZE = 2000
+# Сколько ошибок строк возвращать подробно (остальные только считаются)
+IMPORT_MAX_REPORTED_ERRORS = 100
+
+# Колонки карточки, которые заполняются из файла
+IMPORT_CARD_FIELDS = (
+    "title", "description", "position", "story_points", "column_id",
+    "assignee_id", "approver_id", "real_estate_type", "rc_mk", "rc_zm",
+)
+
+Row = Tuple[int, dict]
+
+
+class ImportRowError(ValueError):
+    """Ошибка в строке файла импорта"""
+
+
+def iter_csv_rows(stream: TextIO) -> Iterator[Row]:
+    """Строки CSV с номерами строк файла; пустые ячейки считаются незаполненными"""
+    reader = csv.DictReader(stream)
+    for row in reader:
+        values = {key.strip(): value.strip() for key, value in row.items() if key and value is not None}
+        values = {key: value for key, value in values.items() if value != ""}
+        if "tags" in values:
+            values["tags"] = [tag.strip() for tag in values["tags"].split(",") if tag.strip()]
+        yield reader.line_num, values
+
+
+def iter_jsonl_rows(stream: TextIO) -> Iterator[Row]:
+    """Объекты JSONL с номерами строк файла; пустые строки пропускаются"""
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            values = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, {"__error__": f"Некорректный JSON: {e.msg}"}
+            continue
+        if not isinstance(values, dict):
+            yield line_number, {"__error__": "Строка JSONL должна быть объектом"}
+            continue
+        yield line_number, values
+
+
+def iter_rows(stream: TextIO, file_format: str) -> Iterator[Row]:
+    if file_format == "csv":
+        return iter_csv_rows(stream)
+    if file_format == "jsonl":
+        return iter_jsonl_rows(stream)
+    raise ValueError(f"Неизвестный формат импорта: {file_format}")
+
+
+def normalize_tag_name(tag_name: str) -> str:
+    """Привести тег к виду #tag, как get_or_create_tag"""
+    tag_name = f"#{tag_name.lstrip('#')}"
+    if len(tag_name) > 50:
+        raise ImportRowError(f"Тег слишком длинный: {tag_name}")
+    return tag_name
+
+
+class CardImporter:
+    """
+    Импорт карточек порциями.
+
+    Пример:
+        importer = CardImporter(db, created_by=admin.id)
+        for progress in importer.run(iter_rows(stream, "csv")):
+            print(progress)
+    """
+
+    def __init__(self, db: Session, created_by: int, chunk_size: int = IMPORT_DEFAULT_CHUNK_SIZE):
+        self.db = db
+        self.created_by = created_by
+        self.chunk_size = max(1, min(chunk_size, IMPORT_MAX_CHUNK_SIZE))
+        self.processed = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+
+        # Справочники загружаются один раз на импорт
+        self.user_ids = {}
+        for user_id, username in db.query(models.User.id, models.User.username):
+            self.user_ids[username] = user_id
+        self.known_user_ids = set(self.user_ids.values())
+        self.column_ids = {}
+        for column_id, title in db.query(models.KanbanColumn.id, models.KanbanColumn.title):
+            self.column_ids[title] = column_id
+        self.known_column_ids = set(self.column_ids.values())
+        self.tag_ids = {name: tag_id for tag_id, name in db.query(models.Tag.id, models.Tag.name)}
+
+    def _fail(self, line_number: int, detail: str):
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line_number, "detail": detail})
+
+    def _resolve_reference(self, values: dict, name_key: str, id_key: str, ids_by_name: Dict[str, int], known_ids: set, label: str):
+        """Заменить имя (assignee, column) на id и проверить, что id существует"""
+        name = values.pop(name_key, None)
+        if name is not None and values.get(id_key) is None:
+            if name not in ids_by_name:
+                raise ImportRowError(f"{label} '{name}' не найден")
+            values[id_key] = ids_by_name[name]
+        if values.get(id_key) is not None:
+            try:
+                values[id_key] = int(values[id_key])
+            except (TypeError, ValueError):
+                raise ImportRowError(f"Некорректный {id_key}: {values[id_key]}")
+            if values[id_key] not in known_ids:
+                raise ImportRowError(f"{label} с id {values[id_key]} не найден")
+
+    def _prepare_row(self, values: dict) -> Tuple[dict, List[str]]:
+        """Проверить строку и вернуть значения колонок карточки и имена тегов"""
+        if "__error__" in values:
+            raise ImportRowError(values["__error__"])
+        values = dict(values)
+        self._resolve_reference(values, "assignee", "assignee_id", self.user_ids, self.known_user_ids, "Исполнитель")
+        self._resolve_reference(values, "approver", "approver_id", self.user_ids, self.known_user_ids, "Согласующий")
+        self._resolve_reference(values, "column", "column_id", self.column_ids, self.known_column_ids, "Колонка")
+
+        try:
+            card = schemas.CardCreate(**values)
+        except ValidationError as e:
+            raise ImportRowError("; ".join(
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+            ))
+
+        fields = card.dict(exclude={"tags"})
+        try:
+            fields = convert_card_values(fields)
+        except ValueError as e:
+            raise ImportRowError(str(e))
+        tag_names = list(dict.fromkeys(normalize_tag_name(tag) for tag in card.tags or []))
+        return fields, tag_names
+
+    def _ensure_tags(self, tag_names: Iterable[str]):
+        """Создать недостающие теги одним запросом и добавить их в словарь"""
+        missing = sorted(set(tag_names) - set(self.tag_ids))
+        if not missing:
+            return
+        self.db.execute(
+            pg_insert(models.Tag.__table__)
+            .values([{"name": name} for name in missing])
+            .on_conflict_do_nothing(index_elements=["name"])
+        )
+        # Теги, созданные параллельно другим процессом, тоже попадают в словарь
+        for tag_id, name in self.db.query(models.Tag.id, models.Tag.name).filter(models.Tag.name.in_(missing)):
+            self.tag_ids[name] = tag_id
+
+    def _insert_chunk(self, chunk: List[Tuple[dict, List[str]]]):
+        """Вставить порцию проверенных строк и зафиксировать транзакцию"""
+        db = self.db
+        self._ensure_tags(tag for _, tag_names in chunk for tag in tag_names)
+        ticket_numbers = reserve_ticket_numbers(db, len(chunk))
+
+        # Многострочный INSERT требует одинакового набора колонок во всех строках
+        card_rows = []
+        for (fields, _), ticket_number in zip(chunk, ticket_numbers):
+            row = {key: fields.get(key) for key in IMPORT_CARD_FIELDS}
+            card_rows.append({**row, "ticket_number": ticket_number, "created_by": self.created_by})
+        inserted = db.execute(
+            models.Card.__table__.insert()
+            .values(card_rows)
+            .returning(models.Card.__table__.c.id, models.Card.__table__.c.ticket_number)
+        ).fetchall()
+        card_ids = {ticket_number: card_id for card_id, ticket_number in inserted}
+
+        tag_rows, history_rows, transition_rows = [], [], []
+        for (fields, tag_names), ticket_number in zip(chunk, ticket_numbers):
+            card_id = card_ids[ticket_number]
+            tag_rows.extend({"card_id": card_id, "tag_id": self.tag_ids[name]} for name in tag_names)
+            history_rows.append({
+                "card_id": card_id,
+                "action": "imported",
+                "details": json.dumps({**fields, "tags": tag_names}, default=str)
+            })
+            transition_rows.append({"card_id": card_id, "from_column_id": None, "to_column_id": fields["column_id"]})
+
+        if tag_rows:
+            db.execute(models.CardTag.__table__.insert().values(tag_rows))
+        db.execute(models.CardHistory.__table__.insert().values(history_rows))
+        db.execute(models.CardTransition.__table__.insert().values(transition_rows))
+        for column_id, count in Counter(fields["column_id"] for fields, _ in chunk).items():
+            adjust_card_count(db, column_id, count)
+
+        db.commit()
+        self.imported += len(chunk)
+
+    def progress(self) -> dict:
+        return {
+            "processed": self.processed,
+            "imported": self.imported,
+            "failed": self.failed,
+        }
+
+    def summary(self) -> dict:
+        return {**self.progress(), "errors": self.errors}
+
+    def run(self, rows: Iterable[Row]) -> Iterator[dict]:
+        """Импортировать строки; после каждой порции возвращает текущий прогресс"""
+        chunk = []
+        for line_number, values in rows:
+            self.processed += 1
+            try:
+                chunk.append(self._prepare_row(values))
+            except ImportRowError as e:
+                self._fail(line_number, str(e))
+            if len(chunk) >= self.chunk_size:
+                self._insert_chunk(chunk)
+                chunk = []
+                yield self.progress()
+        if chunk:
+            self._insert_chunk(chunk)
+        yield self.progress()
+
+
+def import_cards(db: Session, stream: TextIO, file_format: str, created_by: int,
+                 chunk_size: int = IMPORT_DEFAULT_CHUNK_SIZE,
+                 on_progress: Optional[Callable[[dict], None]] = None) -> dict:
+    """Импортировать файл целиком и вернуть итог"""
+    importer = CardImporter(db, created_by, chunk_size)
+    try:
+        for progress in importer.run(iter_rows(stream, file_format)):
+            if on_progress:
+                on_progress(progress)
+    except Exception:
+        db.rollback()
+        raise
+    logger.info("Импорт завершен: %s", importer.progress())
+    return importer.summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Импорт тикетов из CSV/JSONL")
+    parser.add_argument("path", help="Путь к файлу (- для stdin)")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="Формат файла (по умолчанию по расширению)")
+    parser.add_argument("--created-by", default="admin", help="Имя пользователя - автора карточек")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_DEFAULT_CHUNK_SIZE, help="Строк в одной транзакции")
+    args = parser.parse_args()
+
+    file_format = args.format or ("jsonl" if args.path.endswith((".jsonl", ".ndjson")) else "csv")
+    db = SessionLocal()
+    try:
+        author = db.query(models.User).filter(models.User.username == args.created_by).first()
+        if not author:
+            raise SystemExit(f"Пользователь {args.created_by} не найден")
+
+        stream = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8-sig", newline="")
+        try:
+            summary = import_cards(
+                db, stream, file_format, author.id, args.chunk_size,
+                on_progress=lambda progress: print(json.dumps(progress), file=sys.stderr)
+            )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -21,7 +21,7 @@ def init_db():
         db.execute(text("SELECT 1"))
         logger.info("База данных успешно инициализирована")
     except Exception as e:
-        logger.info(f"Ошибка при проверке БД: {e}")
+        logger.info("Ошибка при проверке БД: %s", e)
     finally:
         db.close()
 
@@ -77,10 +77,10 @@ def create_admin_user():
         if row:
             user_id, action = row
             if action == 'inserted':
-                logger.info(f"Администратор {admin_username} успешно создан (ID: {user_id})")
+                logger.info("Администратор %s успешно создан (ID: %s)", admin_username, user_id)
                 print(f"Администратор {admin_username} успешно создан")
             else:
-                logger.info(f"Администратор {admin_username} успешно обновлен (ID: {user_id})")
+                logger.info("Администратор %s успешно обновлен (ID: %s)", admin_username, user_id)
                 print(f"Администратор {admin_username} успешно обновлен")
             return True
         else:
@@ -91,12 +91,12 @@ def create_admin_user():
     except IntegrityError as e:
         db.rollback()
         # Эта ошибка не должна происходить с UPSERT, но на всякий случай
-        logger.error(f"Ошибка целостности при создании/обновлении администратора {admin_username}: {e}")
+        logger.error("Ошибка целостности при создании/обновлении администратора %s: %s", admin_username, e)
         print(f"Ошибка целостности базы данных: {e}")
         return False
     except Exception as e:
         db.rollback()
-        logger.error(f"Неожиданная ошибка при создании/обновлении администратора {admin_username}: {e}")
+        logger.error("Неожиданная ошибка при создании/обновлении администратора %s: %s", admin_username, e)
         print(f"Ошибка: {e}")
         return False
     finally:
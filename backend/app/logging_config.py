@@ -0,0 +1,127 @@
+"""
+Настройка логирования приложения
+
+Все модули пишут через стандартный logging (logging.getLogger(__name__)),
+настройка выполняется один раз в configure_logging():
+- формат text или json (LOG_FORMAT), в json каждое сообщение - одна строка
+  с полями ts, level, logger, message и полями из extra={...};
+- общий уровень LOG_LEVEL и уровни отдельных модулей LOG_MODULE_LEVELS
+  ("app.main=DEBUG,sqlalchemy.engine=INFO");
+- DEBUG-сообщения из циклов по элементам (теги, карточки) ограничиваются
+  фильтром DebugSampler: с одного места вызова за окно проходит не больше
+  LOG_DEBUG_SAMPLE_BURST сообщений, об остальных сообщается счетчиком.
+
+Сообщения форматируются лениво: logger.debug("Тег %s", name) не строит строку,
+если уровень DEBUG выключен. Дампы запросов и ответов пишутся только на DEBUG.
+"""
+
+import json
+import logging
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Tuple
+from .config import settings
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Атрибуты LogRecord, которые не относятся к extra={...}
+RESERVED_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на сообщение"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in RESERVED_RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DebugSampler(logging.Filter):
+    """
+    Ограничивает частоту DEBUG-сообщений с одного места вызова
+    (модуль + шаблон сообщения): не больше burst за window секунд.
+    Сообщения уровня INFO и выше проходят всегда. Первое сообщение нового окна
+    получает поле suppressed - сколько сообщений было пропущено в прошлом окне.
+    """
+
+    def __init__(self, burst: int, window: float):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self._lock = threading.Lock()
+        # (logger, шаблон) -> [начало окна, пропущено сообщений, пропущено в прошлом окне]
+        self._windows: Dict[Tuple[str, str], list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            state = self._windows.get(key)
+            if state is None or now - state[0] >= self.window:
+                suppressed = state[2] if state else 0
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            state[1] += 1
+            if state[1] <= self.burst:
+                return True
+            state[2] += 1
+            return False
+
+
+def parse_module_levels(value: str) -> Dict[str, int]:
+    """
+    Разобрать строку "module=LEVEL,module=LEVEL"
+
+    Raises:
+        ValueError: если запись или уровень некорректны
+    """
+    levels = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, separator, level = item.partition("=")
+        level_number = logging.getLevelName(level.strip().upper())
+        if not separator or not name.strip() or not isinstance(level_number, int):
+            raise ValueError(f"Некорректный уровень логирования модуля: {item}")
+        levels[name.strip()] = level_number
+    return levels
+
+
+def configure_logging():
+    """Настроить корневой логгер по настройкам приложения (повторный вызов перенастраивает)"""
+    handler = logging.StreamHandler(sys.stdout)
+    if settings.log_format == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    if settings.log_debug_sample_burst:
+        handler.addFilter(DebugSampler(settings.log_debug_sample_burst, settings.log_debug_sample_window_seconds))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(settings.log_level)
+
+    for name, level in parse_module_levels(settings.log_module_levels).items():
+        logging.getLogger(name).setLevel(level)
+
+    # Логи uvicorn идут через тот же обработчик и формат
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
@@ -1,23 +1,56 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Query
+from fastapi import FastAPI, Depends, HTTPException, status, Query, Request, File, UploadFile
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
 from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timedelta, date
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from loguru import logger
+from .config import settings
+from .logging_config import configure_logging
+
+# Логирование настраивается до импорта модулей, которые пишут в лог при загрузке (подключение к БД)
+configure_logging()
+
 from . import models, schemas
-from .database import get_db, engine
+from .database import get_db, engine, get_pool_stats, SessionLocal
+from .async_database import get_async_db, AsyncSessionLocal
 from .init_db import init_db
 from typing import List, Optional
 import logging
 import json
-from .auth import get_current_user, create_access_token, verify_password, get_password_hash, SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
-from .telegram_bot import send_approver_notification, send_approver_change_notification
+import io
+from .auth import get_current_user, get_current_user_async, create_access_token, verify_password, get_password_hash, SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from .notifications import (
+    APPROVER_ASSIGNED,
+    enqueue_notification,
+    enqueue_approver_change,
+    wake_notification_worker,
+    start_notification_worker,
+    stop_notification_worker,
+)
+from .board import build_board_snapshot, BoardFilters, serialize_board_card
+from .cache import board_cache, CachedBoard
+from .etag import render_json, etag_for_body, etag_for_version, json_response_with_etag, not_modified_response, etag_matches
+from .tickets import allocate_ticket_number
+from .columns import check_wip_limit, lock_card, lock_columns, has_wip_capacity, adjust_card_count
+from .importer import CardImporter, iter_rows, IMPORT_FORMATS, IMPORT_DEFAULT_CHUNK_SIZE, IMPORT_MAX_CHUNK_SIZE
+from .export import EXPORTS, EXPORT_MEDIA_TYPES, check_export_format, stream_export
+from .search import search_cards, SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT, SEARCH_MAX_OFFSET, SEARCH_QUERY_MAX_LENGTH
+from .metrics import MetricsMiddleware, metrics_registry
+from .singleflight import request_coalescer
+from .bulk import BulkResult, bulk_move_cards, bulk_update_cards, bulk_delete_cards, convert_card_values
+from .pagination import apply_keyset, split_page, PAGE_DEFAULT_LIMIT, PAGE_MAX_LIMIT, NEXT_CURSOR_HEADER
+from .statistics import collect_statistics, format_statistics, parse_group_by, calculate_breakdowns, parse_day
+from .rollups import start_rollup_worker, stop_rollup_worker
+from .events import (
+    event_backend, publish_board_event, format_sse,
+    CARD_CREATED, CARD_MOVED, CARD_UPDATED, CARD_DELETED, WIP_LIMIT_CHANGED, RESYNC
+)
 import re
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 
 # Создаем таблицы в базе данных (отключено - используем миграции)
 # models.Base.metadata.create_all(bind=engine)
@@ -44,10 +77,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
     allow_headers=["*", "Authorization", "Content-Type", "Accept"],
-    expose_headers=["*"],
+    expose_headers=["*", "ETag", "X-Next-Cursor", "Server-Timing", "X-Query-Count"],
     max_age=3600
 )
 
+# Время ответа, коды ответов и SQL-запросы по маршрутам (GET /metrics)
+app.add_middleware(MetricsMiddleware, server_timing=settings.metrics_server_timing)
+
 # Добавляем обработчик для OPTIONS запросов
 @app.options("/{full_path:path}")
 async def options_handler():
@@ -62,37 +98,51 @@ async def options_handler():
         }
     )
 
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# В режиме postgres события от других воркеров сбрасывают локальный кеш доски
+if settings.board_events_backend == "postgres":
+    event_backend.add_listener(lambda event: board_cache.bump_version())
+
+# Интервал отправки keepalive-комментариев в потоке событий доски (секунды)
+SSE_KEEPALIVE_SECONDS = 15
+
+@app.on_event("startup")
+async def start_background_jobs():
+    event_backend.start()
+    start_rollup_worker()
+    start_notification_worker()
+
+@app.on_event("shutdown")
+async def stop_background_jobs():
+    event_backend.stop()
+    stop_rollup_worker()
+    stop_notification_worker()
+
 logger = logging.getLogger(__name__)
 
 # Функции аутентификации импортируются из auth.py (с валидацией настроек)
 
 @app.post("/api/auth/register", response_model=schemas.User)
 async def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    logger.info(f"Начало регистрации пользователя: {user.username}")
+    logger.info("Начало регистрации пользователя: %s", user.username)
     
     # Проверяем, существует ли пользователь с таким username (регистронезависимо)
-    logger.info(f"Проверка существования пользователя с username: {user.username}")
+    logger.debug("Проверка существования пользователя с username: %s", user.username)
     db_user = db.query(models.User).filter(
         func.lower(models.User.username) == func.lower(user.username)
     ).first()
     
     if db_user:
-        logger.warning(f"Пользователь с username {user.username} уже существует")
-        logger.warning(f"Детали существующего пользователя: id={db_user.id}, username={db_user.username}, created_at={db_user.created_at}")
+        logger.warning("Пользователь с username %s уже существует", user.username)
+        logger.warning("Детали существующего пользователя: id=%s, username=%s, created_at=%s", db_user.id, db_user.username, db_user.created_at)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Пользователь с именем '{user.username}' уже существует"
         )
     
-    logger.info(f"Создание нового пользователя: {user.username}")
+    logger.debug("Создание нового пользователя: %s", user.username)
     # Создаем нового пользователя
     hashed_password = get_password_hash(user.password)
-    logger.info(f"Пароль захеширован для пользователя {user.username}")
+    logger.debug("Пароль захеширован для пользователя %s", user.username)
     
     db_user = models.User(
         username=user.username,
@@ -102,15 +152,15 @@ async def register_user(user: schemas.UserCreate, db: Session = Depends(get_db))
     )
     
     try:
-        logger.info(f"Добавление пользователя в базу данных: {user.username}")
+        logger.debug("Добавление пользователя в базу данных: %s", user.username)
         db.add(db_user)
         db.commit()
-        logger.info(f"Пользователь успешно добавлен в базу данных: {user.username}")
+        logger.debug("Пользователь успешно добавлен в базу данных: %s", user.username)
         db.refresh(db_user)
-        logger.info(f"Пользователь успешно зарегистрирован: {user.username}")
+        logger.info("Пользователь успешно зарегистрирован: %s", user.username)
         return db_user
     except IntegrityError as e:
-        logger.warning(f"Ошибка уникальности при регистрации пользователя {user.username}: {str(e)}")
+        logger.warning("Ошибка уникальности при регистрации пользователя %s: %s", user.username, e)
         db.rollback()
         if "duplicate key value violates unique constraint" in str(e):
             if "ix_users_username" in str(e):
@@ -134,7 +184,7 @@ async def register_user(user: schemas.UserCreate, db: Session = Depends(get_db))
                 detail=f"Ошибка целостности данных: {str(e)}"
             )
     except Exception as e:
-        logger.error(f"Неожиданная ошибка при регистрации пользователя {user.username}: {str(e)}")
+        logger.error("Неожиданная ошибка при регистрации пользователя %s: %s", user.username, e)
         db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -144,7 +194,7 @@ async def register_user(user: schemas.UserCreate, db: Session = Depends(get_db))
 @app.post("/api/auth/login", response_model=schemas.Token)
 async def login(login_data: schemas.LoginRequest, db: Session = Depends(get_db)):
     try:
-        logger.info(f"Попытка входа пользователя: {login_data.username}")
+        logger.info("Попытка входа пользователя: %s", login_data.username)
         
         # Проверяем существование пользователя (регистронезависимо)
         user = db.query(models.User).filter(
@@ -152,7 +202,7 @@ async def login(login_data: schemas.LoginRequest, db: Session = Depends(get_db))
         ).first()
         
         if not user:
-            logger.error(f"Пользователь {login_data.username} не найден")
+            logger.error("Пользователь %s не найден", login_data.username)
             return JSONResponse(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 content={"detail": "Неверное имя пользователя или пароль"},
@@ -163,13 +213,13 @@ async def login(login_data: schemas.LoginRequest, db: Session = Depends(get_db))
                 }
             )
         
-        logger.info(f"Найден пользователь: {user.username}")
+        logger.debug("Найден пользователь: %s", user.username)
         
         is_valid = verify_password(login_data.password, user.hashed_password)
-        logger.info(f"Результат проверки пароля: {is_valid}")
+        logger.debug("Результат проверки пароля: %s", is_valid)
         
         if not is_valid:
-            logger.error(f"Неверный пароль для пользователя {login_data.username}")
+            logger.error("Неверный пароль для пользователя %s", login_data.username)
             return JSONResponse(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 content={"detail": "Неверное имя пользователя или пароль"},
@@ -180,14 +230,14 @@ async def login(login_data: schemas.LoginRequest, db: Session = Depends(get_db))
                 }
             )
         
-        logger.info(f"Успешный вход пользователя {login_data.username}")
+        logger.info("Успешный вход пользователя %s", login_data.username)
         access_token = create_access_token(data={"sub": user.username})
-        logger.info(f"Создан токен для пользователя {login_data.username}")
+        logger.debug("Создан токен для пользователя %s", login_data.username)
         return {"access_token": access_token, "token_type": "bearer"}
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Неожиданная ошибка при входе: {str(e)}")
+        logger.error("Неожиданная ошибка при входе: %s", e)
         return JSONResponse(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             content={"detail": f"Внутренняя ошибка сервера: {str(e)}"},
@@ -206,89 +256,87 @@ async def health_check():
     return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
 
 @app.get("/api/columns")
-async def get_columns(db: Session = Depends(get_db)):
+async def get_columns(
+    request: Request,
+    assignee_id: Optional[int] = None,
+    tag_id: Optional[int] = None,
+    real_estate_type: Optional[str] = Query(None, description="Константа типа недвижимости (OFFICE, BUILDING, ...)"),
+    rc_mk: Optional[str] = Query(None, description="Константа РЦ МК (CENTR, UG, URAL, SIBIR)"),
+    rc_zm: Optional[str] = Query(None, description="Константа РЦ ЗМ (CENTR, UG, URAL, SIBIR)"),
+    q: Optional[str] = Query(None, max_length=200, description="Поиск по названию и описанию")
+):
     try:
-        columns = db.query(models.KanbanColumn).order_by(models.KanbanColumn.position).all()
-        # Загружаем карточки для каждой колонки
-        for column in columns:
-            column.cards = db.query(models.Card).filter(models.Card.column_id == column.id).all()
-            # Загружаем информацию об исполнителях, согласующих и тегах для каждой карточки
-            for card in column.cards:
-                if card.assignee_id:
-                    card.assignee = db.query(models.User).filter(models.User.id == card.assignee_id).first()
-                if card.approver_id:
-                    card.approver = db.query(models.User).filter(models.User.id == card.approver_id).first()
-                # Загружаем теги
-                card.tags = db.query(models.Tag).join(models.CardTag).filter(models.CardTag.card_id == card.id).all()
-                logger.info(f"Card {card.id} tags: {[tag.name for tag in card.tags]}")
-                logger.info(f"Card {card.id} tags (full data): {[tag.__dict__ for tag in card.tags]}")
-                logger.info(f"Card {card.id} tags (type): {type(card.tags)}")
-                logger.info(f"Card {card.id} full data: {card.__dict__}")
-        
-        # Формируем ответ
-        response_data = []
-        for column in columns:
-            column_data = {
-                "id": column.id,
-                "title": column.title,
-                "position": column.position,
-                "color": column.color,
-                "wip_limit": column.wip_limit,
-                "cards_count": len(column.cards),
-                "cards": []
-            }
-            
-            for card in column.cards:
-                card_data = {
-                    "id": card.id,
-                    "title": card.title,
-                    "description": card.description,
-                    "position": card.position,
-                    "story_points": card.story_points,
-                    "column_id": card.column_id,
-                    "assignee_id": card.assignee_id,
-                    "approver_id": card.approver_id,
-                    "real_estate_type": card.real_estate_type,
-                    "rc_mk": card.rc_mk,
-                    "rc_zm": card.rc_zm,
-                    "created_at": card.created_at,
-                    "updated_at": card.updated_at,
-                    "tags": [{"id": tag.id, "name": tag.name, "created_at": tag.created_at} for tag in card.tags]
-                }
-                
-                if card.assignee:
-                    card_data["assignee"] = {
-                        "id": card.assignee.id,
-                        "username": card.assignee.username,
-                        "telegram": card.assignee.telegram,
-                        "role": card.assignee.role,
-                        "is_active": card.assignee.is_active,
-                        "created_at": card.assignee.created_at,
-                        "email": card.assignee.email
-                    }
-                
-                if card.approver:
-                    card_data["approver"] = {
-                        "id": card.approver.id,
-                        "username": card.approver.username,
-                        "telegram": card.approver.telegram,
-                        "role": card.approver.role,
-                        "is_active": card.approver.is_active,
-                        "created_at": card.approver.created_at,
-                        "email": card.approver.email
-                    }
-                
-                column_data["cards"].append(card_data)
-            
-            response_data.append(column_data)
-        
-        logger.info(f"Отправляем ответ с колонками: {response_data}")
-        return response_data
+        filters = BoardFilters(assignee_id, tag_id, real_estate_type, rc_mk, rc_zm, q)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    try:
+        # Отфильтрованные снимки не кешируются: ETag считается по телу ответа
+        if not filters.is_empty():
+            board = await request_coalescer.run(
+                ("GET /api/columns", filters.key(), board_cache.version),
+                lambda: build_board_payload(filters)
+            )
+            return json_response_with_etag(request, board.body, board.etag)
+        
+        # Отдаем снимок из кеша, если доска не менялась с момента его построения
+        cached_board = board_cache.get()
+        if cached_board is not None:
+            return json_response_with_etag(request, cached_board.body, cached_board.etag)
+        board_version = board_cache.version
+        
+        # Одновременные промахи кеша ждут одно построение снимка
+        cached_board = await request_coalescer.run(
+            ("GET /api/columns", filters.key(), board_version),
+            lambda: build_board_payload(None)
+        )
+        board_cache.store(board_version, cached_board)
+        return json_response_with_etag(request, cached_board.body, cached_board.etag)
     except Exception as e:
-        logger.error(f"Ошибка при получении колонок: {str(e)}")
+        logger.error("Ошибка при получении колонок: %s", e)
         logger.error("Полный стек ошибки:", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+async def build_board_payload(filters: Optional[BoardFilters]) -> CachedBoard:
+    """
+    Построить тело ответа GET /api/columns и его ETag.
+    Использует свою сессию: результат может достаться нескольким запросам (app/singleflight.py).
+    """
+    async with AsyncSessionLocal() as db:
+        # Загружаем колонки, карточки, пользователей и теги фиксированным числом запросов
+        response_data = await db.run_sync(build_board_snapshot, filters)
+    
+    logger.debug("Отправляем ответ с колонками: %s", response_data)
+    body = render_json(response_data)
+    return CachedBoard(body=body, etag=etag_for_body(body))
+
+@app.get("/api/events")
+async def board_events(request: Request):
+    """
+    Поток изменений доски (Server-Sent Events).
+    Клиент применяет компактные события к локальному состоянию вместо повторного GET /api/columns.
+    """
+    subscriber = event_backend.subscribe()
+
+    async def event_stream():
+        try:
+            # Интервал переподключения EventSource после обрыва соединения
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                event = await subscriber.get(timeout=SSE_KEEPALIVE_SECONDS)
+                if event is None:
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            event_backend.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/api/columns/{column_id}")
 async def get_column(column_id: int, db: Session = Depends(get_db)):
     column = db.query(models.KanbanColumn).filter(models.KanbanColumn.id == column_id).first()
@@ -298,8 +346,7 @@ async def get_column(column_id: int, db: Session = Depends(get_db)):
 
 def get_or_create_tag(db: Session, tag_name: str) -> models.Tag:
     try:
-        logger.info(f"Создание или получение тега: {tag_name}")
-        logger.info(f"Тип тега: {type(tag_name)}")
+        logger.debug("Создание или получение тега: %s", tag_name)
         
         # Убираем все # в начале и добавляем один #
         tag_name = tag_name.lstrip('#')
@@ -311,29 +358,25 @@ def get_or_create_tag(db: Session, tag_name: str) -> models.Tag:
         
         tag = db.query(models.Tag).filter(models.Tag.name == tag_name).first()
         if not tag:
-            logger.info(f"Создаем новый тег: {tag_name}")
+            logger.debug("Создаем новый тег: %s", tag_name)
             tag = models.Tag(name=tag_name)
             db.add(tag)
             # Не делаем commit - flush достаточно для получения ID
             db.flush()
-            logger.info(f"Тег успешно создан: {tag.name}, id: {tag.id}")
+            logger.info("Создан тег %s (id %s)", tag.name, tag.id)
         else:
-            logger.info(f"Найден существующий тег: {tag.name}, id: {tag.id}")
+            logger.debug("Найден существующий тег: %s, id: %s", tag.name, tag.id)
         
         return tag
     except Exception as e:
-        logger.error(f"Ошибка в get_or_create_tag: {str(e)}")
-        logger.error("Полный стек ошибки:", exc_info=True)
+        logger.error("Ошибка в get_or_create_tag: %s", e, exc_info=True)
         raise
 
 def update_card_tags(db: Session, card: models.Card, tag_names: List[str]):
     try:
-        logger.info(f"Обновление тегов карточки {card.id}: {tag_names}")
-        logger.info(f"Тип тегов: {type(tag_names)}")
-        logger.info(f"Структура тегов: {[type(tag) for tag in tag_names]}")
+        logger.debug("Обновление тегов карточки %s: %s", card.id, tag_names)
         
         if tag_names is None:
-            logger.info("Теги не указаны, пропускаем обновление")
             return
         
         if len(tag_names) > 5:
@@ -341,36 +384,30 @@ def update_card_tags(db: Session, card: models.Card, tag_names: List[str]):
         
         # Удаляем все существующие теги
         card.tags = []
-        logger.info("Существующие теги очищены")
         
         # Добавляем новые теги
         for tag_name in tag_names:
-            logger.info(f"Обработка тега: {tag_name}, тип: {type(tag_name)}")
-            tag = get_or_create_tag(db, tag_name)
-            card.tags.append(tag)
-            logger.info(f"Тег добавлен: {tag.name}, id: {tag.id}")
+            card.tags.append(get_or_create_tag(db, tag_name))
         
         # Не делаем commit здесь - это должно происходить в вызывающей функции
-        logger.info(f"Теги подготовлены для сохранения: {[tag.name for tag in card.tags]}")
     except Exception as e:
-        logger.error(f"Ошибка в update_card_tags: {str(e)}")
-        logger.error("Полный стек ошибки:", exc_info=True)
+        logger.error("Ошибка в update_card_tags: %s", e, exc_info=True)
         raise
 
 @app.post("/api/cards", response_model=schemas.Card)
 async def create_card(card: schemas.CardCreate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
     try:
-        logger.info(f"Начало создания тикета. Данные: {card.dict()}")
-        logger.info(f"Поля РЦ МК: {card.rc_mk} (тип: {type(card.rc_mk)})")
-        logger.info(f"Поля РЦ ЗМ: {card.rc_zm} (тип: {type(card.rc_zm)})")
+        # Дамп запроса строится, только если включен DEBUG
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Начало создания тикета. Данные: %s", card.dict())
         
         # Проверяем существование колонки
         column = db.query(models.KanbanColumn).filter(models.KanbanColumn.id == card.column_id).first()
         if not column:
             raise HTTPException(status_code=404, detail="Колонка не найдена")
-        logger.info(f"Колонка найдена: {column.id}")
+        logger.debug("Колонка найдена: %s", column.id)
 
-        # Проверяем WIP лимит для колонки
+        # Проверяем WIP лимит для колонки (строка колонки блокируется до commit)
         if not check_wip_limit(db, card.column_id):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -383,7 +420,7 @@ async def create_card(card: schemas.CardCreate, db: Session = Depends(get_db), c
             assignee = db.query(models.User).filter(models.User.id == card.assignee_id).first()
             if not assignee:
                 raise HTTPException(status_code=404, detail="Исполнитель не найден")
-            logger.info(f"Исполнитель найден: {assignee.username}")
+            logger.debug("Исполнитель найден: %s", assignee.username)
 
         # Проверяем существование согласующего, если он указан
         approver = None
@@ -391,7 +428,7 @@ async def create_card(card: schemas.CardCreate, db: Session = Depends(get_db), c
             approver = db.query(models.User).filter(models.User.id == card.approver_id).first()
             if not approver:
                 raise HTTPException(status_code=404, detail="Согласующий не найден")
-            logger.info(f"Согласующий найден: {approver.username}")
+            logger.debug("Согласующий найден: %s", approver.username)
 
         # Конвертируем строковое значение типа недвижимости в enum
         real_estate_type_value = None
@@ -400,9 +437,9 @@ async def create_card(card: schemas.CardCreate, db: Session = Depends(get_db), c
             try:
                 real_estate_type_enum = models.RealEstateType[card.real_estate_type]
                 real_estate_type_value = real_estate_type_enum.value  # Получаем строковое значение
-                logger.info(f"Тип недвижимости конвертирован: {card.real_estate_type} -> {real_estate_type_value}")
+                logger.debug("Тип недвижимости конвертирован: %s -> %s", card.real_estate_type, real_estate_type_value)
             except KeyError:
-                logger.error(f"Неизвестный тип недвижимости: {card.real_estate_type}")
+                logger.error("Неизвестный тип недвижимости: %s", card.real_estate_type)
                 raise HTTPException(status_code=422, detail=f"Неизвестный тип недвижимости: {card.real_estate_type}")
 
         # Конвертируем строковые значения РЦ в enum
@@ -411,9 +448,9 @@ async def create_card(card: schemas.CardCreate, db: Session = Depends(get_db), c
             try:
                 rc_mk_enum = models.RCType[card.rc_mk]
                 rc_mk_value = rc_mk_enum.value
-                logger.info(f"РЦ МК конвертирован: {card.rc_mk} -> {rc_mk_value}")
+                logger.debug("РЦ МК конвертирован: %s -> %s", card.rc_mk, rc_mk_value)
             except KeyError:
-                logger.error(f"Неизвестный РЦ МК: {card.rc_mk}")
+                logger.error("Неизвестный РЦ МК: %s", card.rc_mk)
                 raise HTTPException(status_code=422, detail=f"Неизвестный РЦ МК: {card.rc_mk}")
 
         rc_zm_value = None
@@ -421,23 +458,14 @@ async def create_card(card: schemas.CardCreate, db: Session = Depends(get_db), c
             try:
                 rc_zm_enum = models.RCType[card.rc_zm]
                 rc_zm_value = rc_zm_enum.value
-                logger.info(f"РЦ ЗМ конвертирован: {card.rc_zm} -> {rc_zm_value}")
+                logger.debug("РЦ ЗМ конвертирован: %s -> %s", card.rc_zm, rc_zm_value)
             except KeyError:
-                logger.error(f"Неизвестный РЦ ЗМ: {card.rc_zm}")
+                logger.error("Неизвестный РЦ ЗМ: %s", card.rc_zm)
                 raise HTTPException(status_code=422, detail=f"Неизвестный РЦ ЗМ: {card.rc_zm}")
 
-        # Генерируем следующий номер тикета
-        last_ticket = db.query(models.Card).order_by(models.Card.id.desc()).first()
-        if last_ticket and last_ticket.ticket_number:
-            # Извлекаем номер из последнего тикета (например, CMD-0000001 -> 1)
-            last_number = int(last_ticket.ticket_number.split('-')[1])
-            new_number = last_number + 1
-        else:
-            # Если нет тикетов или номера, начинаем с 1
-            new_number = 1
-        
-        ticket_number = f"CMD-{new_number:07d}"
-        logger.info(f"Генерирован номер тикета: {ticket_number}")
+        # Получаем следующий номер тикета из последовательности (атомарно, одним запросом)
+        ticket_number = allocate_ticket_number(db)
+        logger.debug("Генерирован номер тикета: %s", ticket_number)
 
         # Создаем новую карточку
         db_card = models.Card(
@@ -457,15 +485,13 @@ async def create_card(card: schemas.CardCreate, db: Session = Depends(get_db), c
         
         db.add(db_card)
         db.flush()  # Получаем ID карточки без commit
-        logger.info(f"Карточка создана с ID: {db_card.id}")
+        adjust_card_count(db, card.column_id, 1)
+        logger.info("Карточка создана с ID: %s", db_card.id)
         
         # Добавляем теги
         if card.tags:
-            logger.info(f"Добавляем теги к карточке {db_card.id}: {card.tags}")
-            logger.info(f"Тип тегов: {type(card.tags)}")
+            logger.debug("Добавляем теги к карточке %s: %s", db_card.id, card.tags)
             update_card_tags(db, db_card, card.tags)
-            logger.info(f"Теги добавлены: {[tag.name for tag in db_card.tags]}")
-            logger.info(f"Тип добавленных тегов: {type(db_card.tags)}")
         
         # Создаем запись в истории
         history_entry = models.CardHistory(
@@ -485,23 +511,17 @@ async def create_card(card: schemas.CardCreate, db: Session = Depends(get_db), c
             })
         )
         db.add(history_entry)
+        db.add(models.CardTransition(card_id=db_card.id, from_column_id=None, to_column_id=card.column_id))
+        
+        # Telegram уведомление согласующему сохраняется в очередь вместе с карточкой
+        enqueue_notification(db, APPROVER_ASSIGNED, approver, db_card)
         
         # Делаем окончательный commit всех изменений
         db.commit()
+        board_cache.bump_version()
+        wake_notification_worker()
         db.refresh(db_card)
-        logger.info(f"Карточка успешно сохранена в базу данных")
-        
-        # Отправляем Telegram уведомление согласующему, если он назначен
-        if approver:
-            try:
-                logger.info(f"Отправка Telegram уведомления согласующему {approver.username}")
-                success = send_approver_notification(approver, db_card)
-                if success:
-                    logger.info(f"Telegram уведомление успешно отправлено согласующему {approver.username}")
-                else:
-                    logger.warning(f"Не удалось отправить Telegram уведомление согласующему {approver.username}")
-            except Exception as e:
-                logger.error(f"Ошибка при отправке Telegram уведомления: {str(e)}")
+        logger.debug("Карточка успешно сохранена в базу данных")
         
         # Формируем ответ
         response_data = {
@@ -544,36 +564,121 @@ async def create_card(card: schemas.CardCreate, db: Session = Depends(get_db), c
                 "email": approver.email
             }
         
-        logger.info(f"Возвращаем ответ: {response_data}")
+        publish_board_event(CARD_CREATED, serialize_board_card(db_card))
+        
+        logger.debug("Возвращаем ответ: %s", response_data)
         return response_data
     except HTTPException:
         # Повторно выбрасываем HTTPException без изменений
         raise
     except Exception as e:
-        logger.error(f"Неожиданная ошибка при создании тикета: {str(e)}")
+        logger.error("Неожиданная ошибка при создании тикета: %s", e)
         logger.error("Полный стек ошибки:", exc_info=True)
         db.rollback()  # Откатываем транзакцию
         raise HTTPException(status_code=500, detail=str(e))
 
+# Массовые операции объявлены до маршрутов /api/cards/{card_id}, чтобы "bulk" не принимался за id карточки
+def _finish_bulk_operation(db: Session, result: BulkResult, operation: str, current_user: models.User) -> dict:
+    """Зафиксировать массовую операцию и оповестить клиентов одним событием"""
+    try:
+        db.commit()
+    except Exception as e:
+        logger.error("Ошибка при сохранении массовой операции (%s): %s", operation, e)
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Ошибка при сохранении в базу данных: {str(e)}")
+
+    if result.succeeded:
+        board_cache.bump_version()
+        wake_notification_worker()
+        # Одно событие вместо события на каждую карточку: клиенты перечитывают доску
+        publish_board_event(RESYNC, {"reason": operation, "card_ids": result.succeeded})
+    logger.info(
+        "Пользователь %s: массовая операция %s, успешно %s, ошибок %s", current_user.username, operation, len(result.succeeded), len(result.errors)
+    )
+    return result.to_dict()
+
+@app.post("/api/cards/bulk/move")
+async def bulk_move(
+    bulk_data: schemas.CardBulkMove,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Переместить несколько карточек в колонку одной транзакцией"""
+    to_column = db.query(models.KanbanColumn).filter(models.KanbanColumn.id == bulk_data.to_column).first()
+    if not to_column:
+        raise HTTPException(status_code=404, detail="Колонка назначения не найдена")
+
+    result = bulk_move_cards(db, bulk_data.card_ids, to_column)
+    return _finish_bulk_operation(db, result, "move", current_user)
+
+@app.post("/api/cards/bulk/update")
+async def bulk_update(
+    bulk_data: schemas.CardBulkUpdate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Применить одинаковые изменения (исполнитель, согласующий, теги, поля) к нескольким карточкам"""
+    changes = bulk_data.changes.dict(exclude_unset=True)
+    if not changes:
+        raise HTTPException(status_code=400, detail="Не указаны изменения")
+    if 'column_id' in changes:
+        raise HTTPException(status_code=400, detail="Для перемещения карточек используйте /api/cards/bulk/move")
+
+    if changes.get('assignee_id'):
+        if not db.query(models.User.id).filter(models.User.id == changes['assignee_id']).first():
+            raise HTTPException(status_code=404, detail="Исполнитель не найден")
+    if changes.get('approver_id'):
+        if not db.query(models.User.id).filter(models.User.id == changes['approver_id']).first():
+            raise HTTPException(status_code=404, detail="Согласующий не найден")
+
+    tag_names = changes.pop('tags', None)
+    try:
+        values = convert_card_values(changes)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    tags = None
+    if tag_names is not None:
+        tags = list({tag.id: tag for tag in (get_or_create_tag(db, name) for name in tag_names)}.values())
+
+    history_details = dict(changes)
+    if tag_names is not None:
+        history_details['tags'] = tag_names
+    result = bulk_update_cards(db, bulk_data.card_ids, values, tags, history_details)
+    return _finish_bulk_operation(db, result, "update", current_user)
+
+@app.post("/api/cards/bulk/delete")
+async def bulk_delete(
+    bulk_data: schemas.CardBulkDelete,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Удалить несколько карточек одной транзакцией"""
+    result = bulk_delete_cards(db, bulk_data.card_ids)
+    return _finish_bulk_operation(db, result, "delete", current_user)
+
 @app.post("/api/cards/{card_id}/move")
 async def move_card(
     card_id: int,
     move_data: schemas.CardMove,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    card = db.query(models.Card).filter(models.Card.id == card_id).first()
+    # Блокируем карточку до чтения ее колонки: параллельное перемещение ждет commit
+    card = await db.run_sync(lock_card, card_id)
     if not card:
         raise HTTPException(status_code=404, detail="Карточка не найдена")
     
     # Проверяем существование колонки назначения
-    target_column = db.query(models.KanbanColumn).filter(models.KanbanColumn.id == move_data.to_column).first()
+    target_column = await db.get(models.KanbanColumn, move_data.to_column)
     if not target_column:
         raise HTTPException(status_code=404, detail="Колонка назначения не найдена")
     
     # Если карточка не перемещается (остается в той же колонке), пропускаем проверку WIP лимита
     if card.column_id != move_data.to_column:
+        # Блокируем обе колонки до commit: параллельное перемещение не займет то же место
+        locked_columns = await db.run_sync(lock_columns, [card.column_id, move_data.to_column])
         # Проверяем WIP лимит только при перемещении в другую колонку
-        if not check_wip_limit(db, move_data.to_column):
+        if not has_wip_capacity(locked_columns[move_data.to_column]):
             # Получаем название колонки для ошибки
             column_name = target_column.title
             raise HTTPException(
@@ -589,32 +694,81 @@ async def move_card(
     )
     db.add(history_entry)
     
+    # Фиксируем смену стадии для статистики (перестановка внутри колонки стадию не меняет)
+    if card.column_id != move_data.to_column:
+        db.add(models.CardTransition(
+            card_id=card_id,
+            from_column_id=card.column_id,
+            to_column_id=move_data.to_column
+        ))
+        await db.run_sync(adjust_card_count, card.column_id, -1)
+        await db.run_sync(adjust_card_count, move_data.to_column, 1)
+    
     # Обновляем позицию карточки
+    from_column = card.column_id
     card.column_id = move_data.to_column
     card.position = move_data.new_position
     
-    db.commit()
+    await db.commit()
+    board_cache.bump_version()
+    publish_board_event(CARD_MOVED, {
+        "id": card_id,
+        "from_column": from_column,
+        "to_column": move_data.to_column,
+        "position": move_data.new_position
+    })
     return {"message": "Карточка успешно перемещена"}
 
 @app.get("/api/cards/{card_id}/history")
 async def get_card_history(
     card_id: int,
+    request: Request,
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы из заголовка X-Next-Cursor"),
+    limit: int = Query(PAGE_DEFAULT_LIMIT, ge=1, le=PAGE_MAX_LIMIT),
     db: Session = Depends(get_db)
 ):
+    """История карточки от новых записей к старым, постранично"""
     card = db.query(models.Card).filter(models.Card.id == card_id).first()
     if not card:
         raise HTTPException(status_code=404, detail="Карточка не найдена")
-        
-    history = db.query(models.CardHistory)\
-        .filter(models.CardHistory.card_id == card_id)\
-        .order_by(models.CardHistory.created_at.desc())\
-        .all()
-    return history
+    
+    # История только дополняется, поэтому ее версия - количество записей и последний id
+    history_count, last_history_id = db.query(
+        func.count(models.CardHistory.id), func.max(models.CardHistory.id)
+    ).filter(models.CardHistory.card_id == card_id).one()
+    etag = etag_for_version("history", card_id, history_count, last_history_id, cursor, limit)
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+    
+    try:
+        query = apply_keyset(
+            db.query(models.CardHistory).filter(models.CardHistory.card_id == card_id),
+            models.CardHistory.created_at, models.CardHistory.id,
+            cursor, limit, descending=True
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    history, next_cursor = split_page(query.all(), limit)
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return json_response_with_etag(request, render_json(history), etag, headers)
 
 @app.get("/api/auth/me", response_model=schemas.User)
 async def get_current_user_info(current_user: models.User = Depends(get_current_user)):
     return current_user
 
+@app.put("/api/auth/me/notification-settings", response_model=schemas.User)
+async def update_notification_settings(
+    notification_settings: schemas.NotificationSettingsUpdate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Включить или выключить режим уведомлений сводкой для текущего пользователя"""
+    current_user.notification_digest = notification_settings.notification_digest
+    db.commit()
+    db.refresh(current_user)
+    logger.info("Пользователь %s изменил режим сводки уведомлений: %s", current_user.username, current_user.notification_digest)
+    return current_user
+
 @app.get("/api/users", response_model=List[schemas.User])
 async def get_users(db: Session = Depends(get_db)):
     users = db.query(models.User).all()
@@ -640,183 +794,97 @@ async def get_rc_types():
         ]
     }
 
-def calculate_stage_time_statistics(db: Session, cards: List[models.Card]) -> dict:
-    """
-    Рассчитывает среднее время тикетов в каждой стадии на основе истории перемещений
-    """
-    from datetime import datetime, timezone
-    
-    # Получаем информацию о колонках для сопоставления названий со стадиями
-    columns = db.query(models.KanbanColumn).order_by(models.KanbanColumn.position).all()
-    column_to_stage = {}
-    
-    # Маппинг колонок к стадиям по позиции
-    for i, column in enumerate(columns):
-        if i == 0:
-            column_to_stage[column.id] = "Бэклог"
-        elif i == 1: 
-            column_to_stage[column.id] = "В работе"
-        elif i == 2:
-            column_to_stage[column.id] = "На согласовании"
+@app.get("/api/statistics")
+async def get_statistics(
+    assignee_id: Optional[int] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    group_by: Optional[str] = Query(
+        None,
+        description="Дополнительные разрезы через запятую: real_estate_type, rc_mk, rc_zm, tag"
+    )
+):
+    try:
+        dimensions = parse_group_by(group_by)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     
-    # Словарь для накопления временных интервалов по стадиям
-    stage_durations = {
-        "Бэклог": [],
-        "В работе": [],
-        "На согласовании": []
-    }
-    for card in cards:
-        # Получаем всю историю карточки
-        history = db.query(models.CardHistory)\
-            .filter(models.CardHistory.card_id == card.id)\
-            .order_by(models.CardHistory.created_at)\
-            .all()
-        
-        if not history:
-            continue
-            
-        # Начальное состояние: карточка создана в первой колонке, которая встречается в истории
-        creation_time = card.created_at
-        current_column_id = None
-        stage_start_time = creation_time
-        
-        # Находим первую колонку из истории создания или перемещения
-        for entry in history:
-            if entry.action == "created":
-                # Парсим JSON для получения column_id из деталей создания
-                import json
-                try:
-                    details = json.loads(entry.details)
-                    current_column_id = details.get("column_id")
-                    stage_start_time = entry.created_at
-                    break
-                except:
-                    pass
-            elif entry.action == "move" and "из колонки" in entry.details:
-                # Берем исходную колонку из первого перемещения
-                try:
-                    parts = entry.details.split()
-                    current_column_id = int(parts[3])  # "из колонки X"
-                    break
-                except:
-                    pass
+    def build_statistics(session: Session) -> dict:
+        # Завершенные дни берутся из дневных агрегатов, остальные считаются в БД по карточкам
+        aggregate = collect_statistics(session, assignee_id, start_date, end_date)
+        response_data = format_statistics(session, aggregate)
         
-        # Если не нашли колонку в истории, берем текущую колонку карточки
-        if current_column_id is None:
-            current_column_id = card.column_id
-            
-        current_stage = column_to_stage.get(current_column_id)
-        
-        # Обрабатываем все перемещения
-        for entry in history:
-            if entry.action == "move" and "в колонку" in entry.details:
-                try:
-                    parts = entry.details.split()
-                    from_column_id = int(parts[3])
-                    to_column_id = int(parts[6])
-                    
-                    # Завершаем текущую стадию и записываем время
-                    if current_stage and stage_start_time:
-                        duration = entry.created_at - stage_start_time
-                        hours = duration.total_seconds() / 3600
-                        if hours > 0:
-                            stage_durations[current_stage].append(hours)
-                    
-                    # Переходим в новую стадию
-                    current_column_id = to_column_id
-                    current_stage = column_to_stage.get(to_column_id)
-                    stage_start_time = entry.created_at
-                    
-                except (IndexError, ValueError, TypeError):
-                    continue
+        if dimensions:
+            response_data["breakdowns"] = calculate_breakdowns(session, dimensions, assignee_id, start_date, end_date)
         
-        # Добавляем время в текущей стадии (время с последнего перемещения до сейчас)
-        if current_stage and stage_start_time:
-            # Определяем текущее время в том же формате что и в базе
-            if stage_start_time.tzinfo is None:
-                current_time = datetime.utcnow()
-            else:
-                current_time = datetime.now(timezone.utc)
-                
-            current_duration = current_time - stage_start_time
-            current_hours = current_duration.total_seconds() / 3600
-            if current_hours > 0:
-                stage_durations[current_stage].append(current_hours)
+        return response_data
     
-    # Вычисляем статистику
-    result = {}
-    for stage_name in ["Бэклог", "В работе", "На согласовании"]:
-        times = stage_durations[stage_name]
-        if times:
-            avg_hours = sum(times) / len(times)
-            result[stage_name] = {
-                "average_hours": round(avg_hours, 2),
-                "average_days": round(avg_hours / 24, 2),
-                "tickets_count": len(times)
-            }
-        else:
-            result[stage_name] = {
-                "average_hours": 0,
-                "average_days": 0,
-                "tickets_count": 0
-            }
+    async def compute_statistics() -> dict:
+        # Своя сессия: результат может достаться нескольким запросам (app/singleflight.py)
+        async with AsyncSessionLocal() as db:
+            return await db.run_sync(build_statistics)
     
-    return result
+    try:
+        return await request_coalescer.run(
+            (
+                "GET /api/statistics",
+                assignee_id,
+                # Одинаковые даты в разной записи дают один ключ; даты со временем сравниваются как есть
+                parse_day(start_date) or start_date,
+                parse_day(end_date) or end_date,
+                tuple(dimensions),
+                board_cache.version
+            ),
+            compute_statistics
+        )
+    except Exception as e:
+        logger.error("Ошибка при получении статистики: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/statistics")
-async def get_statistics(
+@app.get("/api/export/{entity}")
+async def export_data(
+    entity: str,
+    file_format: str = Query("csv", alias="format", description="csv, jsonl или parquet"),
     assignee_id: Optional[int] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    db: Session = Depends(get_db)
+    current_user: models.User = Depends(get_current_user)
 ):
+    """
+    Потоковая выгрузка карточек (cards), истории (history) или комментариев (comments).
+    Фильтры те же, что у статистики; строки читаются серверным курсором порциями.
+    """
+    if entity not in EXPORTS:
+        raise HTTPException(status_code=404, detail=f"Неизвестная выгрузка: {entity}")
     try:
-        # Базовый запрос для карточек
-        query = db.query(models.Card)
-        
-        # Применяем фильтры
-        if assignee_id:
-            query = query.filter(models.Card.assignee_id == assignee_id)
-        if start_date:
-            query = query.filter(models.Card.created_at >= start_date)
-        if end_date:
-            query = query.filter(models.Card.created_at <= end_date)
-            
-        # Получаем все карточки с учетом фильтров
-        cards = query.all()
-        
-        # Считаем общую статистику
-        total_tickets = len(cards)
-        total_story_points = sum(card.story_points for card in cards if card.story_points)
-        average_story_points = total_story_points / total_tickets if total_tickets > 0 else 0
-        
-        # Статистика по колонкам
-        tickets_by_column = {}
-        for card in cards:
-            column = card.column
-            if column:
-                column_name = column.title
-                tickets_by_column[column_name] = tickets_by_column.get(column_name, 0) + 1
-        
-        # Статистика по исполнителям
-        tickets_by_assignee = {}
-        for card in cards:
-            if card.assignee:
-                assignee_name = card.assignee.username
-                tickets_by_assignee[assignee_name] = tickets_by_assignee.get(assignee_name, 0) + 1
-        
-        # Расчет среднего времени в стадиях
-        stage_time_stats = calculate_stage_time_statistics(db, cards)
-        
-        return {
-            "total_tickets": total_tickets,
-            "tickets_by_column": tickets_by_column,
-            "tickets_by_assignee": tickets_by_assignee,
-            "average_story_points": average_story_points,
-            "average_stage_times": stage_time_stats
-        }
+        check_export_format(file_format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    logger.info("Пользователь %s запросил выгрузку %s (%s)", current_user.username, entity, file_format)
+    filename = f"{entity}-{datetime.utcnow():%Y%m%d-%H%M%S}.{file_format}"
+    return StreamingResponse(
+        stream_export(entity, file_format, assignee_id, start_date, end_date),
+        media_type=EXPORT_MEDIA_TYPES[file_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@app.get("/api/search")
+async def search(
+    q: str = Query(..., min_length=1, max_length=SEARCH_QUERY_MAX_LENGTH, description="Текст запроса (синтаксис websearch)"),
+    limit: int = Query(SEARCH_DEFAULT_LIMIT, ge=1, le=SEARCH_MAX_LIMIT),
+    offset: int = Query(0, ge=0, le=SEARCH_MAX_OFFSET),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async)
+):
+    """
+    Полнотекстовый поиск тикетов по номеру, названию, описанию и комментариям.
+    Фрагмент (snippet) содержит подсветку <mark> и не экранируется - клиент должен санитизировать его.
+    """
+    try:
+        return await db.run_sync(lambda session: search_cards(session, q, limit, offset))
     except Exception as e:
-        logger.error(f"Ошибка при получении статистики: {str(e)}")
+        logger.error("Ошибка при поиске '%s': %s", q, e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/debug/users")
@@ -837,7 +905,7 @@ async def debug_users(db: Session = Depends(get_db)):
             ]
         }
     except Exception as e:
-        logger.error(f"Ошибка при получении списка пользователей: {str(e)}")
+        logger.error("Ошибка при получении списка пользователей: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ошибка при получении списка пользователей: {str(e)}"
@@ -856,6 +924,29 @@ async def debug_verify_password(password: str = Query(..., description="Паро
         "is_valid": is_valid
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Метрики запросов в текстовом формате Prometheus"""
+    return PlainTextResponse(
+        metrics_registry.render(get_pool_stats()) + request_coalescer.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+@app.get("/api/debug/db-pool")
+async def debug_db_pool():
+    """Состояние пула соединений с базой данных"""
+    return get_pool_stats()
+
+@app.get("/api/debug/board-cache")
+async def debug_board_cache():
+    """Статистика кеша снимка доски"""
+    return board_cache.stats()
+
+@app.get("/api/debug/singleflight")
+async def debug_singleflight():
+    """Счетчики объединения одновременных запросов доски и статистики"""
+    return request_coalescer.stats()
+
 @app.put("/api/cards/{card_id}", response_model=schemas.Card)
 async def update_card(
     card_id: int,
@@ -864,11 +955,12 @@ async def update_card(
     current_user: models.User = Depends(get_current_user)
 ):
     try:
-        logger.info(f"Начало обновления карточки {card_id}")
-        logger.info(f"Полученные данные: {card_update.dict()}")
+        logger.debug("Начало обновления карточки %s", card_id)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Полученные данные: %s", card_update.dict())
         
-        # Получаем карточку
-        db_card = db.query(models.Card).filter(models.Card.id == card_id).first()
+        # Получаем и блокируем карточку: ее колонка не изменится до commit
+        db_card = lock_card(db, card_id)
         if not db_card:
             raise HTTPException(status_code=404, detail="Карточка не найдена")
 
@@ -891,49 +983,60 @@ async def update_card(
 
         # Обновляем поля карточки
         update_data = card_update.dict(exclude_unset=True)
-        logger.info(f"Данные для обновления: {update_data}")
+        
+        # Смена колонки через редактирование - тоже переход между стадиями
+        if update_data.get('column_id') is not None and update_data['column_id'] != db_card.column_id:
+            db.add(models.CardTransition(
+                card_id=card_id,
+                from_column_id=db_card.column_id,
+                to_column_id=update_data['column_id']
+            ))
+            lock_columns(db, [db_card.column_id, update_data['column_id']])
+            adjust_card_count(db, db_card.column_id, -1)
+            adjust_card_count(db, update_data['column_id'], 1)
+        logger.debug("Данные для обновления: %s", update_data)
         
         # Конвертируем тип недвижимости если он есть
         real_estate_type_value = None
         if 'real_estate_type' in update_data and update_data['real_estate_type']:
             real_estate_type_constant = update_data['real_estate_type']
-            logger.info(f"Получен тип недвижимости: {real_estate_type_constant}")
+            logger.debug("Получен тип недвижимости: %s", real_estate_type_constant)
             
             # Конвертируем константу enum в значение enum для базы данных
             try:
                 enum_member = models.RealEstateType[real_estate_type_constant]
                 real_estate_type_value = enum_member.value
-                logger.info(f"Конвертирован тип недвижимости: {real_estate_type_constant} -> {real_estate_type_value}")
+                logger.debug("Конвертирован тип недвижимости: %s -> %s", real_estate_type_constant, real_estate_type_value)
             except KeyError:
-                logger.error(f"Неизвестный тип недвижимости: {real_estate_type_constant}")
+                logger.error("Неизвестный тип недвижимости: %s", real_estate_type_constant)
                 raise HTTPException(status_code=400, detail=f"Неизвестный тип недвижимости: {real_estate_type_constant}")
 
         # Конвертируем РЦ МК если он есть
         rc_mk_value = None
         if 'rc_mk' in update_data and update_data['rc_mk']:
             rc_mk_constant = update_data['rc_mk']
-            logger.info(f"Получен РЦ МК: {rc_mk_constant}")
+            logger.debug("Получен РЦ МК: %s", rc_mk_constant)
             
             try:
                 enum_member = models.RCType[rc_mk_constant]
                 rc_mk_value = enum_member.value
-                logger.info(f"Конвертирован РЦ МК: {rc_mk_constant} -> {rc_mk_value}")
+                logger.debug("Конвертирован РЦ МК: %s -> %s", rc_mk_constant, rc_mk_value)
             except KeyError:
-                logger.error(f"Неизвестный РЦ МК: {rc_mk_constant}")
+                logger.error("Неизвестный РЦ МК: %s", rc_mk_constant)
                 raise HTTPException(status_code=400, detail=f"Неизвестный РЦ МК: {rc_mk_constant}")
 
         # Конвертируем РЦ ЗМ если он есть
         rc_zm_value = None
         if 'rc_zm' in update_data and update_data['rc_zm']:
             rc_zm_constant = update_data['rc_zm']
-            logger.info(f"Получен РЦ ЗМ: {rc_zm_constant}")
+            logger.debug("Получен РЦ ЗМ: %s", rc_zm_constant)
             
             try:
                 enum_member = models.RCType[rc_zm_constant]
                 rc_zm_value = enum_member.value
-                logger.info(f"Конвертирован РЦ ЗМ: {rc_zm_constant} -> {rc_zm_value}")
+                logger.debug("Конвертирован РЦ ЗМ: %s -> %s", rc_zm_constant, rc_zm_value)
             except KeyError:
-                logger.error(f"Неизвестный РЦ ЗМ: {rc_zm_constant}")
+                logger.error("Неизвестный РЦ ЗМ: %s", rc_zm_constant)
                 raise HTTPException(status_code=400, detail=f"Неизвестный РЦ ЗМ: {rc_zm_constant}")
         
         for key, value in update_data.items():
@@ -954,25 +1057,21 @@ async def update_card(
 
         # Обновляем теги
         if 'tags' in update_data:
-            logger.info(f"Обновляем теги карточки {card_id}: {update_data['tags']}")
-            logger.info(f"Тип тегов: {type(update_data['tags'])}")
-            logger.info(f"Структура тегов: {[type(tag) for tag in update_data['tags']]}")
+            logger.debug("Обновляем теги карточки %s: %s", card_id, update_data['tags'])
             
             try:
                 # Очищаем существующие теги
                 db_card.tags = []
-                logger.info("Существующие теги очищены")
                 
                 # Добавляем новые теги
                 for tag_name in update_data['tags']:
-                    logger.info(f"Обрабатываем тег: {tag_name}, тип: {type(tag_name)}")
+                    logger.debug("Обрабатываем тег: %s", tag_name)
                     tag_obj = get_or_create_tag(db, tag_name)
-                    logger.info(f"Создан/получен тег: {tag_obj.name}, id: {tag_obj.id}")
+                    logger.debug("Создан/получен тег: %s, id: %s", tag_obj.name, tag_obj.id)
                     db_card.tags.append(tag_obj)
                 
-                logger.info(f"Теги обновлены: {[tag.name for tag in db_card.tags]}")
             except Exception as e:
-                logger.error(f"Ошибка при обновлении тегов: {str(e)}")
+                logger.error("Ошибка при обновлении тегов: %s", e)
                 logger.error("Полный стек ошибки:", exc_info=True)
                 raise HTTPException(status_code=500, detail=f"Ошибка при обновлении тегов: {str(e)}")
 
@@ -984,28 +1083,23 @@ async def update_card(
         )
         db.add(history_entry)
         
+        # Telegram уведомления о смене согласующего сохраняются в очередь вместе с изменениями
+        if 'approver_id' in update_data:
+            logger.info("Изменение согласующего: %s -> %s", old_approver.username if old_approver else 'None', approver.username if approver else 'None')
+            enqueue_approver_change(db, old_approver, approver, db_card)
+        
         try:
             db.commit()
+            board_cache.bump_version()
+            wake_notification_worker()
             db.refresh(db_card)
-            logger.info("Изменения успешно сохранены в базу данных")
+            logger.debug("Изменения успешно сохранены в базу данных")
         except Exception as e:
-            logger.error(f"Ошибка при сохранении в базу данных: {str(e)}")
+            logger.error("Ошибка при сохранении в базу данных: %s", e)
             logger.error("Полный стек ошибки:", exc_info=True)
             db.rollback()
             raise HTTPException(status_code=500, detail=f"Ошибка при сохранении в базу данных: {str(e)}")
 
-        # Отправляем Telegram уведомления при изменении согласующего
-        if 'approver_id' in update_data:
-            try:
-                logger.info(f"Изменение согласующего: {old_approver.username if old_approver else 'None'} -> {approver.username if approver else 'None'}")
-                success = send_approver_change_notification(old_approver, approver, db_card)
-                if success:
-                    logger.info("Telegram уведомления о смене согласующего успешно отправлены")
-                else:
-                    logger.warning("Не удалось отправить некоторые Telegram уведомления о смене согласующего")
-            except Exception as e:
-                logger.error(f"Ошибка при отправке Telegram уведомлений о смене согласующего: {str(e)}")
-
         # Формируем ответ
         response_data = {
             "id": db_card.id,
@@ -1047,36 +1141,63 @@ async def update_card(
                 "email": approver.email
             }
 
-        logger.info(f"Успешно обновлена карточка {card_id}")
+        publish_board_event(CARD_UPDATED, serialize_board_card(db_card))
+        
+        logger.info("Успешно обновлена карточка %s", card_id)
         return response_data
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Неожиданная ошибка при обновлении тикета: {str(e)}")
+        logger.error("Неожиданная ошибка при обновлении тикета: %s", e)
         logger.error("Полный стек ошибки:", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/cards/{card_id}/comments", response_model=List[schemas.Comment])
-def get_card_comments(
+async def get_card_comments(
     card_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    request: Request,
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы из заголовка X-Next-Cursor"),
+    limit: int = Query(PAGE_DEFAULT_LIMIT, ge=1, le=PAGE_MAX_LIMIT),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async)
 ):
-    comments = db.query(models.Comment).filter(models.Comment.ticket_id == card_id).all()
-    # Загружаем данные о пользователях для каждого комментария
-    for comment in comments:
-        comment.user = db.query(models.User).filter(models.User.id == comment.user_id).first()
-    return comments
+    """Комментарии карточки от старых к новым, постранично"""
+    # Комментарии только добавляются, поэтому их версия - количество и последний id
+    result = await db.execute(
+        select(func.count(models.Comment.id), func.max(models.Comment.id))
+        .filter(models.Comment.ticket_id == card_id)
+    )
+    comments_count, last_comment_id = result.one()
+    etag = etag_for_version("comments", card_id, comments_count, last_comment_id, cursor, limit)
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+    
+    # Авторов комментариев страницы загружаем одним дополнительным запросом
+    try:
+        statement = apply_keyset(
+            select(models.Comment)
+            .options(selectinload(models.Comment.user))
+            .filter(models.Comment.ticket_id == card_id),
+            models.Comment.created_at, models.Comment.id,
+            cursor, limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    result = await db.execute(statement)
+    comments, next_cursor = split_page(result.scalars().all(), limit)
+    body = render_json([schemas.Comment.model_validate(comment) for comment in comments])
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return json_response_with_etag(request, body, etag, headers)
 
 @app.post("/api/cards/{card_id}/comments", response_model=schemas.Comment)
-def create_card_comment(
+async def create_card_comment(
     card_id: int,
     comment: schemas.CommentCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async)
 ):
     # Проверяем существование карточки
-    card = db.query(models.Card).filter(models.Card.id == card_id).first()
+    card = await db.get(models.Card, card_id)
     if not card:
         raise HTTPException(status_code=404, detail="Карточка не найдена")
     
@@ -1086,25 +1207,29 @@ def create_card_comment(
         user_id=current_user.id
     )
     db.add(db_comment)
-    db.commit()
-    db.refresh(db_comment)
+    await db.commit()
+    await db.refresh(db_comment)
     # Загружаем данные о пользователе для нового комментария
     db_comment.user = current_user
     return db_comment
 
 @app.get("/api/cards/{card_id}")
-async def get_card(card_id: int, db: Session = Depends(get_db)):
+async def get_card(card_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
     try:
-        card = db.query(models.Card).filter(models.Card.id == card_id).first()
+        # Загружаем карточку вместе с тегами, исполнителем и согласующим
+        result = await db.execute(
+            select(models.Card)
+            .options(
+                selectinload(models.Card.tags),
+                selectinload(models.Card.assignee),
+                selectinload(models.Card.approver)
+            )
+            .filter(models.Card.id == card_id)
+        )
+        card = result.scalars().first()
         if not card:
             raise HTTPException(status_code=404, detail="Карточка не найдена")
         
-        # Загружаем теги
-        card.tags = db.query(models.Tag).join(models.CardTag).filter(models.CardTag.card_id == card.id).all()
-        logger.info(f"Получены теги карточки {card_id}: {[tag.name for tag in card.tags]}")
-        logger.info(f"Получены теги карточки {card_id} (полные данные): {[tag.__dict__ for tag in card.tags]}")
-        logger.info(f"Получены теги карточки {card_id} (тип): {type(card.tags)}")
-        
         # Формируем ответ
         response_data = {
             "id": card.id,
@@ -1146,10 +1271,12 @@ async def get_card(card_id: int, db: Session = Depends(get_db)):
                 "email": card.approver.email
             }
         
-        logger.info(f"Отправляем ответ для карточки {card_id}: {response_data}")
-        return response_data
+        logger.debug("Отправляем ответ для карточки %s: %s", card_id, response_data)
+        # ETag по содержимому: учитывает теги и данные исполнителей, которые не меняют updated_at
+        body = render_json(response_data)
+        return json_response_with_etag(request, body, etag_for_body(body))
     except Exception as e:
-        logger.error(f"Ошибка при получении карточки {card_id}: {str(e)}")
+        logger.error("Ошибка при получении карточки %s: %s", card_id, e)
         logger.error("Полный стек ошибки:", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1160,10 +1287,10 @@ async def delete_card(
     current_user: models.User = Depends(get_current_user)
 ):
     try:
-        logger.info(f"Начало удаления карточки {card_id} пользователем {current_user.username}")
+        logger.debug("Начало удаления карточки %s пользователем %s", card_id, current_user.username)
         
-        # Получаем карточку
-        db_card = db.query(models.Card).filter(models.Card.id == card_id).first()
+        # Получаем и блокируем карточку: счетчик уменьшается у колонки, в которой она лежит на момент удаления
+        db_card = lock_card(db, card_id)
         if not db_card:
             raise HTTPException(status_code=404, detail="Карточка не найдена")
 
@@ -1171,6 +1298,7 @@ async def delete_card(
         card_info = {
             "title": db_card.title,
             "description": db_card.description,
+            "column_id": db_card.column_id,
             "deleted_by": current_user.username
         }
         
@@ -1179,15 +1307,19 @@ async def delete_card(
         
         # Удаляем карточку (комментарии и история удалятся автоматически благодаря cascade)
         db.delete(db_card)
+        adjust_card_count(db, card_info["column_id"], -1)
         
         try:
             db.commit()
-            logger.info(f"Карточка {card_id} '{card_info['title']}' успешно удалена пользователем {current_user.username}")
+            board_cache.bump_version()
+            logger.info("Карточка %s '%s' успешно удалена пользователем %s", card_id, card_info['title'], current_user.username)
         except Exception as e:
-            logger.error(f"Ошибка при удалении карточки {card_id}: {str(e)}")
+            logger.error("Ошибка при удалении карточки %s: %s", card_id, e)
             db.rollback()
             raise HTTPException(status_code=500, detail=f"Ошибка при удалении карточки: {str(e)}")
 
+        publish_board_event(CARD_DELETED, {"id": card_id, "column_id": card_info["column_id"]})
+        
         return {
             "message": f"Карточка '{card_info['title']}' успешно удалена", 
             "deleted_card_id": card_id
@@ -1196,7 +1328,7 @@ async def delete_card(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Неожиданная ошибка при удалении карточки {card_id}: {str(e)}")
+        logger.error("Неожиданная ошибка при удалении карточки %s: %s", card_id, e)
         logger.error("Полный стек ошибки:", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1230,7 +1362,7 @@ async def get_all_users_for_admin(
         users = db.query(models.User).order_by(models.User.created_at).all()
         return users
     except Exception as e:
-        logger.error(f"Ошибка при получении пользователей для админки: {str(e)}")
+        logger.error("Ошибка при получении пользователей для админки: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ошибка при получении списка пользователей: {str(e)}"
@@ -1271,9 +1403,10 @@ async def update_user_role(
         old_role = user.role
         user.role = role_data.role
         db.commit()
+        board_cache.bump_version()
         db.refresh(user)
         
-        logger.info(f"Админ {current_user.username} изменил роль пользователя {user.username} с {old_role.value} на {role_data.role.value}")
+        logger.info("Админ %s изменил роль пользователя %s с %s на %s", current_user.username, user.username, old_role.value, role_data.role.value)
         
         return {
             "message": f"Роль пользователя {user.username} успешно изменена на {role_data.role.value}",
@@ -1288,7 +1421,7 @@ async def update_user_role(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Ошибка при обновлении роли пользователя: {str(e)}")
+        logger.error("Ошибка при обновлении роли пользователя: %s", e)
         db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -1306,6 +1439,58 @@ async def get_available_roles(current_user: models.User = Depends(require_admin_
         ]
     }
 
+@app.put("/api/admin/board-cache")
+async def set_board_cache_enabled(
+    enabled: bool = Query(..., description="Включить или отключить кеш снимка доски"),
+    current_user: models.User = Depends(require_admin_role)
+):
+    """Включить или отключить кеш снимка доски без перезапуска (для отладки)"""
+    board_cache.enabled = enabled
+    board_cache.bump_version()
+    logger.info("Админ %s %s кеш снимка доски", current_user.username, 'включил' if enabled else 'отключил')
+    return board_cache.stats()
+
+@app.post("/api/admin/import/cards")
+async def import_cards_file(
+    file: UploadFile = File(..., description="CSV или JSONL с полями карточек"),
+    file_format: Optional[str] = Query(None, alias="format", description="csv или jsonl (по умолчанию по расширению файла)"),
+    chunk_size: int = Query(IMPORT_DEFAULT_CHUNK_SIZE, ge=1, le=IMPORT_MAX_CHUNK_SIZE),
+    current_user: models.User = Depends(require_admin_role)
+):
+    """
+    Потоковый импорт тикетов (только для админов).
+    Ответ - JSONL: строка прогресса после каждой порции и итоговая строка с ошибками строк файла.
+    """
+    file_format = file_format or ("jsonl" if (file.filename or "").endswith((".jsonl", ".ndjson")) else "csv")
+    if file_format not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Формат импорта должен быть одним из: {', '.join(IMPORT_FORMATS)}")
+    author_id = current_user.id
+    logger.info("Админ %s запустил импорт тикетов из %s (%s)", current_user.username, file.filename, file_format)
+
+    def import_progress():
+        db = SessionLocal()
+        stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+        importer = None
+        try:
+            importer = CardImporter(db, author_id, chunk_size)
+            for progress in importer.run(iter_rows(stream, file_format)):
+                yield json.dumps({"type": "progress", **progress}) + "\n"
+            yield json.dumps({"type": "done", **importer.summary()}, ensure_ascii=False) + "\n"
+        except Exception as e:
+            db.rollback()
+            logger.error("Ошибка при импорте тикетов: %s", e)
+            progress = importer.progress() if importer else {}
+            yield json.dumps({"type": "error", "detail": str(e), **progress}, ensure_ascii=False) + "\n"
+        finally:
+            stream.detach()
+            db.close()
+            if importer and importer.imported:
+                board_cache.bump_version()
+                publish_board_event(RESYNC, {"reason": "import", "imported": importer.imported})
+
+    # Генератор синхронный: Starlette выполняет его в пуле потоков, не блокируя event loop
+    return StreamingResponse(import_progress(), media_type="application/x-ndjson")
+
 # API endpoints для управления WIP лимитами (только для curator и admin)
 @app.get("/api/curator/columns")
 async def get_columns_for_curator(
@@ -1318,19 +1503,18 @@ async def get_columns_for_curator(
         
         result = []
         for column in columns:
-            cards_count = db.query(models.Card).filter(models.Card.column_id == column.id).count()
             result.append({
                 "id": column.id,
                 "title": column.title,
                 "position": column.position,
                 "color": column.color,
                 "wip_limit": column.wip_limit,
-                "cards_count": cards_count
+                "cards_count": column.card_count
             })
         
         return result
     except Exception as e:
-        logger.error(f"Ошибка при получении колонок для куратора: {str(e)}")
+        logger.error("Ошибка при получении колонок для куратора: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ошибка при получении колонок: {str(e)}"
@@ -1364,12 +1548,19 @@ async def update_wip_limit(
         old_limit = column.wip_limit
         column.wip_limit = wip_data.wip_limit
         db.commit()
+        board_cache.bump_version()
         db.refresh(column)
         
-        # Получаем текущее количество карточек в колонке
-        cards_count = db.query(models.Card).filter(models.Card.column_id == column_id).count()
+        # Текущее количество карточек в колонке
+        cards_count = column.card_count
+        
+        publish_board_event(WIP_LIMIT_CHANGED, {
+            "column_id": column.id,
+            "wip_limit": column.wip_limit,
+            "cards_count": cards_count
+        })
         
-        logger.info(f"Куратор {current_user.username} изменил WIP лимит колонки '{column.title}' с {old_limit} на {wip_data.wip_limit}")
+        logger.info("Куратор %s изменил WIP лимит колонки '%s' с %s на %s", current_user.username, column.title, old_limit, wip_data.wip_limit)
         
         return {
             "message": f"WIP лимит колонки '{column.title}' успешно {'установлен' if old_limit is None else 'изменен'}",
@@ -1384,39 +1575,17 @@ async def update_wip_limit(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Ошибка при обновлении WIP лимита: {str(e)}")
+        logger.error("Ошибка при обновлении WIP лимита: %s", e)
         db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ошибка при обновлении WIP лимита: {str(e)}"
         )
 
-# Функция для проверки WIP лимитов
-def check_wip_limit(db: Session, column_id: int) -> bool:
-    """Проверить, можно ли добавить карточку в колонку (не превышен ли WIP лимит)"""
-    try:
-        column = db.query(models.KanbanColumn).filter(models.KanbanColumn.id == column_id).first()
-        if not column:
-            return True  # Если колонка не найдена, разрешаем (будет ошибка позже)
-        
-        # Если лимит не установлен, разрешаем
-        if column.wip_limit is None:
-            return True
-        
-        # Считаем текущее количество карточек в колонке
-        current_cards_count = db.query(models.Card).filter(models.Card.column_id == column_id).count()
-        
-        # Проверяем, не превышен ли лимит
-        return current_cards_count < column.wip_limit
-        
-    except Exception as e:
-        logger.error(f"Ошибка при проверке WIP лимита для колонки {column_id}: {str(e)}")
-        return True  # В случае ошибки разрешаем (не блокируем пользователя)
-
 # Добавляем обработчик ошибок
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
-    logger.error(f"Глобальная ошибка: {str(exc)}")
+    logger.error("Глобальная ошибка: %s", exc)
     return JSONResponse(
         status_code=500,
         content={"detail": str(exc)},
@@ -0,0 +1,243 @@
+"""
+Метрики запросов: время ответа, коды ответов, запросы в обработке, SQL на запрос
+
+MetricsMiddleware (ASGI) замеряет каждый HTTP-запрос и кладет в contextvar
+счетчик RequestStats. Слушатели курсора SQLAlchemy (подключаются к движкам
+в database.py и async_database.py) добавляют к нему количество SQL-запросов
+и время в базе данных. Контекст копируется в пул потоков Starlette и в
+AsyncSession.run_sync, поэтому запросы синхронных эндпоинтов тоже учитываются.
+Запросы фоновых задач (вне HTTP-запроса) не учитываются.
+
+Метрики отдаются в текстовом формате Prometheus на GET /metrics. Маршрут
+берется шаблоном (/api/cards/{card_id}), чтобы число временных рядов не росло
+с количеством карточек. С METRICS_SERVER_TIMING=true в ответ добавляется
+заголовок Server-Timing (время приложения и БД, количество SQL-запросов на момент
+начала ответа). В режиме разработки каждый запрос дополнительно разбирается
+детектором N+1 и медленных запросов (app/query_inspector.py).
+"""
+
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from .query_inspector import QueryInspection, QUERY_COUNT_HEADER, new_inspection
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Границы гистограмм (верхние, включительно), как в клиентах Prometheus
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+# Маршрут запросов, не совпавших ни с одним эндпоинтом (404)
+UNMATCHED_ROUTE = "unmatched"
+
+
+class RequestStats:
+    """SQL-запросы и время в базе данных в рамках одного HTTP-запроса"""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        # Разбор запросов по формам (только в режиме разработки)
+        self.inspection: Optional[QueryInspection] = None
+
+
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """Слушатель движка: запомнить время начала SQL-запроса"""
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """Слушатель движка: отнести SQL-запрос к текущему HTTP-запросу"""
+    started = conn.info["query_started"].pop()
+    stats = current_request_stats.get()
+    if stats is not None:
+        seconds = time.perf_counter() - started
+        stats.queries += 1
+        stats.db_seconds += seconds
+        if stats.inspection is not None:
+            stats.inspection.record(statement, seconds)
+
+
+def handle_error(exception_context):
+    """Слушатель движка: убрать время начала запроса, завершившегося ошибкой"""
+    started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами: счетчики по корзинам, сумма и количество"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in labels.items()) + "}"
+
+
+class MetricsRegistry:
+    """Метрики HTTP-запросов по (метод, маршрут)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.responses: Dict[Tuple[str, str, int], int] = {}
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.queries: Dict[Tuple[str, str], Histogram] = {}
+        self.db_seconds: Dict[Tuple[str, str], float] = {}
+
+    def request_started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def request_finished(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        with self._lock:
+            self.in_flight -= 1
+            key = (method, route)
+            self.responses[(method, route, status)] = self.responses.get((method, route, status), 0) + 1
+            self.latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self.queries.setdefault(key, Histogram(QUERY_COUNT_BUCKETS)).observe(stats.queries)
+            self.db_seconds[key] = self.db_seconds.get(key, 0.0) + stats.db_seconds
+
+    def _render_histogram(self, lines: List[str], name: str, histograms: Dict[Tuple[str, str], Histogram]):
+        for (method, route), histogram in sorted(histograms.items()):
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(method=method, route=route, le=bound)} {cumulative}")
+            lines.append(f"{name}_bucket{_labels(method=method, route=route, le='+Inf')} {histogram.count}")
+            lines.append(f"{name}_sum{_labels(method=method, route=route)} {histogram.sum}")
+            lines.append(f"{name}_count{_labels(method=method, route=route)} {histogram.count}")
+
+    def render(self, pool_stats: Optional[dict] = None) -> str:
+        """Метрики в текстовом формате Prometheus (version 0.0.4)"""
+        lines: List[str] = []
+        with self._lock:
+            lines += [
+                "# HELP http_requests_in_flight HTTP-запросы в обработке",
+                "# TYPE http_requests_in_flight gauge",
+                f"http_requests_in_flight {self.in_flight}",
+                "# HELP http_responses_total Ответы по маршрутам и кодам",
+                "# TYPE http_responses_total counter",
+            ]
+            for (method, route, status), value in sorted(self.responses.items()):
+                lines.append(f"http_responses_total{_labels(method=method, route=route, status=status)} {value}")
+
+            lines += [
+                "# HELP http_request_duration_seconds Время обработки запроса",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            self._render_histogram(lines, "http_request_duration_seconds", self.latency)
+
+            lines += [
+                "# HELP http_request_db_queries SQL-запросов на HTTP-запрос",
+                "# TYPE http_request_db_queries histogram",
+            ]
+            self._render_histogram(lines, "http_request_db_queries", self.queries)
+
+            lines += [
+                "# HELP http_request_db_seconds_total Время в базе данных по маршрутам",
+                "# TYPE http_request_db_seconds_total counter",
+            ]
+            for (method, route), value in sorted(self.db_seconds.items()):
+                lines.append(f"http_request_db_seconds_total{_labels(method=method, route=route)} {value}")
+
+        if pool_stats:
+            lines += [
+                "# HELP db_pool_checked_out Соединения пула, выданные приложению",
+                "# TYPE db_pool_checked_out gauge",
+                f"db_pool_checked_out {pool_stats['checked_out']}",
+                "# HELP db_pool_overflow Соединения сверх размера пула",
+                "# TYPE db_pool_overflow gauge",
+                f"db_pool_overflow {pool_stats['overflow']}",
+                "# HELP db_pool_timeouts_total Таймауты ожидания соединения",
+                "# TYPE db_pool_timeouts_total counter",
+                f"db_pool_timeouts_total {pool_stats['timeouts']}",
+            ]
+        return "\n".join(lines) + "\n"
+
+
+metrics_registry = MetricsRegistry()
+
+
+def route_template(scope: dict) -> str:
+    """Шаблон маршрута, с которым совпал запрос (FastAPI кладет маршрут в scope)"""
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+def format_server_timing(app_seconds: float, stats: RequestStats) -> str:
+    return (
+        f"app;dur={app_seconds * 1000:.1f}, "
+        f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries"'
+    )
+
+
+class MetricsMiddleware:
+    """ASGI-middleware: время ответа, код ответа, запросы в обработке и SQL-запросы по маршрутам"""
+
+    def __init__(self, app, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        stats.inspection = new_inspection()
+        token = current_request_stats.set(stats)
+        started = time.perf_counter()
+        method = scope["method"]
+        status = 500
+        metrics_registry.request_started()
+
+        async def send_with_metrics(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                extra_headers = []
+                if self.server_timing:
+                    extra_headers.append((
+                        b"server-timing",
+                        format_server_timing(time.perf_counter() - started, stats).encode("latin-1")
+                    ))
+                if stats.inspection is not None:
+                    extra_headers.append((QUERY_COUNT_HEADER.lower().encode("latin-1"), str(stats.queries).encode("latin-1")))
+                if extra_headers:
+                    message = {**message, "headers": list(message.get("headers", [])) + extra_headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            # Роутер FastAPI дописывает совпавший маршрут в scope
+            route = route_template(scope)
+            metrics_registry.request_finished(method, route, status, time.perf_counter() - started, stats)
+            current_request_stats.reset(token)
+            if stats.inspection is not None:
+                report = stats.inspection.report(method, route, stats.queries)
+                if report:
+                    logger.warning("Подозрительные SQL-запросы:\n%s", report)
@@ -1,5 +1,6 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, Text, Table, Enum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, Date, Float, Text, Table, Enum, Index, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 from .database import Base
 from datetime import datetime
@@ -26,6 +27,20 @@ class UserRole(enum.Enum):
     CURATOR = "CURATOR"
     ADMIN = "ADMIN"
 
+# Выражения полнотекстовых векторов (миграция 020): русская конфигурация для кириллицы,
+# английская - для латиницы
+CARD_SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('simple'::regconfig, coalesce(ticket_number, '')), 'A') || "
+    "setweight(to_tsvector('russian'::regconfig, coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english'::regconfig, coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('russian'::regconfig, coalesce(description, '')), 'B') || "
+    "setweight(to_tsvector('english'::regconfig, coalesce(description, '')), 'B')"
+)
+COMMENT_SEARCH_VECTOR_SQL = (
+    "to_tsvector('russian'::regconfig, coalesce(content, '')) || "
+    "to_tsvector('english'::regconfig, coalesce(content, ''))"
+)
+
 class User(Base):
     __tablename__ = "users"
 
@@ -37,6 +52,7 @@ class User(Base):
     role = Column(Enum(UserRole), default=UserRole.USER, nullable=False)  # Роль пользователя
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    notification_digest = Column(Boolean, default=False, server_default="false", nullable=False)  # Уведомления сводкой
     
     boards = relationship("Board", back_populates="owner")
     assigned_cards = relationship("Card", foreign_keys="Card.assignee_id", back_populates="assignee")
@@ -65,6 +81,7 @@ class KanbanColumn(Base):
     color = Column(String(7), default="#FFFFFF")
     board_id = Column(Integer, ForeignKey("boards.id"), nullable=False)
     wip_limit = Column(Integer, nullable=True, comment="WIP лимит для колонки (Work In Progress)")
+    card_count = Column(Integer, nullable=False, default=0, server_default="0", comment="Количество карточек в колонке (app/columns.py)")
     
     board = relationship("Board", back_populates="columns")
     cards = relationship("Card", back_populates="column", cascade="all, delete-orphan")
@@ -82,10 +99,13 @@ class CardTag(Base):
     __tablename__ = "card_tags"
 
     card_id = Column(Integer, ForeignKey("cards.id", ondelete="CASCADE"), primary_key=True)
-    tag_id = Column(Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True)
+    tag_id = Column(Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True, index=True)
 
 class Card(Base):
     __tablename__ = "cards"
+    __table_args__ = (
+        Index("ix_cards_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     ticket_number = Column(String(20), unique=True, nullable=False, index=True, comment="Уникальный номер тикета в формате CMD-0000001")
@@ -93,10 +113,10 @@ class Card(Base):
     description = Column(String)
     position = Column(Integer)
     story_points = Column(Integer)
-    column_id = Column(Integer, ForeignKey("columns.id"), nullable=False)
-    assignee_id = Column(Integer, ForeignKey("users.id"))
-    approver_id = Column(Integer, ForeignKey("users.id"))
-    created_by = Column(Integer, ForeignKey("users.id"))
+    column_id = Column(Integer, ForeignKey("columns.id"), nullable=False, index=True)
+    assignee_id = Column(Integer, ForeignKey("users.id"), index=True)
+    approver_id = Column(Integer, ForeignKey("users.id"), index=True)
+    created_by = Column(Integer, ForeignKey("users.id"), index=True)
     real_estate_type = Column(Enum(
         'офис',
         'здание',
@@ -122,19 +142,25 @@ class Card(Base):
         'Сибирь',
         name='rc_zm_enum'
     ), nullable=True, comment="РЦ ЗМ")
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Пересчитывается базой данных при каждой записи; не загружается вместе с карточкой
+    search_vector = deferred(Column(TSVECTOR, Computed(CARD_SEARCH_VECTOR_SQL, persisted=True)))
     
     column = relationship("KanbanColumn", back_populates="cards")
     assignee = relationship("User", foreign_keys=[assignee_id], back_populates="assigned_cards")
     approver = relationship("User", foreign_keys=[approver_id], back_populates="approved_cards")
     creator = relationship("User", foreign_keys=[created_by], back_populates="created_cards")
     history = relationship("CardHistory", back_populates="card", cascade="all, delete-orphan")
+    transitions = relationship("CardTransition", back_populates="card", cascade="all, delete-orphan")
     comments = relationship("Comment", back_populates="ticket", cascade="all, delete-orphan")
     tags = relationship("Tag", secondary="card_tags", back_populates="cards")
 
 class CardHistory(Base):
     __tablename__ = "card_history"
+    __table_args__ = (
+        Index("ix_card_history_card_id_created_at", "card_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     card_id = Column(Integer, ForeignKey("cards.id", ondelete="CASCADE"), nullable=False)
@@ -144,14 +170,74 @@ class CardHistory(Base):
     
     card = relationship("Card", back_populates="history")
 
+class CardTransition(Base):
+    __tablename__ = "card_transitions"
+    __table_args__ = (
+        Index("ix_card_transitions_card_id_created_at", "card_id", "created_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    card_id = Column(Integer, ForeignKey("cards.id", ondelete="CASCADE"), nullable=False)
+    from_column_id = Column(Integer, nullable=True)  # None - карточка создана в колонке to_column_id
+    to_column_id = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    card = relationship("Card", back_populates="transitions")
+
 class Comment(Base):
     __tablename__ = "comments"
+    __table_args__ = (
+        Index("ix_comments_ticket_id_created_at", "ticket_id", "created_at"),
+        Index("ix_comments_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     content = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     ticket_id = Column(Integer, ForeignKey("cards.id", ondelete="CASCADE"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    search_vector = deferred(Column(TSVECTOR, Computed(COMMENT_SEARCH_VECTOR_SQL, persisted=True)))
 
     ticket = relationship("Card", back_populates="comments")
-    user = relationship("User", back_populates="comments") 
\ No newline at end of file
+    user = relationship("User", back_populates="comments") 
+
+class StatisticsDailyStageRollup(Base):
+    """Суммарное время в колонках по дню создания и измерениям карточки"""
+    __tablename__ = "statistics_daily_stage_rollups"
+
+    id = Column(Integer, primary_key=True)
+    day = Column(Date, nullable=False, index=True)
+    column_id = Column(Integer, nullable=False)  # Колонка, в которой карточка провела время
+    assignee_id = Column(Integer, nullable=True)
+    real_estate_type = Column(String(50), nullable=True)
+    rc_mk = Column(String(20), nullable=True)
+    rc_zm = Column(String(20), nullable=True)
+    hours_sum = Column(Float, nullable=False, default=0)
+    segments_count = Column(Integer, nullable=False, default=0)
+
+class StatisticsRollupState(Base):
+    """Состояние агрегатов статистики: дни до covered_until (не включая) посчитаны заранее"""
+    __tablename__ = "statistics_rollup_state"
+
+    id = Column(Integer, primary_key=True)
+    covered_until = Column(Date, nullable=False)
+    refreshed_at = Column(DateTime(timezone=True), nullable=False)
+
+class NotificationOutbox(Base):
+    """Очередь Telegram-уведомлений: запись создается в одной транзакции с изменением карточки"""
+    __tablename__ = "notification_outbox"
+    __table_args__ = (
+        Index("ix_notification_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    card_id = Column(Integer, ForeignKey("cards.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)  # Получатель
+    chat_id = Column(String(100), nullable=False)
+    kind = Column(String(50), nullable=False)  # approver_assigned / approver_unassigned
+    status = Column(String(20), nullable=False, default="pending")  # pending / sent / coalesced / failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    sent_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,423 @@
+"""
+Очередь Telegram-уведомлений (transactional outbox)
+
+Эндпоинты не обращаются к Telegram API: они добавляют записи в notification_outbox
+в той же транзакции, что и изменение карточки, поэтому уведомление не теряется
+при сбое и не отправляется для откатившейся транзакции. Фоновый воркер забирает
+записи через SELECT ... FOR UPDATE SKIP LOCKED (можно запускать в нескольких
+процессах), объединяет события одного тикета для одного получателя и отправляет
+их с ограничением частоты и повтором с экспоненциальной задержкой.
+
+Записи забираются короткой транзакцией: они помечаются статусом sending с арендой
+на SENDING_LEASE_SECONDS, и транзакция фиксируется. Сообщения отправляются вне
+транзакции - медленный Telegram API не держит соединение с БД и блокировки строк
+(удаление карточки каскадно удаляет ее записи очереди). Результат каждого
+сообщения записывается отдельной короткой транзакцией. Если воркер упал во время
+отправки, записи с истекшей арендой забираются снова (доставка "хотя бы один раз").
+Отправленные и объединенные записи удаляются через NOTIFICATION_RETENTION_DAYS.
+
+Пользователи в режиме сводки (users.notification_digest) получают одно сообщение
+со всеми назначениями и снятиями за окно NOTIFICATION_DIGEST_WINDOW_MINUTES
+(несколько, если сводка не помещается в лимит длины сообщения Telegram).
+Пользовательский текст экранируется для parse_mode Markdown.
+
+Ручной разбор очереди: python -m app.notifications
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from . import models
+from .database import SessionLocal
+from .config import settings
+from .telegram_bot import (
+    TELEGRAM_BOT_TOKEN,
+    TELEGRAM_MESSAGE_LIMIT,
+    TelegramSendError,
+    deliver_telegram_message,
+    escape_markdown,
+    shorten,
+    telegram_length,
+    format_approver_assigned_message,
+    format_approver_unassigned_message,
+)
+import logging
+
+logger = logging.getLogger(__name__)
+
+APPROVER_ASSIGNED = "approver_assigned"
+APPROVER_UNASSIGNED = "approver_unassigned"
+
+MESSAGE_FORMATTERS = {
+    APPROVER_ASSIGNED: format_approver_assigned_message,
+    APPROVER_UNASSIGNED: format_approver_unassigned_message,
+}
+
+# Сколько записей забирать из очереди за один проход
+OUTBOX_BATCH_SIZE = 50
+# Сколько символов названия тикета включать в строку сводки
+DIGEST_TITLE_LENGTH = 200
+# Аренда забранных записей: за это время порция должна быть отправлена
+# (50 сообщений с таймаутом Telegram API 10 секунд и ограничением частоты)
+SENDING_LEASE_SECONDS = 900
+# Задержка повтора: RETRY_BASE_SECONDS * 2^(попытка - 1), но не больше RETRY_MAX_SECONDS
+RETRY_BASE_SECONDS = 5
+RETRY_MAX_SECONDS = 3600
+
+_stop_event = threading.Event()
+_wake_event = threading.Event()
+_worker: Optional[threading.Thread] = None
+
+
+def enqueue_notification(db: Session, kind: str, recipient: Optional[models.User], card: models.Card):
+    """
+    Добавить уведомление в очередь. Сохраняется вместе с текущей транзакцией сессии.
+    Пользователи без Telegram пропускаются. Для пользователей в режиме сводки
+    отправка откладывается на NOTIFICATION_DIGEST_WINDOW_MINUTES.
+    """
+    if recipient is None:
+        return
+    if not recipient.telegram:
+        logger.warning("У пользователя %s не указан Telegram", recipient.username)
+        return
+    if not TELEGRAM_BOT_TOKEN:
+        logger.debug("TELEGRAM_BOT_TOKEN не установлен, уведомление не ставится в очередь")
+        return
+    entry = models.NotificationOutbox(
+        card_id=card.id,
+        user_id=recipient.id,
+        chat_id=recipient.telegram,
+        kind=kind,
+        status="pending",
+        attempts=0
+    )
+    if recipient.notification_digest:
+        entry.next_attempt_at = datetime.now(timezone.utc) + timedelta(minutes=settings.notification_digest_window_minutes)
+    db.add(entry)
+
+
+def enqueue_approver_change(db: Session, old_approver: Optional[models.User], new_approver: Optional[models.User], card: models.Card):
+    """Поставить в очередь уведомления о смене согласующего"""
+    enqueue_notification(db, APPROVER_UNASSIGNED, old_approver, card)
+    enqueue_notification(db, APPROVER_ASSIGNED, new_approver, card)
+
+
+def wake_notification_worker():
+    """Разбудить воркер после commit, не дожидаясь интервала опроса"""
+    _wake_event.set()
+
+
+def retry_delay_seconds(attempts: int) -> int:
+    """Экспоненциальная задержка перед следующей попыткой"""
+    return min(RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0), RETRY_MAX_SECONDS)
+
+
+def coalesce(entries: List[models.NotificationOutbox]) -> Optional[models.NotificationOutbox]:
+    """
+    Объединить события одного тикета для одного получателя (entries упорядочены по id).
+
+    Отправляется только последнее событие. Если первое и последнее события разные
+    (назначили и сразу сняли, или сняли и снова назначили), итоговое состояние для
+    получателя не изменилось и отправлять нечего.
+    """
+    first, last = entries[0], entries[-1]
+    if len(entries) > 1 and first.kind != last.kind:
+        return None
+    return last
+
+
+def format_digest_messages(
+    targets: List[models.NotificationOutbox],
+    cards: Dict[int, models.Card]
+) -> List[Tuple[str, List[models.NotificationOutbox]]]:
+    """
+    Тексты сводки изменений назначений согласующего.
+    Длинная сводка делится на несколько сообщений в пределах лимита Telegram;
+    каждое сообщение покрывает свои записи очереди.
+
+    Returns:
+        Список (текст, записи очереди, которые он покрывает)
+    """
+    sections = [
+        (APPROVER_ASSIGNED, "🔔 **Вы назначены согласующим ({count}):**"),
+        (APPROVER_UNASSIGNED, "ℹ️ **Вы больше не согласующий ({count}):**"),
+    ]
+    items = [
+        (target, f"• {escape_markdown(cards[target.card_id].ticket_number)} "
+                 f"{escape_markdown(shorten(cards[target.card_id].title, DIGEST_TITLE_LENGTH))}")
+        for kind, _ in sections
+        for target in targets if target.kind == kind
+    ]
+
+    def render(chunk: List[Tuple[models.NotificationOutbox, str]], part: str) -> str:
+        lines = ["📬 *Сводка назначений на согласование*" + part]
+        for kind, title in sections:
+            section_lines = [line for target, line in chunk if target.kind == kind]
+            if section_lines:
+                lines.append("")
+                lines.append(title.format(count=len(section_lines)))
+                lines.extend(section_lines)
+        return "\n".join(lines)
+
+    # Запас под номер части в заголовке и заголовки разделов
+    chunks: List[List[Tuple[models.NotificationOutbox, str]]] = [[]]
+    for item in items:
+        if chunks[-1] and telegram_length(render(chunks[-1] + [item], " (99/99)")) > TELEGRAM_MESSAGE_LIMIT:
+            chunks.append([])
+        chunks[-1].append(item)
+
+    messages = []
+    for index, chunk in enumerate(chunks, start=1):
+        part = f" ({index}/{len(chunks)})" if len(chunks) > 1 else ""
+        messages.append((render(chunk, part), [target for target, _ in chunk]))
+    return messages
+
+
+class OutgoingMessage(NamedTuple):
+    """Подготовленное сообщение и записи очереди (id, попыток), которые оно покрывает"""
+    chat_id: str
+    text: str
+    entries: List[Tuple[int, int]]
+
+
+def _record_result(db: Session, message: OutgoingMessage, error: Optional[TelegramSendError]):
+    """Записать результат отправки короткой транзакцией (записи могли быть удалены вместе с карточкой)"""
+    now = datetime.now(timezone.utc)
+    for entry_id, attempts in message.entries:
+        if error is None:
+            values = {"status": "sent", "sent_at": now}
+        elif attempts + 1 >= settings.notification_max_attempts:
+            values = {"status": "failed", "attempts": attempts + 1, "last_error": str(error)}
+        else:
+            delay = error.retry_after or retry_delay_seconds(attempts + 1)
+            values = {
+                "status": "pending",
+                "attempts": attempts + 1,
+                "last_error": str(error),
+                "next_attempt_at": now + timedelta(seconds=delay),
+            }
+        db.query(models.NotificationOutbox).filter(
+            models.NotificationOutbox.id == entry_id,
+            models.NotificationOutbox.status == "sending"
+        ).update(values, synchronize_session=False)
+    db.commit()
+
+
+def _claim_digest_entries(db: Session, user_ids: Set[int], claimed_ids: Set[int]) -> List[models.NotificationOutbox]:
+    """Забрать остальные ожидающие записи пользователей в режиме сводки, даже если их окно не истекло"""
+    if not user_ids:
+        return []
+    entries = (
+        db.query(models.NotificationOutbox)
+        .filter(
+            models.NotificationOutbox.status == "pending",
+            models.NotificationOutbox.user_id.in_(user_ids)
+        )
+        .order_by(models.NotificationOutbox.id)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    return [entry for entry in entries if entry.id not in claimed_ids]
+
+
+def claim_outbox_batch(db: Session, batch_size: int = OUTBOX_BATCH_SIZE) -> Tuple[int, int, List[OutgoingMessage]]:
+    """
+    Забрать порцию готовых к отправке записей и подготовить сообщения.
+    Забранные записи получают статус sending с арендой; транзакция фиксируется.
+
+    Обычным получателям уходит по сообщению на тикет. Получателям в режиме сводки
+    все накопленные события отправляются одним сообщением, как только истекло окно
+    самого раннего из них.
+
+    Returns:
+        (забрано записей, объединено событий, сообщения для отправки)
+    """
+    now = datetime.now(timezone.utc)
+    entries = (
+        db.query(models.NotificationOutbox)
+        .filter(
+            # sending - аренда истекла: воркер, забравший запись, не записал результат
+            models.NotificationOutbox.status.in_(("pending", "sending")),
+            models.NotificationOutbox.next_attempt_at <= now
+        )
+        .order_by(models.NotificationOutbox.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    if not entries:
+        db.rollback()
+        return 0, 0, []
+
+    recipient_ids = {entry.user_id for entry in entries}
+    digest_user_ids = {
+        user_id
+        for (user_id,) in db.query(models.User.id).filter(
+            models.User.id.in_(recipient_ids),
+            models.User.notification_digest.is_(True)
+        )
+    }
+    entries.extend(_claim_digest_entries(db, digest_user_ids, {entry.id for entry in entries}))
+    entries.sort(key=lambda entry: entry.id)
+
+    card_ids = {entry.card_id for entry in entries}
+    cards = {
+        card.id: card
+        for card in db.query(models.Card).filter(models.Card.id.in_(card_ids)).all()
+    }
+
+    # Сначала события одного тикета для одного получателя сворачиваются в одно
+    groups = OrderedDict()
+    for entry in entries:
+        groups.setdefault((entry.chat_id, entry.card_id), []).append(entry)
+
+    targets_by_chat = OrderedDict()
+    digest_chats = set()
+    coalesced = 0
+    for (chat_id, card_id), group in groups.items():
+        target = coalesce(group)
+        for entry in group:
+            if entry is not target:
+                entry.status = "coalesced"
+                coalesced += 1
+        if target is None:
+            continue
+        targets_by_chat.setdefault(chat_id, []).append(target)
+        if target.user_id in digest_user_ids:
+            digest_chats.add(chat_id)
+
+    # Тексты готовятся в транзакции: после commit объекты карточек больше не читаются
+    lease_until = now + timedelta(seconds=SENDING_LEASE_SECONDS)
+    messages: List[OutgoingMessage] = []
+    for chat_id, targets in targets_by_chat.items():
+        try:
+            if chat_id in digest_chats and len(targets) > 1:
+                prepared = format_digest_messages(targets, cards)
+            else:
+                prepared = [(MESSAGE_FORMATTERS[t.kind](cards[t.card_id]), [t]) for t in targets]
+        except Exception as e:
+            for target in targets:
+                target.attempts += 1
+                target.last_error = str(e)
+                target.status = "failed"
+            logger.error("Ошибка при подготовке уведомлений для %s: %s", chat_id, e)
+            continue
+
+        for text, covered in prepared:
+            for target in covered:
+                target.status = "sending"
+                target.next_attempt_at = lease_until
+            messages.append(OutgoingMessage(chat_id, text, [(t.id, t.attempts) for t in covered]))
+
+    db.commit()
+    return len(entries), coalesced, messages
+
+
+def process_outbox_batch(db: Session, batch_size: int = OUTBOX_BATCH_SIZE) -> int:
+    """
+    Отправить одну порцию готовых к отправке уведомлений.
+    Отправка идет вне транзакции, результат каждого сообщения фиксируется сразу.
+
+    Returns:
+        int: количество обработанных записей очереди
+    """
+    claimed, coalesced, messages = claim_outbox_batch(db, batch_size)
+    if not claimed:
+        return 0
+
+    sent = failed = 0
+    for message in messages:
+        try:
+            deliver_telegram_message(message.chat_id, message.text)
+            error = None
+            sent += 1
+        except TelegramSendError as e:
+            error = e
+            failed += 1
+            logger.warning(
+                "Уведомление для %s не отправлено (записей: %s): %s", message.chat_id, len(message.entries), e
+            )
+        _record_result(db, message, error)
+
+    logger.info("Очередь уведомлений: отправлено сообщений %s, объединено событий %s, ошибок %s", sent, coalesced, failed)
+    return claimed
+
+
+def purge_outbox(db: Session) -> int:
+    """Удалить отправленные и объединенные записи старше NOTIFICATION_RETENTION_DAYS"""
+    if not settings.notification_retention_days:
+        return 0
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.notification_retention_days)
+    deleted = db.query(models.NotificationOutbox).filter(
+        models.NotificationOutbox.status.in_(("sent", "coalesced")),
+        models.NotificationOutbox.created_at < cutoff
+    ).delete(synchronize_session=False)
+    db.commit()
+    if deleted:
+        logger.info("Из очереди уведомлений удалено старых записей: %s", deleted)
+    return deleted
+
+
+def drain_outbox(db: Session) -> int:
+    """Разбирать очередь, пока в ней есть готовые к отправке записи"""
+    total = 0
+    while not _stop_event.is_set():
+        processed = process_outbox_batch(db)
+        if not processed:
+            break
+        total += processed
+    return total
+
+
+def _run_worker(interval_seconds: int):
+    while not _stop_event.is_set():
+        db = SessionLocal()
+        try:
+            drain_outbox(db)
+            purge_outbox(db)
+        except Exception as e:
+            db.rollback()
+            logger.error("Ошибка при разборе очереди уведомлений: %s", e)
+        finally:
+            db.close()
+        _wake_event.wait(interval_seconds)
+        _wake_event.clear()
+
+
+def start_notification_worker():
+    """Запустить фоновую отправку уведомлений (NOTIFICATION_POLL_INTERVAL_SECONDS=0 - отключено)"""
+    global _worker
+    interval_seconds = settings.notification_poll_interval_seconds
+    if interval_seconds <= 0:
+        logger.info("Фоновая отправка уведомлений отключена")
+        return
+    if not TELEGRAM_BOT_TOKEN:
+        logger.info("TELEGRAM_BOT_TOKEN не установлен, фоновая отправка уведомлений не запускается")
+        return
+    if _worker is not None and _worker.is_alive():
+        return
+    _stop_event.clear()
+    _worker = threading.Thread(
+        target=_run_worker,
+        args=(interval_seconds,),
+        name="notification-outbox",
+        daemon=True
+    )
+    _worker.start()
+
+
+def stop_notification_worker():
+    """Остановить фоновую отправку уведомлений"""
+    _stop_event.set()
+    _wake_event.set()
+
+
+if __name__ == "__main__":
+    session = SessionLocal()
+    try:
+        drain_outbox(session)
+        purge_outbox(session)
+    finally:
+        session.close()
@@ -0,0 +1,67 @@
+"""
+Keyset-пагинация по (created_at, id) для комментариев и истории карточки
+
+Курсор - непрозрачная строка с created_at и id последней записи страницы.
+Следующая страница начинается строго после нее, поэтому запрос использует
+индекс (card_id/ticket_id, created_at) и не зависит от глубины листания,
+в отличие от OFFSET. Курсор следующей страницы возвращается в заголовке X-Next-Cursor.
+"""
+
+import base64
+from datetime import datetime
+from typing import List, Optional, Tuple
+from sqlalchemy import tuple_
+
+PAGE_DEFAULT_LIMIT = 50
+PAGE_MAX_LIMIT = 200
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, record_id: int) -> str:
+    """Закодировать позицию записи в курсор"""
+    raw = f"{created_at.isoformat()}|{record_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Раскодировать курсор в (created_at, id)
+
+    Raises:
+        ValueError: если курсор поврежден
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, record_id = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8").rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(record_id)
+    except Exception:
+        raise ValueError("Некорректный курсор пагинации")
+
+
+def apply_keyset(statement, created_at_column, id_column, cursor: Optional[str], limit: int, descending: bool = False):
+    """
+    Ограничить запрос страницей после курсора.
+    Выбирается limit + 1 запись, чтобы понять, есть ли следующая страница.
+    """
+    if cursor:
+        cursor_created_at, cursor_id = decode_cursor(cursor)
+        position = tuple_(created_at_column, id_column)
+        if descending:
+            statement = statement.filter(position < tuple_(cursor_created_at, cursor_id))
+        else:
+            statement = statement.filter(position > tuple_(cursor_created_at, cursor_id))
+
+    if descending:
+        statement = statement.order_by(created_at_column.desc(), id_column.desc())
+    else:
+        statement = statement.order_by(created_at_column, id_column)
+    return statement.limit(limit + 1)
+
+
+def split_page(records: List, limit: int) -> Tuple[List, Optional[str]]:
+    """Отрезать лишнюю запись и вернуть страницу вместе с курсором следующей страницы"""
+    if len(records) <= limit:
+        return records, None
+    page = records[:limit]
+    last = page[-1]
+    return page, encode_cursor(last.created_at, last.id)
@@ -0,0 +1,178 @@
+"""
+Детектор N+1 и медленных SQL-запросов (режим разработки)
+
+Включается при DEBUG=true или QUERY_INSPECTOR_ENABLED=true. Каждый SQL-запрос
+HTTP-запроса приводится к форме: параметры и списки IN заменяются на "?".
+Если одна и та же форма повторяется не меньше N_PLUS_ONE_THRESHOLD раз, это
+почти наверняка запрос в цикле по элементам (N+1). Запросы дольше
+SLOW_QUERY_MS записываются отдельно. Для каждой формы запоминается место
+в коде приложения, откуда она впервые выполнена.
+
+В конце HTTP-запроса с такими находками в лог пишется компактный отчет
+с маршрутом, местами вызова и числом запросов. Превышение бюджета маршрута
+из QUERY_BUDGETS тоже попадает в отчет. Количество SQL-запросов отдается
+в заголовке X-Query-Count.
+
+Для тестов:
+    with query_budget(3):
+        build_board_snapshot(db)
+
+    response = client.get("/api/columns")
+    assert_query_budget(response, 3)
+"""
+
+import os
+import re
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+from .config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+QUERY_COUNT_HEADER = "X-Query-Count"
+
+# Максимальное количество SQL-запросов на построение снимка доски (app/board.py):
+# колонки, карточки вместе с исполнителями и согласующими (JOIN), теги карточек
+BOARD_SNAPSHOT_MAX_QUERIES = 3
+
+# Заявленные бюджеты SQL-запросов маршрутов: (метод, шаблон маршрута) -> максимум запросов
+QUERY_BUDGETS: Dict[Tuple[str, str], int] = {
+    ("GET", "/api/columns"): BOARD_SNAPSHOT_MAX_QUERIES,
+}
+
+# Сколько символов формы запроса выводить в отчете
+SHAPE_PREVIEW_LENGTH = 160
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+# Модули учета запросов не считаются местом вызова
+SKIPPED_FILES = {
+    os.path.join(APP_DIR, name) for name in ("query_inspector.py", "metrics.py", "database.py")
+}
+
+_PARAMETER_LIST = re.compile(r"\(\s*(?:%\(\w+\)s|\$\d+|\?)(?:\s*,\s*(?:%\(\w+\)s|\$\d+|\?))*\s*\)")
+_PARAMETER = re.compile(r"%\(\w+\)s|\$\d+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def inspector_enabled() -> bool:
+    return settings.debug or settings.query_inspector_enabled
+
+
+def query_shape(statement: str) -> str:
+    """Форма запроса: параметры и списки параметров заменены на ?, пробелы схлопнуты"""
+    shape = _PARAMETER.sub("?", statement)
+    shape = _PARAMETER_LIST.sub("(?)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+def caller_location() -> str:
+    """Ближайшее к SQL-запросу место в коде приложения: файл:строка в функции"""
+    for frame in reversed(traceback.extract_stack()):
+        if frame.filename.startswith(APP_DIR) and frame.filename not in SKIPPED_FILES:
+            return f"{os.path.relpath(frame.filename, os.path.dirname(APP_DIR))}:{frame.lineno} in {frame.name}"
+    return "unknown"
+
+
+class QueryInspection:
+    """SQL-запросы одного HTTP-запроса, сгруппированные по форме"""
+
+    def __init__(self, repeat_threshold: int, slow_query_seconds: float):
+        self.repeat_threshold = repeat_threshold
+        self.slow_query_seconds = slow_query_seconds
+        self.shapes: Counter = Counter()
+        self.locations: Dict[str, str] = {}
+        self.slow: List[Tuple[float, str, str]] = []
+
+    def record(self, statement: str, seconds: float):
+        shape = query_shape(statement)
+        self.shapes[shape] += 1
+        location = None
+        if shape not in self.locations:
+            location = self.locations[shape] = caller_location()
+        if seconds >= self.slow_query_seconds:
+            self.slow.append((seconds, shape, location or caller_location()))
+
+    def repeated(self) -> List[Tuple[str, int]]:
+        """Формы, повторенные не меньше порога (кандидаты в N+1)"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= self.repeat_threshold]
+
+    def report(self, method: str, route: str, queries: int) -> Optional[str]:
+        """Текст отчета или None, если ничего подозрительного не найдено"""
+        budget = QUERY_BUDGETS.get((method, route))
+        repeated = self.repeated()
+        if not repeated and not self.slow and (budget is None or queries <= budget):
+            return None
+
+        lines = [f"{method} {route}: {queries} SQL-запросов"]
+        if budget is not None and queries > budget:
+            lines.append(f"  превышен бюджет: {queries} > {budget}")
+        for shape, count in repeated:
+            lines.append(f"  N+1: {count}x {shape[:SHAPE_PREVIEW_LENGTH]} ({self.locations[shape]})")
+        for seconds, shape, location in self.slow:
+            lines.append(f"  медленный запрос {seconds * 1000:.0f} мс: {shape[:SHAPE_PREVIEW_LENGTH]} ({location})")
+        return "\n".join(lines)
+
+
+def new_inspection() -> Optional[QueryInspection]:
+    """Разбор запросов для нового HTTP-запроса, если детектор включен"""
+    if not inspector_enabled():
+        return None
+    return QueryInspection(settings.n_plus_one_threshold, settings.slow_query_ms / 1000)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Блок кода или эндпоинт выполнил больше SQL-запросов, чем заявлено"""
+
+
+@contextmanager
+def query_budget(max_queries: int, label: str = "блок"):
+    """
+    Проверить, что код внутри блока выполняет не больше max_queries SQL-запросов.
+    Запросы считаются слушателями движков из database.py в текущем контексте.
+
+    Raises:
+        QueryBudgetExceeded: если бюджет превышен (с отчетом о повторяющихся запросах)
+    """
+    # Импорт здесь: metrics импортирует этот модуль
+    from .metrics import RequestStats, current_request_stats
+
+    outer = current_request_stats.get()
+    stats = RequestStats()
+    stats.inspection = QueryInspection(settings.n_plus_one_threshold, settings.slow_query_ms / 1000)
+    token = current_request_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        current_request_stats.reset(token)
+        if outer is not None:
+            outer.queries += stats.queries
+            outer.db_seconds += stats.db_seconds
+
+    if stats.queries > max_queries:
+        details = stats.inspection.report("", label, stats.queries) or ""
+        raise QueryBudgetExceeded(f"{label}: {stats.queries} SQL-запросов при бюджете {max_queries}\n{details}")
+
+
+def assert_query_budget(response, max_queries: int):
+    """
+    Проверить ответ тестового клиента: эндпоинт выполнил не больше max_queries
+    SQL-запросов. Требует включенного детектора (заголовок X-Query-Count).
+
+    Заголовок записывается в начале ответа (http.response.start), поэтому запросы,
+    выполненные позже - при закрытии зависимостей (get_db) и во время отправки
+    тела StreamingResponse, - в нем не учитываются. Для них используйте query_budget()
+    или гистограмму http_request_db_queries на GET /metrics.
+    """
+    value = response.headers.get(QUERY_COUNT_HEADER)
+    if value is None:
+        raise AssertionError(
+            f"В ответе нет заголовка {QUERY_COUNT_HEADER}: включите DEBUG или QUERY_INSPECTOR_ENABLED"
+        )
+    if int(value) > max_queries:
+        raise QueryBudgetExceeded(
+            f"{response.request.method} {response.request.url.path}: "
+            f"{value} SQL-запросов при бюджете {max_queries}"
+        )
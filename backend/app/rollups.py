@@ -0,0 +1,128 @@
+"""
+Фоновое обновление дневных агрегатов статистики
+
+Агрегаты пересчитываются целиком за все завершенные дни (до начала текущего дня UTC):
+карточки могут перемещаться и переназначаться в любой момент, поэтому частичное
+обновление дало бы расхождения. Текущий день статистика досчитывает по карточкам.
+
+Колонка и исполнитель в агрегатах - состояние карточки на момент пересчета, поэтому
+между пересчетами (STATISTICS_ROLLUP_INTERVAL_MINUTES) они отстают от изменений.
+Агрегируется только время на стадиях (statistics_daily_stage_rollups): его
+GET /api/statistics берет из агрегатов, а количество тикетов по колонкам и
+исполнителям всегда считает по карточкам.
+
+Ручной запуск: python -m app.rollups
+"""
+
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from . import models
+from .database import SessionLocal
+from .config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Ключ advisory lock, чтобы агрегаты пересчитывал только один воркер одновременно
+ROLLUP_LOCK_KEY = 70140001
+
+_stop_event = threading.Event()
+_worker: Optional[threading.Thread] = None
+
+
+def refresh_statistics_rollups(db: Session) -> bool:
+    """
+    Пересчитать агрегаты статистики за все дни до начала текущего дня UTC.
+
+    Returns:
+        bool: True если агрегаты обновлены, False если их уже обновляет другой процесс
+    """
+    locked = db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": ROLLUP_LOCK_KEY}).scalar()
+    if not locked:
+        logger.info("Агрегаты статистики уже обновляются другим процессом")
+        return False
+
+    now = datetime.now(timezone.utc)
+    covered_until = now.date()
+    params = {"covered_until": covered_until, "now": now}
+
+    # Время в колонках считается до момента пересчета
+    db.execute(text("DELETE FROM statistics_daily_stage_rollups"))
+    db.execute(text("""
+        INSERT INTO statistics_daily_stage_rollups
+            (day, column_id, assignee_id, real_estate_type, rc_mk, rc_zm, hours_sum, segments_count)
+        SELECT CAST(c.created_at AS DATE), s.column_id, c.assignee_id,
+               CAST(c.real_estate_type AS TEXT), CAST(c.rc_mk AS TEXT), CAST(c.rc_zm AS TEXT),
+               SUM(s.hours), COUNT(*)
+        FROM (
+            SELECT t.card_id,
+                   t.to_column_id AS column_id,
+                   EXTRACT(EPOCH FROM COALESCE(
+                       LEAD(t.created_at) OVER (PARTITION BY t.card_id ORDER BY t.created_at, t.id),
+                       :now
+                   ) - t.created_at) / 3600 AS hours
+            FROM card_transitions t
+        ) s
+        JOIN cards c ON c.id = s.card_id
+        WHERE s.hours > 0 AND c.created_at < :covered_until
+        GROUP BY 1, 2, 3, 4, 5, 6
+    """), params)
+
+    state = db.query(models.StatisticsRollupState).first()
+    if state is None:
+        state = models.StatisticsRollupState()
+        db.add(state)
+    state.covered_until = covered_until
+    state.refreshed_at = now
+
+    db.commit()
+    logger.info("Агрегаты статистики обновлены до %s", covered_until)
+    return True
+
+
+def _run_worker(interval_seconds: int):
+    while not _stop_event.is_set():
+        db = SessionLocal()
+        try:
+            refresh_statistics_rollups(db)
+        except Exception as e:
+            db.rollback()
+            logger.error("Ошибка при обновлении агрегатов статистики: %s", e)
+        finally:
+            db.close()
+        _stop_event.wait(interval_seconds)
+
+
+def start_rollup_worker():
+    """Запустить фоновое обновление агрегатов (STATISTICS_ROLLUP_INTERVAL_MINUTES=0 - отключено)"""
+    global _worker
+    interval_minutes = settings.statistics_rollup_interval_minutes
+    if interval_minutes <= 0:
+        logger.info("Фоновое обновление агрегатов статистики отключено")
+        return
+    if _worker is not None and _worker.is_alive():
+        return
+    _stop_event.clear()
+    _worker = threading.Thread(
+        target=_run_worker,
+        args=(interval_minutes * 60,),
+        name="statistics-rollups",
+        daemon=True
+    )
+    _worker.start()
+
+
+def stop_rollup_worker():
+    """Остановить фоновое обновление агрегатов"""
+    _stop_event.set()
+
+
+if __name__ == "__main__":
+    session = SessionLocal()
+    try:
+        refresh_statistics_rollups(session)
+    finally:
+        session.close()
@@ -70,10 +70,14 @@ class User(UserBase):
     created_at: datetime
     email: Optional[str] = None
     telegram: str
+    notification_digest: bool = False
 
     class Config:
         from_attributes = True
 
+class NotificationSettingsUpdate(BaseModel):
+    notification_digest: bool
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -227,6 +231,29 @@ class CardUpdate(BaseModel):
         
         return result
 
+# Максимум карточек в одном массовом запросе
+BULK_MAX_CARDS = 500
+
+class CardBulkBase(BaseModel):
+    card_ids: List[int]
+
+    @validator('card_ids')
+    def validate_card_ids(cls, v):
+        if not v:
+            raise ValueError('Не указаны карточки')
+        if len(v) > BULK_MAX_CARDS:
+            raise ValueError(f'Максимальное количество карточек в одном запросе - {BULK_MAX_CARDS}')
+        return v
+
+class CardBulkMove(CardBulkBase):
+    to_column: int
+
+class CardBulkUpdate(CardBulkBase):
+    changes: CardUpdate
+
+class CardBulkDelete(CardBulkBase):
+    pass
+
 class Card(CardBase):
     id: int
     ticket_number: str
@@ -0,0 +1,97 @@
+"""
+Полнотекстовый поиск тикетов по номеру, названию, описанию и комментариям
+
+Векторы хранятся в вычисляемых колонках cards.search_vector и
+comments.search_vector (миграция 020) и обновляются базой данных при любой
+записи, поэтому приложению не нужно поддерживать их вручную. Запрос
+пользователя разбирается websearch_to_tsquery в русской и английской
+конфигурациях; совпадения ищутся по GIN-индексам.
+
+Карточка получает ранг лучшего совпадения: своего вектора или (с весом
+COMMENT_RANK_WEIGHT) одного из комментариев. Фрагмент с подсветкой
+(ts_headline - дорогая функция) строится только для карточек страницы.
+"""
+
+from typing import List
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+import logging
+
+logger = logging.getLogger(__name__)
+
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+# Глубже листать выдачу, отсортированную по рангу, бессмысленно и дорого
+SEARCH_MAX_OFFSET = 1000
+SEARCH_QUERY_MAX_LENGTH = 200
+
+# Совпадение в комментарии ранжируется ниже совпадения в самой карточке
+COMMENT_RANK_WEIGHT = 0.5
+
+SNIPPET_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxWords=30, MinWords=10, MaxFragments=2"
+
+SEARCH_SQL = text("""
+    WITH query AS (
+        SELECT websearch_to_tsquery('russian', :q) || websearch_to_tsquery('english', :q) AS tsq
+    ),
+    matches AS (
+        SELECT c.id AS card_id, ts_rank(c.search_vector, query.tsq) AS rank, NULL::integer AS comment_id
+        FROM cards c, query
+        WHERE c.search_vector @@ query.tsq
+        UNION ALL
+        SELECT cm.ticket_id, ts_rank(cm.search_vector, query.tsq) * :comment_weight, cm.id
+        FROM comments cm, query
+        WHERE cm.search_vector @@ query.tsq
+    ),
+    best AS (
+        SELECT DISTINCT ON (card_id) card_id, rank, comment_id
+        FROM matches
+        ORDER BY card_id, rank DESC
+    ),
+    page AS (
+        SELECT card_id, rank, comment_id
+        FROM best
+        ORDER BY rank DESC, card_id DESC
+        LIMIT :limit OFFSET :offset
+    )
+    SELECT c.id, c.ticket_number, c.title, page.rank, page.comment_id,
+           ts_headline('russian', coalesce(cm.content, c.description, c.title), query.tsq, :snippet_options) AS snippet
+    FROM page
+    JOIN cards c ON c.id = page.card_id
+    LEFT JOIN comments cm ON cm.id = page.comment_id
+    CROSS JOIN query
+    ORDER BY page.rank DESC, page.card_id DESC
+""")
+
+
+def search_cards(db: Session, q: str, limit: int = SEARCH_DEFAULT_LIMIT, offset: int = 0) -> dict:
+    """
+    Найти карточки по тексту запроса (синтаксис websearch: "фраза", -исключение, or).
+
+    Returns:
+        dict: items - страница результатов по убыванию ранга,
+              next_offset - смещение следующей страницы или None
+    """
+    rows = db.execute(SEARCH_SQL, {
+        "q": q,
+        "comment_weight": COMMENT_RANK_WEIGHT,
+        "snippet_options": SNIPPET_OPTIONS,
+        # Лишняя строка показывает, есть ли следующая страница
+        "limit": limit + 1,
+        "offset": offset,
+    }).all()
+
+    items: List[dict] = [
+        {
+            "id": row.id,
+            "ticket_number": row.ticket_number,
+            "title": row.title,
+            "snippet": row.snippet,
+            "matched_in": "comment" if row.comment_id is not None else "card",
+            "rank": round(float(row.rank), 6),
+        }
+        for row in rows[:limit]
+    ]
+    has_next = len(rows) > limit and offset + limit <= SEARCH_MAX_OFFSET
+    logger.debug("Поиск '%s': %s результатов со смещением %s", q, len(items), offset)
+    return {"items": items, "next_offset": offset + limit if has_next else None}
@@ -0,0 +1,159 @@
+"""
+Объединение одинаковых одновременных вычислений (single-flight)
+
+Когда много клиентов одновременно запрашивают один и тот же снимок доски или
+статистику (например, в начале планерки), ответ строится один раз: первый
+запрос (ведущий) запускает вычисление, остальные с тем же ключом ждут его
+и получают тот же результат. Ключ - имя эндпоинта, нормализованные параметры
+и версия данных доски, поэтому после изменения доски новые запросы не
+присоединяются к вычислению по старым данным.
+
+Вычисление выполняется отдельной задачей со своей сессией БД: отмена ведущего
+запроса (клиент закрыл соединение) не прерывает его для остальных. Ожидание
+ограничено таймаутом ключа: по истечении ожидающий запрос строит ответ сам,
+а вычисление старше таймаута перестает принимать новых участников.
+
+Объединяются только запросы одного воркера uvicorn (состояние в памяти процесса).
+Счетчики - на GET /api/debug/singleflight и GET /metrics.
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Hashable, List, NamedTuple, Tuple, TypeVar
+from .config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Исходы запросов для счетчиков
+COMPUTED = "computed"  # запрос выполнил вычисление сам
+SHARED = "shared"      # запрос получил результат чужого вычисления (вычисление сэкономлено)
+TIMEOUT = "timeout"    # не дождался чужого вычисления и выполнил свое
+ERROR = "error"        # запрос получил ошибку вычисления (своего или общего)
+OUTCOMES = (COMPUTED, SHARED, TIMEOUT, ERROR)
+# Всего запросов (error пересекается с остальными исходами)
+REQUESTS = "requests"
+
+
+class Flight(NamedTuple):
+    """Выполняющееся вычисление"""
+    task: asyncio.Future
+    started: float
+
+
+class SingleFlight:
+    """
+    Объединяет одновременные вычисления с одинаковым ключом.
+    Ключ - кортеж, первый элемент которого - имя (эндпоинт) для счетчиков.
+    Рассчитан на один event loop: состояние меняется только из корутин.
+    """
+
+    def __init__(self, enabled: bool = True, timeout: float = 10.0):
+        self.enabled = enabled
+        self.timeout = timeout
+        self._flights: Dict[Hashable, Flight] = {}
+        # имя -> исход -> количество
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, name: str, outcome: str):
+        counters = self._counters.setdefault(name, dict.fromkeys((REQUESTS,) + OUTCOMES, 0))
+        counters[outcome] += 1
+
+    def _start(self, key: Tuple, compute: Callable[[], Awaitable[T]]) -> Flight:
+        # Задача наследует контекст ведущего запроса: SQL-запросы учитываются в его метриках
+        task = asyncio.ensure_future(compute())
+        flight = Flight(task, time.monotonic())
+        self._flights[key] = flight
+
+        def finished(done: asyncio.Future):
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            # Ошибку получают участники; здесь она забирается, чтобы asyncio не писал о ней в лог
+            if not done.cancelled():
+                done.exception()
+
+        task.add_done_callback(finished)
+        return flight
+
+    async def _compute_alone(self, name: str, compute: Callable[[], Awaitable[T]]) -> T:
+        try:
+            return await compute()
+        except Exception:
+            self._count(name, ERROR)
+            raise
+
+    async def run(self, key: Tuple, compute: Callable[[], Awaitable[T]], timeout: float = None) -> T:
+        """
+        Вернуть результат compute() для ключа key, присоединившись к уже
+        выполняющемуся вычислению с тем же ключом, если оно есть.
+
+        Args:
+            key: (имя, параметры..., версия данных) - должен быть hashable
+            compute: фабрика корутины вычисления; не должна зависеть от сессии запроса
+            timeout: сколько секунд ждать чужое вычисление (по умолчанию self.timeout)
+        """
+        name = key[0]
+        self._count(name, REQUESTS)
+        if not self.enabled:
+            self._count(name, COMPUTED)
+            return await self._compute_alone(name, compute)
+
+        timeout = self.timeout if timeout is None else timeout
+        flight = self._flights.get(key)
+        if flight is not None and time.monotonic() - flight.started < timeout:
+            try:
+                result = await asyncio.wait_for(asyncio.shield(flight.task), timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Не дождались вычисления %s за %s с, строим ответ отдельно", name, timeout)
+                self._count(name, TIMEOUT)
+                return await self._compute_alone(name, compute)
+            except Exception:
+                # Ошибка общего вычисления считается для каждого запроса, который ее получил
+                self._count(name, ERROR)
+                raise
+            self._count(name, SHARED)
+            return result
+
+        # Зависшее вычисление (старше таймаута) больше не принимает участников
+        flight = self._start(key, compute)
+        self._count(name, COMPUTED)
+        try:
+            return await asyncio.shield(flight.task)
+        except Exception:
+            self._count(name, ERROR)
+            raise
+
+    def stats(self) -> dict:
+        """Счетчики для отладки"""
+        endpoints = {}
+        for name, counters in sorted(self._counters.items()):
+            total = counters[REQUESTS]
+            endpoints[name] = {**counters, "saved_ratio": round(counters[SHARED] / total, 4) if total else 0}
+        return {
+            "enabled": self.enabled,
+            "timeout_seconds": self.timeout,
+            "in_flight": len(self._flights),
+            "endpoints": endpoints,
+        }
+
+    def render(self) -> str:
+        """Счетчики в текстовом формате Prometheus"""
+        lines: List[str] = [
+            "# HELP singleflight_requests_total Запросы по исходу: computed, shared (вычисление сэкономлено), timeout; "
+            "error - получившие ошибку (пересекается с остальными)",
+            "# TYPE singleflight_requests_total counter",
+        ]
+        for name, counters in sorted(self._counters.items()):
+            for outcome in OUTCOMES:
+                lines.append(f'singleflight_requests_total{{endpoint="{name}",outcome="{outcome}"}} {counters[outcome]}')
+        lines += [
+            "# HELP singleflight_in_flight Выполняющиеся объединяемые вычисления",
+            "# TYPE singleflight_in_flight gauge",
+            f"singleflight_in_flight {len(self._flights)}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+request_coalescer = SingleFlight(enabled=settings.singleflight_enabled, timeout=settings.singleflight_timeout_seconds)
@@ -0,0 +1,352 @@
+"""
+Расчет статистики по тикетам
+
+Статистика собирается из частичных агрегатов (StatisticsAggregate):
+- количество тикетов, story points, разбивка по колонкам и исполнителям описывают
+  текущее состояние карточек и всегда считаются по карточкам (GROUP BY в БД):
+  перемещение, переназначение и удаление сразу видны в статистике;
+- время на стадиях за дни, уже посчитанные фоновой задачей (app/rollups.py),
+  читается из таблицы агрегатов, за остальные дни (как правило, текущий) - по переходам.
+
+Агрегаты времени на стадиях отстают от изменений не больше чем на
+STATISTICS_ROLLUP_INTERVAL_MINUTES: переназначение или удаление карточки,
+созданной до текущего дня, попадает в них при следующем пересчете.
+"""
+
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Query, Session
+from . import models
+from .config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Стадии сопоставляются первым трем колонкам доски по позиции
+STAGE_NAMES = ["Бэклог", "В работе", "На согласовании"]
+
+
+class StatisticsAggregate:
+    """Частичные агрегаты статистики, которые можно складывать между собой"""
+
+    def __init__(self):
+        self.total_tickets = 0
+        self.story_points_sum = 0
+        self.by_column: Dict[int, int] = {}
+        self.by_assignee: Dict[int, int] = {}
+        # column_id -> [сумма часов, количество интервалов]
+        self.stage_times: Dict[int, List[float]] = {}
+
+    def add_tickets(self, column_id: int, assignee_id: Optional[int], tickets_count: int, story_points_sum: int):
+        self.total_tickets += tickets_count
+        self.story_points_sum += story_points_sum or 0
+        self.by_column[column_id] = self.by_column.get(column_id, 0) + tickets_count
+        if assignee_id is not None:
+            self.by_assignee[assignee_id] = self.by_assignee.get(assignee_id, 0) + tickets_count
+
+    def add_stage_time(self, column_id: int, hours_sum: float, segments_count: int):
+        totals = self.stage_times.setdefault(column_id, [0.0, 0])
+        totals[0] += float(hours_sum or 0)
+        totals[1] += segments_count
+
+    def merge(self, other: "StatisticsAggregate") -> "StatisticsAggregate":
+        self.total_tickets += other.total_tickets
+        self.story_points_sum += other.story_points_sum
+        for column_id, count in other.by_column.items():
+            self.by_column[column_id] = self.by_column.get(column_id, 0) + count
+        for assignee_id, count in other.by_assignee.items():
+            self.by_assignee[assignee_id] = self.by_assignee.get(assignee_id, 0) + count
+        for column_id, (hours_sum, segments_count) in other.stage_times.items():
+            self.add_stage_time(column_id, hours_sum, segments_count)
+        return self
+
+
+def parse_day(value: Optional[str]) -> Optional[date]:
+    """Разобрать дату фильтра в формате YYYY-MM-DD; None, если это не чистая дата"""
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def filter_cards(query: Query, assignee_id: Optional[int], start_date: Optional[str], end_date: Optional[str]) -> Query:
+    """Применить фильтры статистики к запросу по карточкам"""
+    if assignee_id:
+        query = query.filter(models.Card.assignee_id == assignee_id)
+    if start_date:
+        query = query.filter(models.Card.created_at >= start_date)
+    if end_date:
+        query = query.filter(models.Card.created_at <= end_date)
+    return query
+
+
+def stage_time_sums(db: Session, card_ids: Query) -> List[Tuple[int, float, int]]:
+    """
+    Суммарное время карточек в колонках по таблице card_transitions.
+
+    Длительность пребывания в колонке - интервал от перехода в нее до следующего
+    перехода карточки (или до текущего момента для последней колонки).
+    Интервалы считаются оконной функцией LEAD и агрегируются в БД одним запросом.
+
+    Args:
+        card_ids: запрос, возвращающий id карточек, попавших под фильтры статистики
+
+    Returns:
+        Список (column_id, сумма часов, количество интервалов)
+    """
+    transition = models.CardTransition
+    next_transition_at = func.lead(transition.created_at).over(
+        partition_by=transition.card_id,
+        order_by=(transition.created_at, transition.id)
+    )
+    segments = (
+        db.query(
+            transition.to_column_id.label("column_id"),
+            (func.extract("epoch", func.coalesce(next_transition_at, func.now()) - transition.created_at) / 3600)
+            .label("hours")
+        )
+        .filter(transition.card_id.in_(card_ids))
+        .subquery()
+    )
+    return (
+        db.query(segments.c.column_id, func.sum(segments.c.hours), func.count())
+        .filter(segments.c.hours > 0)
+        .group_by(segments.c.column_id)
+        .all()
+    )
+
+
+def add_live_tickets(aggregate: StatisticsAggregate, cards_query: Query):
+    """Добавить количество тикетов и story points по текущему состоянию карточек (GROUP BY в БД)"""
+    rows = (
+        cards_query
+        .with_entities(
+            models.Card.column_id,
+            models.Card.assignee_id,
+            func.count(models.Card.id),
+            func.coalesce(func.sum(models.Card.story_points), 0)
+        )
+        .group_by(models.Card.column_id, models.Card.assignee_id)
+        .all()
+    )
+    for column_id, assignee_id, tickets_count, story_points_sum in rows:
+        aggregate.add_tickets(column_id, assignee_id, tickets_count, story_points_sum)
+
+
+def add_live_stage_times(db: Session, aggregate: StatisticsAggregate, cards_query: Query):
+    """Добавить время на стадиях, посчитанное по переходам карточек"""
+    for column_id, hours_sum, segments_count in stage_time_sums(db, cards_query.with_entities(models.Card.id)):
+        aggregate.add_stage_time(column_id, hours_sum, segments_count)
+
+
+def aggregate_live(db: Session, cards_query: Query) -> StatisticsAggregate:
+    """Посчитать агрегаты напрямую по карточкам (GROUP BY в БД)"""
+    aggregate = StatisticsAggregate()
+    add_live_tickets(aggregate, cards_query)
+    add_live_stage_times(db, aggregate, cards_query)
+    return aggregate
+
+
+def add_stage_time_rollups(
+    db: Session,
+    aggregate: StatisticsAggregate,
+    assignee_id: Optional[int],
+    day_from: Optional[date],
+    day_to: date
+):
+    """Добавить предварительно посчитанное время на стадиях за дни [day_from, day_to)"""
+    stage_rollup = models.StatisticsDailyStageRollup
+    query = db.query(
+        stage_rollup.column_id,
+        func.sum(stage_rollup.hours_sum),
+        func.sum(stage_rollup.segments_count)
+    ).filter(stage_rollup.day < day_to)
+    if day_from:
+        query = query.filter(stage_rollup.day >= day_from)
+    if assignee_id:
+        query = query.filter(stage_rollup.assignee_id == assignee_id)
+    for column_id, hours_sum, segments_count in query.group_by(stage_rollup.column_id):
+        aggregate.add_stage_time(column_id, hours_sum, int(segments_count))
+
+
+def get_rollup_coverage(db: Session) -> Optional[date]:
+    """День, до которого (не включая) статистика посчитана фоновой задачей"""
+    return db.query(models.StatisticsRollupState.covered_until).scalar()
+
+
+def collect_statistics(
+    db: Session,
+    assignee_id: Optional[int] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None
+) -> StatisticsAggregate:
+    """
+    Собрать агрегаты статистики с учетом фильтров.
+
+    Фильтр end_date сравнивается с created_at как и раньше (created_at <= end_date),
+    то есть для даты без времени день end_date в выборку не входит.
+    """
+    start_day = parse_day(start_date)
+    end_day = parse_day(end_date)
+    # При отключенной фоновой задаче агрегаты могут быть устаревшими - не используем их
+    covered_until = get_rollup_coverage(db) if settings.statistics_rollup_interval_minutes > 0 else None
+
+    # Агрегаты применимы, только если фильтры - даты без времени
+    rollups_usable = (
+        covered_until is not None
+        and (not start_date or start_day is not None)
+        and (not end_date or end_day is not None)
+    )
+    cards_query = filter_cards(db.query(models.Card), assignee_id, start_date, end_date)
+    if not rollups_usable:
+        return aggregate_live(db, cards_query)
+
+    # Текущее состояние карточек (колонка, исполнитель, удаление) - всегда по карточкам
+    aggregate = StatisticsAggregate()
+    add_live_tickets(aggregate, cards_query)
+
+    rollup_until = min(end_day, covered_until) if end_day else covered_until
+    add_stage_time_rollups(db, aggregate, assignee_id, start_day, rollup_until)
+
+    # Время на стадиях за дни, которые фоновая задача еще не посчитала, - по переходам
+    live_from = max(start_day, covered_until) if start_day else covered_until
+    if end_day is None or end_day >= live_from:
+        stage_cards_query = filter_cards(db.query(models.Card), assignee_id, None, end_date)
+        stage_cards_query = stage_cards_query.filter(models.Card.created_at >= datetime.combine(live_from, datetime.min.time()))
+        add_live_stage_times(db, aggregate, stage_cards_query)
+
+    return aggregate
+
+
+def format_stage_times(aggregate: StatisticsAggregate, column_to_stage: Dict[int, str]) -> dict:
+    """Средние времена по стадиям в формате ответа GET /api/statistics"""
+    stage_totals = {stage_name: [0.0, 0] for stage_name in STAGE_NAMES}
+    for column_id, (hours_sum, segments_count) in aggregate.stage_times.items():
+        stage_name = column_to_stage.get(column_id)
+        if stage_name:
+            stage_totals[stage_name][0] += hours_sum
+            stage_totals[stage_name][1] += segments_count
+
+    result = {}
+    for stage_name in STAGE_NAMES:
+        total_hours, segments_count = stage_totals[stage_name]
+        if segments_count:
+            avg_hours = total_hours / segments_count
+            result[stage_name] = {
+                "average_hours": round(avg_hours, 2),
+                "average_days": round(avg_hours / 24, 2),
+                "tickets_count": segments_count
+            }
+        else:
+            result[stage_name] = {
+                "average_hours": 0,
+                "average_days": 0,
+                "tickets_count": 0
+            }
+    return result
+
+
+def format_statistics(db: Session, aggregate: StatisticsAggregate) -> dict:
+    """Сформировать ответ GET /api/statistics: подставить названия колонок и имена исполнителей"""
+    columns = db.query(models.KanbanColumn.id, models.KanbanColumn.title)\
+        .order_by(models.KanbanColumn.position)\
+        .all()
+    column_titles = {column_id: title for column_id, title in columns}
+    # Стадии сопоставляются первым трем колонкам доски по позиции
+    column_to_stage = dict(zip((column_id for column_id, _ in columns), STAGE_NAMES))
+
+    tickets_by_column = {}
+    for column_id, count in aggregate.by_column.items():
+        column_name = column_titles.get(column_id)
+        if column_name:
+            tickets_by_column[column_name] = tickets_by_column.get(column_name, 0) + count
+
+    tickets_by_assignee = {}
+    if aggregate.by_assignee:
+        usernames = dict(
+            db.query(models.User.id, models.User.username)
+            .filter(models.User.id.in_(list(aggregate.by_assignee)))
+            .all()
+        )
+        for assignee_id, count in aggregate.by_assignee.items():
+            username = usernames.get(assignee_id)
+            if username:
+                tickets_by_assignee[username] = tickets_by_assignee.get(username, 0) + count
+
+    total_tickets = aggregate.total_tickets
+    return {
+        "total_tickets": total_tickets,
+        "tickets_by_column": tickets_by_column,
+        "tickets_by_assignee": tickets_by_assignee,
+        "average_story_points": aggregate.story_points_sum / total_tickets if total_tickets > 0 else 0,
+        "average_stage_times": format_stage_times(aggregate, column_to_stage)
+    }
+
+
+# Дополнительные разрезы статистики, доступные через параметр group_by
+BREAKDOWN_DIMENSIONS = {
+    "real_estate_type": models.Card.real_estate_type,
+    "rc_mk": models.Card.rc_mk,
+    "rc_zm": models.Card.rc_zm,
+    "tag": models.Tag.name,
+}
+BREAKDOWN_EMPTY_LABEL = "Не указано"
+
+
+def parse_group_by(group_by: Optional[str]) -> List[str]:
+    """
+    Разобрать параметр group_by (через запятую).
+
+    Raises:
+        ValueError: если указан неизвестный разрез
+    """
+    if not group_by:
+        return []
+    dimensions = [dimension.strip() for dimension in group_by.split(",") if dimension.strip()]
+    unknown = [dimension for dimension in dimensions if dimension not in BREAKDOWN_DIMENSIONS]
+    if unknown:
+        raise ValueError(
+            f"Неизвестные разрезы статистики: {', '.join(unknown)}. "
+            f"Доступны: {', '.join(BREAKDOWN_DIMENSIONS)}"
+        )
+    return list(dict.fromkeys(dimensions))
+
+
+def calculate_breakdowns(
+    db: Session,
+    dimensions: List[str],
+    assignee_id: Optional[int] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None
+) -> dict:
+    """
+    Количество тикетов и story points в разрезе дополнительных измерений.
+    Каждый разрез - один GROUP BY запрос с фильтрами статистики.
+    Карточка с несколькими тегами учитывается в разрезе tag по разу на каждый тег.
+    """
+    breakdowns = {}
+    for dimension in dimensions:
+        group_column = BREAKDOWN_DIMENSIONS[dimension]
+        query = db.query(
+            group_column,
+            func.count(models.Card.id),
+            func.coalesce(func.sum(models.Card.story_points), 0)
+        )
+        if dimension == "tag":
+            query = query.select_from(models.Card)\
+                .join(models.CardTag, models.CardTag.card_id == models.Card.id)\
+                .join(models.Tag, models.Tag.id == models.CardTag.tag_id)
+        query = filter_cards(query, assignee_id, start_date, end_date)
+
+        result = {}
+        for value, tickets_count, story_points_sum in query.group_by(group_column).all():
+            result[value if value is not None else BREAKDOWN_EMPTY_LABEL] = {
+                "tickets": tickets_count,
+                "story_points_sum": story_points_sum,
+                "average_story_points": story_points_sum / tickets_count if tickets_count else 0
+            }
+        breakdowns[dimension] = result
+    return breakdowns
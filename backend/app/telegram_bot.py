@@ -1,5 +1,7 @@
 import requests
 import logging
+import threading
+import time
 from typing import Optional
 from .models import User, Card
 from .config import settings
@@ -8,106 +10,190 @@ logger = logging.getLogger(__name__)
 
 # Получаем токен бота из валидированных настроек
 TELEGRAM_BOT_TOKEN = settings.get_telegram_bot_token()
-TELEGRAM_API_URL = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}" if TELEGRAM_BOT_TOKEN else None
+TELEGRAM_API_URL = f"{settings.telegram_api_base_url.rstrip('/')}/bot{TELEGRAM_BOT_TOKEN}" if TELEGRAM_BOT_TOKEN else None
+
+# Минимальный интервал между сообщениями в один чат (ограничение Telegram ~1 сообщение/сек)
+PER_CHAT_INTERVAL_SECONDS = 1.0
+# Максимальная длина текста сообщения Telegram (в UTF-16 символах)
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+# Символы разметки Markdown (legacy parse_mode), которые нужно экранировать в пользовательском тексте
+MARKDOWN_SPECIAL_CHARS = ("_", "*", "`", "[")
+# Сколько символов описания включать в уведомление (длинное описание не влезет в лимит сообщения)
+DESCRIPTION_PREVIEW_LENGTH = 1000
+
+
+def shorten(value: str, length: int) -> str:
+    """Обрезать текст до length символов с многоточием"""
+    return value if len(value) <= length else value[:length - 1] + "…"
+
+
+def escape_markdown(value) -> str:
+    """Экранировать пользовательский текст (название, описание) для parse_mode Markdown"""
+    text = str(value)
+    for char in MARKDOWN_SPECIAL_CHARS:
+        text = text.replace(char, "\\" + char)
+    return text
+
+
+def telegram_length(text: str) -> int:
+    """Длина текста так, как ее считает Telegram (UTF-16: эмодзи занимают два символа)"""
+    return len(text.encode("utf-16-le")) // 2
+
+
+class TelegramSendError(Exception):
+    """Ошибка отправки сообщения; retry_after - пауза, которую запросил Telegram (429)"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """Ограничение частоты отправки: общее на бота и отдельное на каждый чат"""
+
+    def __init__(self, messages_per_second: float):
+        self._lock = threading.Lock()
+        self._interval = 1.0 / messages_per_second
+        self._next_global = 0.0
+        self._next_per_chat = {}
+
+    def wait(self, chat_id: str):
+        """Дождаться, когда можно отправить сообщение в чат"""
+        with self._lock:
+            now = time.monotonic()
+            send_at = max(now, self._next_global, self._next_per_chat.get(chat_id, 0.0))
+            self._next_global = send_at + self._interval
+            self._next_per_chat[chat_id] = send_at + PER_CHAT_INTERVAL_SECONDS
+        delay = send_at - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+# Одна HTTP-сессия на процесс: соединения с Telegram API переиспользуются
+_http_session = requests.Session()
+_rate_limiter = RateLimiter(settings.telegram_rate_limit_per_second)
+
+
+def deliver_telegram_message(chat_id: str, message: str):
+    """
+    Отправляет сообщение в Telegram с учетом ограничения частоты.
+
+    Raises:
+        TelegramSendError: если сообщение не отправлено
+    """
+    if not TELEGRAM_BOT_TOKEN or not TELEGRAM_API_URL:
+        raise TelegramSendError("TELEGRAM_BOT_TOKEN не установлен или невалиден. Уведомления отключены.")
+
+    _rate_limiter.wait(chat_id)
+    try:
+        response = _http_session.post(
+            f"{TELEGRAM_API_URL}/sendMessage",
+            json={"chat_id": chat_id, "text": message, "parse_mode": "Markdown"},
+            timeout=10
+        )
+    except requests.exceptions.RequestException as e:
+        raise TelegramSendError(f"Ошибка соединения с Telegram API: {e}")
+
+    if response.status_code == 429:
+        try:
+            retry_after = response.json().get("parameters", {}).get("retry_after")
+        except ValueError:
+            retry_after = None
+        raise TelegramSendError("Превышен лимит запросов Telegram API", retry_after=retry_after)
+
+    if not response.ok:
+        try:
+            error_details = response.json()
+        except ValueError:
+            error_details = response.text
+        raise TelegramSendError(f"Telegram API вернул {response.status_code}: {error_details}")
+
+    logger.info("Telegram сообщение отправлено пользователю %s", chat_id)
+
 
 def send_telegram_message(chat_id: str, message: str) -> bool:
     """
     Отправляет сообщение в Telegram
-    
+
     Args:
         chat_id: ID чата или username (@username)
         message: Текст сообщения
-        
+
     Returns:
         bool: True если сообщение отправлено успешно, False в противном случае
     """
-    if not TELEGRAM_BOT_TOKEN or not TELEGRAM_API_URL:
-        logger.warning("TELEGRAM_BOT_TOKEN не установлен или невалиден. Уведомления отключены.")
-        return False
-        
     try:
-        url = f"{TELEGRAM_API_URL}/sendMessage"
-        payload = {
-            "chat_id": chat_id,
-            "text": message,
-            "parse_mode": "Markdown"
-        }
-        
-        response = requests.post(url, json=payload, timeout=10)
-        response.raise_for_status()
-        
-        logger.info(f"Telegram сообщение отправлено пользователю {chat_id}")
+        deliver_telegram_message(chat_id, message)
         return True
-        
-    except requests.exceptions.RequestException as e:
-        try:
-            error_details = e.response.json() if hasattr(e, 'response') and e.response else "Нет деталей ошибки"
-            logger.error(f"Ошибка отправки Telegram сообщения пользователю {chat_id}: {e}")
-            logger.error(f"Детали ошибки Telegram API: {error_details}")
-        except:
-            logger.error(f"Ошибка отправки Telegram сообщения пользователю {chat_id}: {e}")
+    except TelegramSendError as e:
+        logger.error("Ошибка отправки Telegram сообщения пользователю %s: %s", chat_id, e)
         return False
     except Exception as e:
-        logger.error(f"Неожиданная ошибка при отправке Telegram сообщения: {e}")
+        logger.error("Неожиданная ошибка при отправке Telegram сообщения: %s", e)
         return False
 
+def format_approver_assigned_message(card: Card) -> str:
+    """Текст уведомления о назначении согласующим"""
+    return f"""
+🔔 *Новое назначение на согласование*
+
+📋 **Тикет:** {escape_markdown(card.title)}
+📝 **Описание:** {escape_markdown(shorten(card.description or 'Не указано', DESCRIPTION_PREVIEW_LENGTH))}
+⭐ **Story Points:** {card.story_points or 'Не указано'}
+
+Вы назначены согласующим для этого тикета.
+    """.strip()
+
+def format_approver_unassigned_message(card: Card) -> str:
+    """Текст уведомления о снятии назначения согласующего"""
+    return f"""
+ℹ️ *Изменение назначения*
+
+📋 **Тикет:** {escape_markdown(card.title)}
+
+Вы больше не являетесь согласующим для этого тикета.
+    """.strip()
+
 def send_approver_notification(approver: User, card: Card) -> bool:
     """
     Отправляет уведомление согласующему о назначении на тикет
-    
+
     Args:
         approver: Пользователь-согласующий
         card: Карточка тикета
-        
+
     Returns:
         bool: True если уведомление отправлено успешно
     """
     if not approver.telegram:
-        logger.warning(f"У пользователя {approver.username} не указан Telegram")
+        logger.warning("У пользователя %s не указан Telegram", approver.username)
         return False
-        
-    message = f"""
-🔔 *Новое назначение на согласование*
-
-📋 **Тикет:** {card.title}
-📝 **Описание:** {card.description or 'Не указано'}
-⭐ **Story Points:** {card.story_points or 'Не указано'}
 
-Вы назначены согласующим для этого тикета.
-    """.strip()
-    
-    return send_telegram_message(approver.telegram, message)
+    return send_telegram_message(approver.telegram, format_approver_assigned_message(card))
 
 def send_approver_change_notification(old_approver: Optional[User], new_approver: Optional[User], card: Card) -> bool:
     """
     Отправляет уведомления при смене согласующего
-    
+
     Args:
         old_approver: Предыдущий согласующий (может быть None)
         new_approver: Новый согласующий (может быть None)
         card: Карточка тикета
-        
+
     Returns:
         bool: True если все уведомления отправлены успешно
     """
     success = True
-    
+
     # Уведомляем старого согласующего об удалении назначения
     if old_approver and old_approver.telegram:
-        message = f"""
-ℹ️ *Изменение назначения*
-
-📋 **Тикет:** {card.title}
-
-Вы больше не являетесь согласующим для этого тикета.
-        """.strip()
-        
-        if not send_telegram_message(old_approver.telegram, message):
+        if not send_telegram_message(old_approver.telegram, format_approver_unassigned_message(card)):
             success = False
-    
+
     # Уведомляем нового согласующего о назначении
     if new_approver and new_approver.telegram:
         if not send_approver_notification(new_approver, card):
             success = False
-    
-    return success 
\ No newline at end of file
+
+    return success
@@ -0,0 +1,41 @@
+"""
+Выдача номеров тикетов в формате CMD-0000001
+"""
+
+from typing import List
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Последовательность PostgreSQL из миграции 012
+TICKET_NUMBER_SEQUENCE = "ticket_number_seq"
+TICKET_NUMBER_PREFIX = "CMD"
+
+
+def format_ticket_number(number: int) -> str:
+    """Сформировать номер тикета: 1 -> CMD-0000001"""
+    return f"{TICKET_NUMBER_PREFIX}-{number:07d}"
+
+
+def allocate_ticket_number(db: Session) -> str:
+    """
+    Выдать следующий номер тикета одним запросом.
+    nextval() атомарен и не откатывается вместе с транзакцией, поэтому
+    конкурентные запросы (в том числе из разных воркеров uvicorn) никогда
+    не получат одинаковый номер; при откате транзакции в нумерации остается пропуск.
+    """
+    number = db.execute(text(f"SELECT nextval('{TICKET_NUMBER_SEQUENCE}')")).scalar()
+    return format_ticket_number(number)
+
+
+def reserve_ticket_numbers(db: Session, count: int) -> List[str]:
+    """
+    Зарезервировать блок из count номеров тикетов одним запросом (для массового импорта).
+    Номера уникальны и возрастают, но при конкурентной выдаче блок может быть не сплошным.
+    """
+    if count <= 0:
+        return []
+    result = db.execute(
+        text(f"SELECT nextval('{TICKET_NUMBER_SEQUENCE}') FROM generate_series(1, :count)"),
+        {"count": count}
+    )
+    return [format_ticket_number(row[0]) for row in result]
@@ -0,0 +1,97 @@
+"""
+Бенчмарк: блокирующие запросы к БД в async-обработчике против асинхронной сессии
+
+Запускает N конкурентных "запросов", каждый из которых выполняет SELECT pg_sleep(delay):
+- blocking - синхронный движок из app.database внутри корутины (как старые эндпоинты main.py):
+  каждый запрос блокирует event loop, конкурентные запросы выполняются по очереди;
+- async    - асинхронный движок из app.async_database: запросы ждут БД параллельно.
+
+Параллельно работает "пульс" event loop: его максимальная задержка показывает,
+насколько долго один запрос к БД мешал обслуживать остальные.
+
+Запуск (из каталога backend, с доступной базой данных):
+    python -m benchmarks.async_db_benchmark --requests 50 --delay 0.05
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from sqlalchemy import text
+from app.database import engine, SessionLocal
+from app.async_database import AsyncSessionLocal, async_engine
+
+
+async def _heartbeat(stop: asyncio.Event, interval: float, lags: list):
+    """Замеряет, насколько позже запланированного просыпается event loop"""
+    while not stop.is_set():
+        planned = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, time.perf_counter() - planned))
+
+
+async def _blocking_request(delay: float):
+    db = SessionLocal()
+    try:
+        db.execute(text("SELECT pg_sleep(:delay)"), {"delay": delay})
+    finally:
+        db.close()
+
+
+async def _async_request(delay: float):
+    async with AsyncSessionLocal() as db:
+        await db.execute(text("SELECT pg_sleep(:delay)"), {"delay": delay})
+
+
+async def _run(mode: str, requests: int, delay: float, concurrency: int) -> dict:
+    request_fn = _blocking_request if mode == "blocking" else _async_request
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def timed_request():
+        async with semaphore:
+            started = time.perf_counter()
+            await request_fn(delay)
+            latencies.append(time.perf_counter() - started)
+
+    stop = asyncio.Event()
+    lags = []
+    heartbeat = asyncio.create_task(_heartbeat(stop, 0.01, lags))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(timed_request() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await heartbeat
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "requests": requests,
+        "concurrency": concurrency,
+        "query_delay_seconds": delay,
+        "wall_time_seconds": round(elapsed, 4),
+        "throughput_rps": round(requests / elapsed, 2),
+        "latency_p50_seconds": round(latencies[len(latencies) // 2], 4),
+        "latency_max_seconds": round(latencies[-1], 4),
+        "event_loop_max_lag_seconds": round(max(lags, default=0.0), 4),
+    }
+
+
+async def main(requests: int, delay: float, concurrency: int):
+    results = []
+    for mode in ("blocking", "async"):
+        results.append(await _run(mode, requests, delay, concurrency))
+    await async_engine.dispose()
+    engine.dispose()
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50, help="Количество запросов")
+    parser.add_argument("--delay", type=float, default=0.05, help="Длительность запроса к БД, секунд")
+    parser.add_argument("--concurrency", type=int, default=10, help="Одновременных запросов (не больше размера пула)")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.delay, args.concurrency))
@@ -0,0 +1,242 @@
+"""
+Бенчмарк индексов: EXPLAIN ANALYZE горячих запросов с индексами и без них
+
+Заполняет базу синтетической доской (пользователи, теги, карточки, история,
+комментарии, переходы между колонками), затем выполняет запросы эндпоинтов
+и для каждого SQL-запроса снимает EXPLAIN (ANALYZE):
+- get_columns     - снимок доски (app.board.build_board_snapshot);
+- check_wip_limit - проверка WIP-лимита колонки (app.columns.check_wip_limit);
+- get_statistics  - сбор статистики за период (app.statistics.collect_statistics);
+- comments        - первая страница комментариев карточки;
+- history         - первая страница истории карточки.
+
+Сначала замер выполняется с индексами миграций 017-018 ("after"), затем индексы
+удаляются и замер повторяется ("before"). Все выполняется в одной транзакции,
+которая в конце откатывается: синтетические данные и удаленные индексы в базе
+не остаются (DDL в PostgreSQL транзакционный). Запускать на dev-базе: на время
+прогона таблицы карточек заблокированы.
+
+Запуск (из каталога backend, с доступной базой данных):
+    python -m benchmarks.index_benchmark --cards 20000
+"""
+
+import argparse
+import json
+from datetime import datetime, timedelta
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from app import models
+from app.database import engine, SessionLocal
+from app.board import build_board_snapshot
+from app.columns import check_wip_limit
+from app.statistics import collect_statistics
+from app.pagination import apply_keyset, PAGE_DEFAULT_LIMIT
+
+# (имя индекса, таблица, колонки) - индексы миграций 017 и 018
+BENCHMARK_INDEXES = [
+    ("ix_cards_column_id", "cards", "column_id"),
+    ("ix_cards_assignee_id", "cards", "assignee_id"),
+    ("ix_cards_approver_id", "cards", "approver_id"),
+    ("ix_cards_created_by", "cards", "created_by"),
+    ("ix_cards_created_at", "cards", "created_at"),
+    ("ix_card_tags_tag_id", "card_tags", "tag_id"),
+    ("ix_card_history_card_id_created_at", "card_history", "card_id, created_at"),
+    ("ix_comments_ticket_id_created_at", "comments", "ticket_id, created_at"),
+]
+
+
+def seed(db: Session, cards: int, users: int, tags: int, history_per_card: int, comments_per_card: int) -> dict:
+    """Заполнить базу синтетической доской внутри текущей транзакции"""
+    column_ids = [column_id for (column_id,) in db.query(models.KanbanColumn.id).order_by(models.KanbanColumn.position)]
+    if not column_ids:
+        raise SystemExit("В базе нет колонок доски: примените миграции перед запуском бенчмарка")
+
+    db.execute(text("""
+        INSERT INTO users (username, hashed_password, telegram, role, is_active)
+        SELECT 'bench_user_' || g, 'benchmark', '@bench_user_' || g, 'USER', true
+        FROM generate_series(1, :users) g
+    """), {"users": users})
+    user_ids = [user_id for (user_id,) in db.execute(text("SELECT id FROM users WHERE username LIKE 'bench_user_%' ORDER BY id"))]
+
+    db.execute(text("""
+        INSERT INTO tags (name)
+        SELECT 'bench_tag_' || g FROM generate_series(1, :tags) g
+    """), {"tags": tags})
+    tag_ids = [tag_id for (tag_id,) in db.execute(text("SELECT id FROM tags WHERE name LIKE 'bench_tag_%' ORDER BY id"))]
+
+    arrays = {
+        "column_ids": column_ids, "columns": len(column_ids),
+        "user_ids": user_ids, "users": len(user_ids),
+        "tag_ids": tag_ids, "tags": len(tag_ids),
+    }
+    db.execute(text("""
+        INSERT INTO cards (ticket_number, title, description, position, story_points,
+                           column_id, assignee_id, approver_id, created_by, created_at, updated_at)
+        SELECT 'BENCH-' || g, 'Benchmark card ' || g, 'Synthetic card for index benchmark', g, g % 13 + 1,
+               (CAST(:column_ids AS integer[]))[1 + g % :columns],
+               (CAST(:user_ids AS integer[]))[1 + g % :users],
+               (CAST(:user_ids AS integer[]))[1 + (g / 7) % :users],
+               (CAST(:user_ids AS integer[]))[1 + (g / 3) % :users],
+               now() - (g % 365) * interval '1 day', now()
+        FROM generate_series(1, :cards) g
+    """), {**arrays, "cards": cards})
+
+    db.execute(text("""
+        INSERT INTO card_tags (card_id, tag_id)
+        SELECT c.id, (CAST(:tag_ids AS integer[]))[1 + c.id % :tags]
+        FROM cards c WHERE c.ticket_number LIKE 'BENCH-%'
+    """), arrays)
+    db.execute(text("""
+        INSERT INTO card_transitions (card_id, from_column_id, to_column_id, created_at)
+        SELECT c.id, NULL, c.column_id, c.created_at
+        FROM cards c WHERE c.ticket_number LIKE 'BENCH-%'
+    """))
+    db.execute(text("""
+        INSERT INTO card_history (card_id, action, details, created_at)
+        SELECT c.id, 'updated', '{}', c.created_at + s * interval '1 hour'
+        FROM cards c, generate_series(1, :per_card) s
+        WHERE c.ticket_number LIKE 'BENCH-%'
+    """), {"per_card": history_per_card})
+    db.execute(text("""
+        INSERT INTO comments (content, created_at, ticket_id, user_id)
+        SELECT 'Benchmark comment ' || s, c.created_at + s * interval '1 hour', c.id,
+               (CAST(:user_ids AS integer[]))[1 + (c.id + s) % :users]
+        FROM cards c, generate_series(1, :per_card) s
+        WHERE c.ticket_number LIKE 'BENCH-%'
+    """), {**arrays, "per_card": comments_per_card})
+
+    sample_card_id = db.execute(text("SELECT max(id) FROM cards WHERE ticket_number LIKE 'BENCH-%'")).scalar()
+    return {"column_id": column_ids[0], "assignee_id": user_ids[0], "card_id": sample_card_id}
+
+
+def capture_statements(db: Session, scenario) -> list:
+    """Выполнить сценарий и вернуть выполненные им SQL-запросы с параметрами"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    connection = db.connection()
+    event.listen(connection, "before_cursor_execute", before_cursor_execute)
+    try:
+        scenario(db)
+    finally:
+        event.remove(connection, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+def explain(db: Session, statements: list) -> dict:
+    """EXPLAIN ANALYZE для каждого запроса; время суммируется по сценарию"""
+    connection = db.connection()
+    plans = []
+    total_ms = 0.0
+    for statement, parameters in statements:
+        result = connection.exec_driver_sql("EXPLAIN (ANALYZE, FORMAT JSON) " + statement, parameters).scalar()
+        plan = result[0] if isinstance(result, list) else json.loads(result)[0]
+        total_ms += plan["Planning Time"] + plan["Execution Time"]
+        plans.append({
+            "node": plan["Plan"]["Node Type"],
+            "relation": plan["Plan"].get("Relation Name"),
+            "index": plan["Plan"].get("Index Name"),
+            "execution_ms": round(plan["Execution Time"], 3),
+        })
+    return {"queries": len(plans), "total_ms": round(total_ms, 3), "plans": plans}
+
+
+def build_scenarios(sample: dict) -> dict:
+    """SQL-часть горячих эндпоинтов"""
+    today = datetime.utcnow().date()
+
+    def wip_limit(db: Session):
+        check_wip_limit(db, sample["column_id"])
+
+    def statistics(db: Session):
+        collect_statistics(
+            db,
+            sample["assignee_id"],
+            (today - timedelta(days=90)).isoformat(),
+            today.isoformat()
+        )
+
+    def comments(db: Session):
+        apply_keyset(
+            db.query(models.Comment).filter(models.Comment.ticket_id == sample["card_id"]),
+            models.Comment.created_at, models.Comment.id, None, PAGE_DEFAULT_LIMIT
+        ).all()
+
+    def history(db: Session):
+        apply_keyset(
+            db.query(models.CardHistory).filter(models.CardHistory.card_id == sample["card_id"]),
+            models.CardHistory.created_at, models.CardHistory.id, None, PAGE_DEFAULT_LIMIT,
+            descending=True
+        ).all()
+
+    return {
+        "get_columns": build_board_snapshot,
+        "check_wip_limit": wip_limit,
+        "get_statistics": statistics,
+        "comments": comments,
+        "history": history,
+    }
+
+
+def measure(db: Session, scenarios: dict) -> dict:
+    results = {}
+    for name, scenario in scenarios.items():
+        statements = capture_statements(db, scenario)
+        db.expunge_all()
+        results[name] = explain(db, statements)
+    return results
+
+
+def main(cards: int, users: int, tags: int, history_per_card: int, comments_per_card: int):
+    db = SessionLocal()
+    try:
+        sample = seed(db, cards, users, tags, history_per_card, comments_per_card)
+        for name, table, columns in BENCHMARK_INDEXES:
+            db.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+        db.execute(text("ANALYZE"))
+
+        scenarios = build_scenarios(sample)
+        after = measure(db, scenarios)
+
+        for name, _, _ in BENCHMARK_INDEXES:
+            db.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        before = measure(db, scenarios)
+
+        summary = {
+            name: {
+                "before_ms": before[name]["total_ms"],
+                "after_ms": after[name]["total_ms"],
+                "speedup": round(before[name]["total_ms"] / after[name]["total_ms"], 2) if after[name]["total_ms"] else None,
+            }
+            for name in scenarios
+        }
+        print(json.dumps({
+            "dataset": {
+                "cards": cards,
+                "users": users,
+                "tags": tags,
+                "history_per_card": history_per_card,
+                "comments_per_card": comments_per_card,
+            },
+            "summary": summary,
+            "before": before,
+            "after": after,
+        }, indent=2, ensure_ascii=False))
+    finally:
+        # Синтетические данные и изменения индексов не сохраняются
+        db.rollback()
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cards", type=int, default=20000, help="Количество карточек")
+    parser.add_argument("--users", type=int, default=200, help="Количество пользователей")
+    parser.add_argument("--tags", type=int, default=50, help="Количество тегов")
+    parser.add_argument("--history-per-card", type=int, default=10, help="Записей истории на карточку")
+    parser.add_argument("--comments-per-card", type=int, default=5, help="Комментариев на карточку")
+    args = parser.parse_args()
+    main(args.cards, args.users, args.tags, args.history_per_card, args.comments_per_card)
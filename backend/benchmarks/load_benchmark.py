@@ -0,0 +1,465 @@
+"""
+Нагрузочный бенчмарк API: заполнение базы и прогон смеси запросов с фиксированной конкурентностью
+
+Команды:
+- seed  - добавить в базу синтетические данные (пользователи, колонки, теги,
+          карточки, история, комментарии). Данные помечаются префиксом [load]
+          в названии карточек и load_ в именах, предыдущие удаляются;
+- run   - прогнать смесь запросов против запущенного сервера и вывести JSON
+          с p50/p95/p99, пропускной способностью и числом SQL-запросов по операциям;
+- reset - удалить синтетические данные, включая карточки, созданные прогоном.
+
+Последовательность операций строится заранее генератором с фиксированным
+--seed, поэтому прогоны с одинаковыми параметрами на одном наборе данных
+сравнимы между коммитами (в отчет пишется коммит git). Число SQL-запросов
+берется из заголовка X-Query-Count или Server-Timing: запускайте сервер с
+QUERY_INSPECTOR_ENABLED=true или METRICS_SERVER_TIMING=true.
+
+seed и reset сразу пересчитывают агрегаты статистики (app/rollups.py), а отчет
+содержит день, до которого они посчитаны (dataset.rollups_covered_until):
+время GET /api/statistics сравнимо только при одинаковом покрытии.
+
+Вместо рабочей базы используйте отдельный PostgreSQL, например из docker-compose.
+С несколькими воркерами нужен BOARD_EVENTS_BACKEND=postgres: с событиями в памяти
+воркер не узнает об изменениях доски в других воркерах и отдает устаревший кеш.
+
+Запуск (из каталога backend, с доступной базой данных):
+    python -m benchmarks.load_benchmark seed --cards 20000 --users 200
+    METRICS_SERVER_TIMING=true BOARD_EVENTS_BACKEND=postgres uvicorn app.main:app --workers 4
+    python -m benchmarks.load_benchmark run --concurrency 16 --requests 5000 --output before.json
+    python -m benchmarks.load_benchmark reset
+"""
+
+import argparse
+import json
+import platform
+import queue
+import random
+import re
+import subprocess
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional
+import requests
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app import models
+from app.auth import get_password_hash
+from app.columns import recount_card_counts
+from app.database import engine, SessionLocal
+from app.rollups import refresh_statistics_rollups
+from app.statistics import get_rollup_coverage
+
+LOAD_PASSWORD = "LoadBench123!"
+LOAD_TITLE_PREFIX = "[load]"
+
+# Операция -> вес в смеси по умолчанию
+DEFAULT_MIX = {
+    "get_columns": 35,
+    "get_statistics": 10,
+    "create_card": 8,
+    "move_card": 12,
+    "update_card": 10,
+    "get_comments": 15,
+    "create_comment": 10,
+}
+
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def reset(db: Session, refresh: bool = True):
+    """Удалить синтетические данные прошлых заполнений и прогонов (refresh - пересчитать агрегаты статистики)"""
+    db.execute(text("DELETE FROM cards WHERE title LIKE :prefix"), {"prefix": LOAD_TITLE_PREFIX + "%"})
+    # Карточки других пользователей могли сослаться на синтетических - такие ссылки обнуляются
+    for column in ("assignee_id", "approver_id", "created_by"):
+        db.execute(text(f"""
+            UPDATE cards SET {column} = NULL
+            WHERE {column} IN (SELECT id FROM users WHERE username LIKE 'load_user_%')
+        """))
+    db.execute(text("DELETE FROM comments WHERE user_id IN (SELECT id FROM users WHERE username LIKE 'load_user_%')"))
+    db.execute(text("DELETE FROM users WHERE username LIKE 'load_user_%'"))
+    db.execute(text("DELETE FROM tags WHERE name LIKE '#load_tag_%'"))
+    db.execute(text("DELETE FROM columns WHERE title LIKE 'Load column %' AND NOT EXISTS (SELECT 1 FROM cards WHERE cards.column_id = columns.id)"))
+    db.commit()
+    recount_card_counts(db)
+    if refresh:
+        refresh_rollups(db)
+
+
+def refresh_rollups(db: Session):
+    """
+    Пересчитать агрегаты статистики сразу, не дожидаясь фоновой задачи:
+    иначе время GET /api/statistics зависит от того, успел ли пройти пересчет
+    """
+    if not refresh_statistics_rollups(db):
+        raise SystemExit("Агрегаты статистики пересчитывает другой процесс: повторите позже")
+
+
+def seed(db: Session, users: int, columns: int, cards: int, tags: int, history_per_card: int, comments_per_card: int) -> dict:
+    """Заполнить базу синтетическими данными (в одной транзакции, с фиксацией)"""
+    reset(db, refresh=False)
+
+    if columns:
+        db.execute(text("""
+            INSERT INTO columns (title, position, color, board_id)
+            SELECT 'Load column ' || g, COALESCE((SELECT max(position) FROM columns), 0) + g, '#9e9e9e',
+                   (SELECT min(board_id) FROM columns)
+            FROM generate_series(1, :columns) g
+        """), {"columns": columns})
+    column_ids = [column_id for (column_id,) in db.query(models.KanbanColumn.id).order_by(models.KanbanColumn.position)]
+    if not column_ids:
+        raise SystemExit("В базе нет колонок доски: примените миграции перед заполнением")
+
+    db.execute(text("""
+        INSERT INTO users (username, hashed_password, telegram, role, is_active)
+        SELECT 'load_user_' || g, :password, '@load_user_' || g, 'USER', true
+        FROM generate_series(1, :users) g
+    """), {"users": users, "password": get_password_hash(LOAD_PASSWORD)})
+    user_ids = [user_id for (user_id,) in db.execute(text("SELECT id FROM users WHERE username LIKE 'load_user_%' ORDER BY id"))]
+
+    db.execute(text("""
+        INSERT INTO tags (name) SELECT '#load_tag_' || g FROM generate_series(1, :tags) g
+    """), {"tags": tags})
+    tag_ids = [tag_id for (tag_id,) in db.execute(text("SELECT id FROM tags WHERE name LIKE '#load_tag_%' ORDER BY id"))]
+
+    arrays = {
+        "column_ids": column_ids, "columns": len(column_ids),
+        "user_ids": user_ids, "users": len(user_ids),
+        "tag_ids": tag_ids, "tags": len(tag_ids),
+        "prefix": LOAD_TITLE_PREFIX,
+    }
+    db.execute(text("""
+        INSERT INTO cards (ticket_number, title, description, position, story_points,
+                           column_id, assignee_id, approver_id, created_by, created_at, updated_at)
+        SELECT 'LOAD-' || g, :prefix || ' card ' || g, 'Synthetic card for load benchmark', g, g % 13 + 1,
+               (CAST(:column_ids AS integer[]))[1 + g % :columns],
+               (CAST(:user_ids AS integer[]))[1 + g % :users],
+               (CAST(:user_ids AS integer[]))[1 + (g / 7) % :users],
+               (CAST(:user_ids AS integer[]))[1 + (g / 3) % :users],
+               now() - (g % 365) * interval '1 day', now()
+        FROM generate_series(1, :cards) g
+    """), {**arrays, "cards": cards})
+    load_cards = "SELECT id, column_id, created_at FROM cards WHERE ticket_number LIKE 'LOAD-%'"
+    if tag_ids:
+        db.execute(text(f"""
+            INSERT INTO card_tags (card_id, tag_id)
+            SELECT c.id, (CAST(:tag_ids AS integer[]))[1 + c.id % :tags] FROM ({load_cards}) c
+        """), arrays)
+    db.execute(text(f"""
+        INSERT INTO card_transitions (card_id, from_column_id, to_column_id, created_at)
+        SELECT c.id, NULL, c.column_id, c.created_at FROM ({load_cards}) c
+    """))
+    db.execute(text(f"""
+        INSERT INTO card_history (card_id, action, details, created_at)
+        SELECT c.id, 'updated', '{{}}', c.created_at + s * interval '1 hour'
+        FROM ({load_cards}) c, generate_series(1, :per_card) s
+    """), {"per_card": history_per_card})
+    db.execute(text(f"""
+        INSERT INTO comments (content, created_at, ticket_id, user_id)
+        SELECT 'Load comment ' || s, c.created_at + s * interval '1 hour', c.id,
+               (CAST(:user_ids AS integer[]))[1 + (c.id + s) % :users]
+        FROM ({load_cards}) c, generate_series(1, :per_card) s
+    """), {**arrays, "per_card": comments_per_card})
+    db.commit()
+    recount_card_counts(db)
+    refresh_rollups(db)
+    db.execute(text("ANALYZE"))
+    db.commit()
+    return dataset_summary(db)
+
+
+def dataset_summary(db: Session) -> dict:
+    """Размер набора данных и покрытие агрегатов - попадают в отчет, чтобы сравнивать только сравнимые прогоны"""
+    summary = {
+        table: db.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+        for table in ("users", "columns", "tags", "cards", "card_history", "comments")
+    }
+    covered_until = get_rollup_coverage(db)
+    summary["rollups_covered_until"] = covered_until.isoformat() if covered_until else None
+    return summary
+
+
+class Target:
+    """Идентификаторы синтетических данных, по которым выбираются операции"""
+
+    def __init__(self, db: Session, sample_size: int):
+        self.column_ids = [column_id for (column_id,) in db.query(models.KanbanColumn.id)]
+        self.users = [
+            (user_id, username)
+            for user_id, username in db.execute(text("SELECT id, username FROM users WHERE username LIKE 'load_user_%' ORDER BY id"))
+        ]
+        self.card_ids = [
+            card_id for (card_id,) in db.execute(
+                text("SELECT id FROM cards WHERE ticket_number LIKE 'LOAD-%' ORDER BY id LIMIT :limit"),
+                {"limit": sample_size}
+            )
+        ]
+        if not self.users or not self.card_ids:
+            raise SystemExit("Нет синтетических данных: сначала выполните команду seed")
+
+
+def build_operations(target: Target) -> Dict[str, Callable]:
+    """Операция -> функция(session, rng), выполняющая HTTP-запрос"""
+    today = date.today()
+
+    def get_columns(http: requests.Session, rng: random.Random):
+        return http.get("/api/columns")
+
+    def get_statistics(http: requests.Session, rng: random.Random):
+        start = today - timedelta(days=rng.randint(30, 365))
+        params = {"start_date": start.isoformat(), "end_date": (start + timedelta(days=30)).isoformat()}
+        if rng.random() < 0.5:
+            params["assignee_id"] = rng.choice(target.users)[0]
+        return http.get("/api/statistics", params=params)
+
+    def create_card(http: requests.Session, rng: random.Random):
+        return http.post("/api/cards", json={
+            "title": f"{LOAD_TITLE_PREFIX} created {rng.randint(1, 10 ** 9)}",
+            "description": "Created by load benchmark",
+            "column_id": target.column_ids[0],
+            "assignee_id": rng.choice(target.users)[0],
+            "story_points": rng.randint(1, 13),
+        })
+
+    def move_card(http: requests.Session, rng: random.Random):
+        return http.post(f"/api/cards/{rng.choice(target.card_ids)}/move", json={
+            "from_column": 0,
+            "to_column": rng.choice(target.column_ids),
+            "new_position": 0,
+        })
+
+    def update_card(http: requests.Session, rng: random.Random):
+        return http.put(f"/api/cards/{rng.choice(target.card_ids)}", json={
+            "description": f"Updated by load benchmark {rng.randint(1, 10 ** 9)}",
+            "story_points": rng.randint(1, 13),
+        })
+
+    def get_comments(http: requests.Session, rng: random.Random):
+        return http.get(f"/api/cards/{rng.choice(target.card_ids)}/comments")
+
+    def create_comment(http: requests.Session, rng: random.Random):
+        return http.post(f"/api/cards/{rng.choice(target.card_ids)}/comments", json={
+            "content": f"Load comment {rng.randint(1, 10 ** 9)}",
+        })
+
+    return {
+        "get_columns": get_columns,
+        "get_statistics": get_statistics,
+        "create_card": create_card,
+        "move_card": move_card,
+        "update_card": update_card,
+        "get_comments": get_comments,
+        "create_comment": create_comment,
+    }
+
+
+class BaseUrlSession(requests.Session):
+    """requests.Session с базовым адресом сервера"""
+
+    def __init__(self, base_url: str):
+        super().__init__()
+        self.base_url = base_url.rstrip("/")
+
+    def request(self, method, url, *args, **kwargs):
+        return super().request(method, self.base_url + url, *args, **kwargs)
+
+
+def login(base_url: str, username: str) -> BaseUrlSession:
+    http = BaseUrlSession(base_url)
+    response = http.post("/api/auth/login", json={"username": username, "password": LOAD_PASSWORD})
+    response.raise_for_status()
+    http.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+    return http
+
+
+def response_query_count(response: requests.Response) -> Optional[int]:
+    """Число SQL-запросов из X-Query-Count или Server-Timing"""
+    value = response.headers.get("X-Query-Count")
+    if value is not None:
+        return int(value)
+    match = SERVER_TIMING_QUERIES.search(response.headers.get("Server-Timing", ""))
+    return int(match.group(1)) if match else None
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Перцентиль по методу ближайшего ранга"""
+    index = max(0, min(len(values) - 1, int(round(fraction * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def summarize(samples: List[tuple], elapsed: float) -> dict:
+    """samples: (операция, секунды, код ответа, SQL-запросов или None)"""
+    by_operation: Dict[str, List[tuple]] = {}
+    for sample in samples:
+        by_operation.setdefault(sample[0], []).append(sample)
+
+    def stats(rows: List[tuple]) -> dict:
+        latencies = sorted(row[1] for row in rows)
+        statuses: Dict[str, int] = {}
+        for row in rows:
+            statuses[str(row[2])] = statuses.get(str(row[2]), 0) + 1
+        queries = [row[3] for row in rows if row[3] is not None]
+        return {
+            "requests": len(rows),
+            "errors": sum(1 for row in rows if not 200 <= row[2] < 400),
+            "statuses": statuses,
+            "throughput_rps": round(len(rows) / elapsed, 2) if elapsed else None,
+            "latency_ms": {
+                "p50": round(percentile(latencies, 0.50) * 1000, 2),
+                "p95": round(percentile(latencies, 0.95) * 1000, 2),
+                "p99": round(percentile(latencies, 0.99) * 1000, 2),
+                "max": round(latencies[-1] * 1000, 2),
+                "mean": round(sum(latencies) / len(latencies) * 1000, 2),
+            },
+            "queries": {
+                "mean": round(sum(queries) / len(queries), 2),
+                "max": max(queries),
+            } if queries else None,
+        }
+
+    return {
+        "total": stats(samples),
+        "operations": {name: stats(rows) for name, rows in sorted(by_operation.items())},
+    }
+
+
+def git_revision() -> Optional[dict]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain"], capture_output=True, text=True, check=True).stdout.strip())
+        return {"commit": commit, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    mix = {}
+    for item in filter(None, value.split(",")):
+        name, _, weight = item.partition("=")
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Неизвестная операция: {name}")
+        mix[name] = int(weight)
+    return mix
+
+
+def run(base_url: str, concurrency: int, total: int, warmup: int, seed_value: int, mix: Dict[str, int], sample_size: int) -> dict:
+    db = SessionLocal()
+    try:
+        target = Target(db, sample_size)
+        dataset = dataset_summary(db)
+    finally:
+        db.close()
+        engine.dispose()
+
+    operations = build_operations(target)
+    rng = random.Random(seed_value)
+    names = [name for name, weight in mix.items() if weight > 0]
+    schedule = rng.choices(names, weights=[mix[name] for name in names], k=warmup + total)
+
+    jobs: "queue.Queue" = queue.Queue()
+    for index, name in enumerate(schedule):
+        jobs.put((index, name))
+    samples: List[tuple] = []
+    samples_lock = threading.Lock()
+    measure_started = threading.Event()
+    timing = {}
+
+    def worker(worker_index: int):
+        http = login(base_url, target.users[worker_index % len(target.users)][1])
+        # Параметры операций детерминированы номером операции в расписании
+        while True:
+            try:
+                index, name = jobs.get_nowait()
+            except queue.Empty:
+                return
+            if index == warmup:
+                timing["started"] = time.perf_counter()
+                measure_started.set()
+            operation_rng = random.Random(seed_value * 1_000_003 + index)
+            started = time.perf_counter()
+            try:
+                response = operations[name](http, operation_rng)
+                status, queries = response.status_code, response_query_count(response)
+            except requests.RequestException:
+                status, queries = 0, None
+            elapsed = time.perf_counter() - started
+            if index >= warmup:
+                with samples_lock:
+                    samples.append((name, elapsed, status, queries))
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - timing.get("started", time.perf_counter())
+
+    return {
+        "meta": {
+            "started_at": datetime.utcnow().isoformat(),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "base_url": base_url,
+            "concurrency": concurrency,
+            "requests": total,
+            "warmup": warmup,
+            "seed": seed_value,
+            "mix": mix,
+            "dataset": dataset,
+            "wall_time_seconds": round(elapsed, 3),
+        },
+        **summarize(samples, elapsed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = commands.add_parser("seed", help="Заполнить базу синтетическими данными")
+    seed_parser.add_argument("--users", type=int, default=200, help="Количество пользователей")
+    seed_parser.add_argument("--columns", type=int, default=0, help="Дополнительных колонок доски")
+    seed_parser.add_argument("--cards", type=int, default=20000, help="Количество карточек")
+    seed_parser.add_argument("--tags", type=int, default=50, help="Количество тегов")
+    seed_parser.add_argument("--history-per-card", type=int, default=10, help="Записей истории на карточку")
+    seed_parser.add_argument("--comments-per-card", type=int, default=5, help="Комментариев на карточку")
+
+    run_parser = commands.add_parser("run", help="Прогнать смесь запросов против сервера")
+    run_parser.add_argument("--base-url", default="http://localhost:8000", help="Адрес сервера")
+    run_parser.add_argument("--concurrency", type=int, default=16, help="Одновременных клиентов")
+    run_parser.add_argument("--requests", type=int, default=2000, help="Запросов в замере")
+    run_parser.add_argument("--warmup", type=int, default=100, help="Запросов прогрева (не входят в замер)")
+    run_parser.add_argument("--seed", type=int, default=42, help="Зерно генератора расписания")
+    run_parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                            help="Веса операций: get_columns=35,get_statistics=10,...")
+    run_parser.add_argument("--sample-cards", type=int, default=5000, help="Из скольких карточек выбираются цели операций")
+    run_parser.add_argument("--output", help="Файл для JSON-отчета (по умолчанию - stdout)")
+
+    commands.add_parser("reset", help="Удалить синтетические данные")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        report = run(args.base_url, args.concurrency, args.requests, args.warmup, args.seed, args.mix, args.sample_cards)
+        output = json.dumps(report, indent=2, ensure_ascii=False)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as file:
+                file.write(output + "\n")
+        print(output)
+        return
+
+    db = SessionLocal()
+    try:
+        if args.command == "seed":
+            dataset = seed(db, args.users, args.columns, args.cards, args.tags,
+                           args.history_per_card, args.comments_per_card)
+            print(json.dumps({"dataset": dataset}, indent=2, ensure_ascii=False))
+        else:
+            reset(db)
+    finally:
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
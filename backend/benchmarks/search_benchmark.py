@@ -0,0 +1,124 @@
+"""
+Бенчмарк полнотекстового поиска: GIN-индексы tsvector против сканирования ILIKE
+
+Заполняет базу синтетическими карточками и комментариями из словаря русских
+и английских слов, затем для каждого поискового запроса снимает EXPLAIN (ANALYZE):
+- fts   - запрос app.search.search_cards (первая страница);
+- ilike - поиск подстроки по title, description и comments.content, как было
+          бы без индекса.
+
+Все выполняется в одной транзакции, которая в конце откатывается:
+синтетические данные в базе не остаются. Запускать на dev-базе с примененной
+миграцией 020.
+
+Запуск (из каталога backend, с доступной базой данных):
+    python -m benchmarks.search_benchmark --cards 100000
+"""
+
+import argparse
+import json
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app import models
+from app.database import engine, SessionLocal
+from app.search import SEARCH_SQL, SEARCH_DEFAULT_LIMIT, COMMENT_RANK_WEIGHT, SNIPPET_OPTIONS
+
+VOCABULARY = [
+    "аренда", "офис", "склад", "договор", "оценка", "здание", "помещение", "ремонт",
+    "согласование", "проверка", "отчет", "документы", "площадь", "кадастр", "собственник",
+    "lease", "warehouse", "contract", "valuation", "building", "inspection", "report",
+    "invoice", "tenant", "survey", "appraisal", "renovation", "premises", "deadline",
+]
+
+QUERIES = ["договор аренды", "склад", "valuation report", "inspection", "\"кадастр\" -ремонт"]
+
+ILIKE_SQL = text("""
+    SELECT c.id, c.ticket_number, c.title
+    FROM cards c
+    WHERE c.title ILIKE :pattern OR c.description ILIKE :pattern
+       OR EXISTS (SELECT 1 FROM comments cm WHERE cm.ticket_id = c.id AND cm.content ILIKE :pattern)
+    ORDER BY c.id DESC
+    LIMIT :limit
+""")
+
+
+def seed(db: Session, cards: int, comments_per_card: int):
+    """Заполнить базу карточками и комментариями из случайных слов словаря"""
+    column_id = db.query(models.KanbanColumn.id).order_by(models.KanbanColumn.position).limit(1).scalar()
+    author_id = db.query(models.User.id).order_by(models.User.id).limit(1).scalar()
+    if column_id is None or author_id is None:
+        raise SystemExit("В базе нет колонок или пользователей: примените миграции перед запуском бенчмарка")
+
+    words = {"words": VOCABULARY, "size": len(VOCABULARY)}
+    db.execute(text("""
+        CREATE FUNCTION pg_temp.bench_phrase(words text[], size integer, length integer)
+        RETURNS text LANGUAGE sql VOLATILE AS $$
+            SELECT string_agg(words[1 + floor(random() * size)::integer], ' ')
+            FROM generate_series(1, length)
+        $$
+    """))
+    db.execute(text("""
+        INSERT INTO cards (ticket_number, title, description, position, column_id, created_by, created_at, updated_at)
+        SELECT 'SRCH-' || g,
+               pg_temp.bench_phrase(CAST(:words AS text[]), :size, 4),
+               pg_temp.bench_phrase(CAST(:words AS text[]), :size, 40),
+               g, :column_id, :author_id, now(), now()
+        FROM generate_series(1, :cards) g
+    """), {**words, "cards": cards, "column_id": column_id, "author_id": author_id})
+    db.execute(text("""
+        INSERT INTO comments (content, created_at, ticket_id, user_id)
+        SELECT pg_temp.bench_phrase(CAST(:words AS text[]), :size, 20), now(), c.id, :author_id
+        FROM cards c, generate_series(1, :per_card) s
+        WHERE c.ticket_number LIKE 'SRCH-%'
+    """), {**words, "per_card": comments_per_card, "author_id": author_id})
+    db.execute(text("ANALYZE cards"))
+    db.execute(text("ANALYZE comments"))
+
+
+def explain(db: Session, statement, parameters: dict) -> dict:
+    plan = db.execute(text("EXPLAIN (ANALYZE, FORMAT JSON) " + str(statement)), parameters).scalar()
+    plan = plan[0] if isinstance(plan, list) else json.loads(plan)[0]
+    return {
+        "planning_ms": round(plan["Planning Time"], 3),
+        "execution_ms": round(plan["Execution Time"], 3),
+    }
+
+
+def main(cards: int, comments_per_card: int):
+    db = SessionLocal()
+    try:
+        seed(db, cards, comments_per_card)
+        results = {}
+        for query in QUERIES:
+            fts = explain(db, SEARCH_SQL, {
+                "q": query,
+                "comment_weight": COMMENT_RANK_WEIGHT,
+                "snippet_options": SNIPPET_OPTIONS,
+                "limit": SEARCH_DEFAULT_LIMIT + 1,
+                "offset": 0,
+            })
+            # ILIKE ищет подстроку - берем первое слово запроса без операторов websearch
+            word = query.strip('"-').split()[0].strip('"')
+            ilike = explain(db, ILIKE_SQL, {"pattern": f"%{word}%", "limit": SEARCH_DEFAULT_LIMIT})
+            results[query] = {
+                "fts": fts,
+                "ilike": ilike,
+                "speedup": round(ilike["execution_ms"] / fts["execution_ms"], 2) if fts["execution_ms"] else None,
+            }
+        print(json.dumps({
+            "dataset": {"cards": cards, "comments_per_card": comments_per_card},
+            "results": results,
+        }, indent=2, ensure_ascii=False))
+    finally:
+        # Синтетические данные не сохраняются
+        db.rollback()
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cards", type=int, default=100000, help="Количество карточек")
+    parser.add_argument("--comments-per-card", type=int, default=3, help="Комментариев на карточку")
+    args = parser.parse_args()
+    main(args.cards, args.comments_per_card)
@@ -0,0 +1,101 @@
+"""
+Локальная заглушка Telegram Bot API для тестов и нагрузочных прогонов очереди уведомлений
+
+Принимает POST /bot<token>/sendMessage, запоминает сообщения и отвечает как Telegram.
+С параметром --fail-every N каждый N-й запрос получает 429 с retry_after,
+чтобы проверить повторную отправку с задержкой.
+
+Запуск (из каталога backend):
+    python -m benchmarks.telegram_stub --port 8081
+    TELEGRAM_API_BASE_URL=http://localhost:8081 uvicorn app.main:app
+
+Отправленные сообщения: GET /messages
+"""
+
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubState:
+    """Принятые сообщения и счетчик запросов"""
+
+    def __init__(self, fail_every: int, retry_after: int):
+        self.lock = threading.Lock()
+        self.messages = []
+        self.requests = 0
+        self.fail_every = fail_every
+        self.retry_after = retry_after
+
+
+def make_handler(state: StubState):
+    class TelegramStubHandler(BaseHTTPRequestHandler):
+        def _reply(self, status: int, payload: dict):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            if not self.path.endswith("/sendMessage"):
+                self._reply(404, {"ok": False, "error_code": 404, "description": "Not Found"})
+                return
+
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+
+            with state.lock:
+                state.requests += 1
+                if state.fail_every and state.requests % state.fail_every == 0:
+                    self._reply(429, {
+                        "ok": False,
+                        "error_code": 429,
+                        "description": "Too Many Requests",
+                        "parameters": {"retry_after": state.retry_after}
+                    })
+                    return
+                state.messages.append(payload)
+                message_id = len(state.messages)
+
+            self._reply(200, {
+                "ok": True,
+                "result": {"message_id": message_id, "chat": {"id": payload.get("chat_id")}, "text": payload.get("text")}
+            })
+
+        def do_GET(self):
+            if self.path != "/messages":
+                self._reply(404, {"ok": False})
+                return
+            with state.lock:
+                self._reply(200, {"requests": state.requests, "messages": list(state.messages)})
+
+        def log_message(self, format, *args):
+            pass
+
+    return TelegramStubHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Заглушка Telegram Bot API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--fail-every", type=int, default=0, help="Отвечать 429 на каждый N-й запрос (0 - никогда)")
+    parser.add_argument("--retry-after", type=int, default=1, help="retry_after в ответе 429, секунды")
+    args = parser.parse_args()
+
+    state = StubState(args.fail_every, args.retry_after)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    print(f"Заглушка Telegram Bot API: http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
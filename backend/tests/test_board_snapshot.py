@@ -0,0 +1,40 @@
+"""Количество SQL-запросов снимка доски не зависит от количества карточек (защита от N+1)"""
+
+import pytest
+from app.board import build_board_snapshot, count_queries
+from app.query_inspector import BOARD_SNAPSHOT_MAX_QUERIES, QUERY_BUDGETS, assert_query_budget
+
+CARDS = 30
+
+
+def snapshot_query_count(db) -> int:
+    with count_queries(db) as counter:
+        build_board_snapshot(db)
+    return counter.count
+
+
+@pytest.mark.parametrize("cards", [CARDS, 10 * CARDS])
+def test_board_snapshot_query_count_is_constant(db, board_cards, cards):
+    board_cards(cards)
+
+    assert snapshot_query_count(db) <= BOARD_SNAPSHOT_MAX_QUERIES
+
+
+def test_board_snapshot_query_count_does_not_grow_with_cards(db, board_cards):
+    board_cards(CARDS)
+    small_board = snapshot_query_count(db)
+    db.expunge_all()
+    board_cards(9 * CARDS)
+    large_board = snapshot_query_count(db)
+
+    assert large_board == small_board <= BOARD_SNAPSHOT_MAX_QUERIES
+
+
+@pytest.mark.parametrize("cards", [CARDS, 10 * CARDS])
+def test_get_columns_query_count_is_constant(client, board_cards, cards):
+    board_cards(cards)
+
+    response = client.get("/api/columns")
+
+    assert response.status_code == 200
+    assert_query_budget(response, QUERY_BUDGETS[("GET", "/api/columns")])
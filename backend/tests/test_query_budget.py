@@ -0,0 +1,33 @@
+"""Бюджеты SQL-запросов (app/query_inspector.py) на реальных запросах к API и к базе"""
+
+import pytest
+from sqlalchemy import text
+from app.query_inspector import QUERY_BUDGETS, QueryBudgetExceeded, assert_query_budget, query_budget
+
+COLUMNS_BUDGET = QUERY_BUDGETS[("GET", "/api/columns")]
+
+
+def test_get_columns_within_declared_budget(client, board_cards):
+    board_cards(20)
+
+    response = client.get("/api/columns")
+
+    assert response.status_code == 200
+    assert_query_budget(response, COLUMNS_BUDGET)
+
+
+def test_get_columns_over_budget_raises(client, board_cards):
+    board_cards(20)
+
+    response = client.get("/api/columns")
+
+    assert response.status_code == 200
+    with pytest.raises(QueryBudgetExceeded):
+        assert_query_budget(response, 0)
+
+
+def test_query_budget_raises_when_block_exceeds_it(db):
+    with pytest.raises(QueryBudgetExceeded, match="2 SQL-запросов при бюджете 1"):
+        with query_budget(1, "два запроса"):
+            db.execute(text("SELECT 1"))
+            db.execute(text("SELECT 2"))
@@ -19,12 +19,15 @@ const CommentsSection = ({ cardId }) => {
   const [loading, setLoading] = useState(true);
   const [submitting, setSubmitting] = useState(false);
   const [error, setError] = useState('');
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   const fetchComments = async () => {
     try {
       setLoading(true);
-      const data = await getCardComments(cardId);
-      setComments(data);
+      const page = await getCardComments(cardId);
+      setComments(page.items);
+      setNextCursor(page.nextCursor);
       setError('');
     } catch (error) {
       console.error('Ошибка при загрузке комментариев:', error);
@@ -34,6 +37,20 @@ const CommentsSection = ({ cardId }) => {
     }
   };
 
+  const fetchMoreComments = async () => {
+    try {
+      setLoadingMore(true);
+      const page = await getCardComments(cardId, nextCursor);
+      setComments((prev) => [...prev, ...page.items]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Ошибка при загрузке комментариев:', error);
+      setError('Ошибка при загрузке комментариев');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     if (cardId) {
       fetchComments();
@@ -88,7 +105,7 @@ const CommentsSection = ({ cardId }) => {
   return (
     <Box sx={{ mt: 2 }}>
       <Typography variant="h6" gutterBottom>
-        Комментарии ({comments.length})
+        Комментарии ({comments.length}{nextCursor ? '+' : ''})
       </Typography>
 
       {error && (
@@ -160,6 +177,13 @@ const CommentsSection = ({ cardId }) => {
               {index < comments.length - 1 && <Divider />}
             </Box>
           ))}
+          {nextCursor && (
+            <Box sx={{ display: 'flex', justifyContent: 'center', pt: 1 }}>
+              <Button size="small" onClick={fetchMoreComments} disabled={loadingMore}>
+                {loadingMore ? 'Загрузка...' : 'Показать еще'}
+              </Button>
+            </Box>
+          )}
         </Box>
       )}
     </Box>
@@ -18,7 +18,7 @@ import {
 } from '@mui/material';
 import KanbanColumn from './KanbanColumn';
 import CreateTicketModal from './CreateTicketModal';
-import { getColumns, moveCard } from '../services/api';
+import { getColumns, getCard, moveCard, subscribeToBoardEvents } from '../services/api';
 import AddIcon from '@mui/icons-material/Add';
 import FilterAltIcon from '@mui/icons-material/FilterAlt';
 
@@ -36,6 +36,8 @@ const KanbanBoard = () => {
   
   // Refs для доступа к актуальному состоянию без зависимостей
   const isDraggingRef = useRef(false);
+  // Во время перетаскивания пришли события доски - после него доска перечитывается
+  const missedEventsRef = useRef(false);
   const columnsRef = useRef([]);
   
   // Отладочный useEffect для отслеживания mount/unmount
@@ -106,6 +108,82 @@ const KanbanBoard = () => {
     fetchColumns();
   }, []);
 
+  // Применяем события доски от сервера вместо полной перезагрузки колонок
+  const applyBoardEvent = useCallback((event) => {
+    const { type, data } = event;
+
+    const withCards = (column, cards) => ({ ...column, cards, cards_count: cards.length });
+    const upsertCard = (card) => {
+      setColumns((prevColumns) => prevColumns.map((column) => {
+        const otherCards = column.cards.filter((c) => c.id !== card.id);
+        if (column.id !== card.column_id) {
+          return otherCards.length === column.cards.length ? column : withCards(column, otherCards);
+        }
+        const index = column.cards.findIndex((c) => c.id === card.id);
+        if (index === -1) {
+          return withCards(column, [...column.cards, card]);
+        }
+        const cards = [...column.cards];
+        cards[index] = card;
+        return withCards(column, cards);
+      }));
+    };
+
+    switch (type) {
+      case 'card_created':
+      case 'card_updated':
+        if (event.truncated) {
+          // Событие без данных карточки - дочитываем ее отдельно
+          getCard(data.id).then(upsertCard).catch((err) => console.error('❌ Card refresh error:', err));
+        } else {
+          upsertCard(data);
+        }
+        break;
+      case 'card_moved':
+        setColumns((prevColumns) => {
+          const movedCard = prevColumns.flatMap((column) => column.cards).find((c) => c.id === data.id);
+          if (!movedCard) {
+            return prevColumns;
+          }
+          return prevColumns.map((column) => {
+            const cards = column.cards.filter((c) => c.id !== data.id);
+            if (column.id === data.to_column) {
+              cards.splice(data.position, 0, { ...movedCard, column_id: data.to_column, position: data.position });
+            }
+            return cards.length === column.cards.length && column.id !== data.to_column ? column : withCards(column, cards);
+          });
+        });
+        break;
+      case 'card_deleted':
+        setColumns((prevColumns) => prevColumns.map((column) => (
+          column.id === data.column_id ? withCards(column, column.cards.filter((c) => c.id !== data.id)) : column
+        )));
+        break;
+      case 'wip_limit_changed':
+        setColumns((prevColumns) => prevColumns.map((column) => (
+          column.id === data.column_id ? { ...column, wip_limit: data.wip_limit } : column
+        )));
+        break;
+      case 'resync':
+        fetchColumns(true);
+        break;
+      default:
+        break;
+    }
+  }, [fetchColumns]);
+
+  useEffect(() => {
+    const unsubscribe = subscribeToBoardEvents((event) => {
+      // Во время перетаскивания не трогаем колонки - onDragEnd перечитает доску
+      if (isDraggingRef.current) {
+        missedEventsRef.current = true;
+        return;
+      }
+      applyBoardEvent(event);
+    });
+    return unsubscribe;
+  }, [applyBoardEvent]);
+
   // Отслеживание изменений в состоянии columns
   useEffect(() => {
     console.log('📊 Columns updated:', columns.length, 'columns');
@@ -121,9 +199,18 @@ const KanbanBoard = () => {
     
     const { destination, source, draggableId } = result;
 
+    // Изменения других пользователей, пропущенные во время перетаскивания, подтягиваем с сервера
+    const finishDrag = () => {
+      isDraggingRef.current = false;
+      if (missedEventsRef.current) {
+        missedEventsRef.current = false;
+        fetchColumns(true);
+      }
+    };
+
     if (!destination) {
       console.log('❌ No destination');
-      isDraggingRef.current = false;
+      finishDrag();
       return;
     }
 
@@ -132,7 +219,7 @@ const KanbanBoard = () => {
       destination.index === source.index
     ) {
       console.log('❌ No movement');
-      isDraggingRef.current = false;
+      finishDrag();
       return;
     }
 
@@ -229,8 +316,8 @@ const KanbanBoard = () => {
       }
     }
     console.log('🎯 onDragEnd complete');
-    isDraggingRef.current = false;
-  }, []); // Полностью убираем все зависимости
+    finishDrag();
+  }, [fetchColumns]); // fetchColumns стабилен (без зависимостей)
 
   const handleCardCreated = useCallback(async (newCard) => {
     try {
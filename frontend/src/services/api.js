@@ -61,8 +61,9 @@ export const login = async (credentials) => {
   }
 };
 
-export const getColumns = async () => {
-  const response = await api.get('/api/columns');
+// filters: assignee_id, tag_id, real_estate_type, rc_mk, rc_zm, q - фильтрация выполняется на сервере
+export const getColumns = async (filters = {}) => {
+  const response = await api.get('/api/columns', { params: filters });
   return response.data;
 };
 
@@ -83,14 +84,37 @@ export const moveCard = async (cardId, moveData) => {
   return response.data;
 };
 
-export const getCardHistory = async (cardId) => {
-  const response = await api.get(`/api/cards/${cardId}/history`);
-  return response.data;
+// Подписка на поток изменений доски (Server-Sent Events)
+// onEvent вызывается с объектом { type, data, truncated? }; возвращает функцию отписки
+export const subscribeToBoardEvents = (onEvent) => {
+  const source = new EventSource(`${API_URL}/api/events`, { withCredentials: true });
+  const eventTypes = ['card_created', 'card_moved', 'card_updated', 'card_deleted', 'wip_limit_changed', 'resync'];
+
+  eventTypes.forEach((type) => {
+    source.addEventListener(type, (message) => {
+      try {
+        onEvent(JSON.parse(message.data));
+      } catch (error) {
+        console.error('Ошибка обработки события доски:', error);
+      }
+    });
+  });
+
+  return () => source.close();
 };
 
-export const getCardComments = async (cardId) => {
-  const response = await api.get(`/api/cards/${cardId}/comments`);
-  return response.data;
+// История и комментарии отдаются постранично: курсор следующей страницы приходит в заголовке X-Next-Cursor
+const getPage = async (url, cursor) => {
+  const response = await api.get(url, { params: cursor ? { cursor } : {} });
+  return { items: response.data, nextCursor: response.headers['x-next-cursor'] || null };
+};
+
+export const getCardHistory = async (cardId, cursor = null) => {
+  return getPage(`/api/cards/${cardId}/history`, cursor);
+};
+
+export const getCardComments = async (cardId, cursor = null) => {
+  return getPage(`/api/cards/${cardId}/comments`, cursor);
 };
 
 export const createCardComment = async (cardId, commentData) => {
@@ -129,6 +153,22 @@ export const deleteCard = async (cardId) => {
   }
 };
 
+// Массовые операции: ответ содержит succeeded и errors по каждой карточке
+export const bulkMoveCards = async (cardIds, toColumn) => {
+  const response = await api.post('/api/cards/bulk/move', { card_ids: cardIds, to_column: toColumn });
+  return response.data;
+};
+
+export const bulkUpdateCards = async (cardIds, changes) => {
+  const response = await api.post('/api/cards/bulk/update', { card_ids: cardIds, changes });
+  return response.data;
+};
+
+export const bulkDeleteCards = async (cardIds) => {
+  const response = await api.post('/api/cards/bulk/delete', { card_ids: cardIds });
+  return response.data;
+};
+
 // Функции для работы с пользователями
 export const getUsers = async () => {
   const response = await api.get('/api/users');
@@ -146,6 +186,11 @@ export const getCurrentUser = async () => {
   return response.data;
 };
 
+export const updateNotificationSettings = async (settings) => {
+  const response = await api.put('/api/auth/me/notification-settings', settings);
+  return response.data;
+};
+
 // Функции для работы с колонками
 export const getColumn = async (columnId) => {
   const response = await api.get(`/api/columns/${columnId}`);